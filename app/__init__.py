@@ -10,7 +10,9 @@ Warning: No error-checking is done for the config.
 
 import json
 import time
-import tinydb
+
+from .durability import Durability
+from .shards import open_sharded_database
 
 
 # --------------------------------------------------------------------------------
@@ -34,7 +36,15 @@ with open('config.json') as config_json:
 
 chosen_db = config['database']
 db_file = config['databases'][chosen_db]
-db = tinydb.TinyDB(db_file)
+db_format = config['database_format']
+db = open_sharded_database(
+  db_file,
+  config['shards'],
+  db_format,
+  config['mmap_cache_size'],
+  config['group_commit']['window_seconds'],
+  config['group_commit']['max_batch'],
+  Durability(config['durability'], config['fsync_interval_seconds']))
 
 
 # --------------------------------------------------------------------------------
@@ -45,10 +55,11 @@ secret_key = config['secret_key']
 
 
 # --------------------------------------------------------------------------------
-# Establish the Users
+# Establish the Users and Admins
 # --------------------------------------------------------------------------------
 
 users = config['users']
+admins = config['admins']
 
 
 # --------------------------------------------------------------------------------
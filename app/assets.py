@@ -0,0 +1,116 @@
+"""
+This module serves static assets from memory.
+Each asset is read, hashed, and gzip-compressed once when it is loaded,
+so requests never touch the filesystem or compress anything.
+Every encoding of an asset has its own strong ETag, and matching If-None-Match headers get 304.
+"""
+
+# --------------------------------------------------------------------------------
+# Imports
+# --------------------------------------------------------------------------------
+
+import gzip
+import hashlib
+import mimetypes
+
+from . import config
+from fastapi import Request, Response
+
+
+# --------------------------------------------------------------------------------
+# Cache Policies
+# --------------------------------------------------------------------------------
+
+# Assets that only change with a new release may be cached without revalidation
+IMMUTABLE = f"public, max-age={config['assets']['max_age_seconds']}, immutable"
+
+# Assets that change whenever the API does must be revalidated with their ETag
+REVALIDATE = 'no-cache'
+
+GZIP_LEVEL = 9
+
+
+# --------------------------------------------------------------------------------
+# Class: Asset
+# --------------------------------------------------------------------------------
+
+class Asset:
+
+  def __init__(self, body: bytes, media_type: str, cache_control: str = IMMUTABLE):
+    self.body = body
+    self.media_type = media_type
+    self.cache_control = cache_control
+
+    digest = hashlib.sha256(body).hexdigest()[:32]
+    self.etag = f'"{digest}"'
+
+    # The compressed variant is kept only if it is smaller, which it rarely is for images
+    compressed = gzip.compress(body, GZIP_LEVEL, mtime=0)
+    self.gzip_body = compressed if len(compressed) < len(body) else None
+    self.gzip_etag = f'"{digest}-gzip"'
+
+
+def load_asset(path: str, cache_control: str = IMMUTABLE):
+  with open(path, 'rb') as asset:
+    body = asset.read()
+  media_type = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+  return Asset(body, media_type, cache_control)
+
+
+# --------------------------------------------------------------------------------
+# Header Functions
+# --------------------------------------------------------------------------------
+
+def _quality(params: str):
+  for param in params.split(';'):
+    name, _, value = param.strip().partition('=')
+    if name.strip().lower() == 'q':
+      try:
+        return float(value)
+      except ValueError:
+        return 0.0
+  return 1.0
+
+
+def accepts_gzip(accept_encoding: str | None):
+  for coding in (accept_encoding or '').split(','):
+    name, _, params = coding.partition(';')
+    if name.strip().lower() in ('gzip', '*') and _quality(params) > 0:
+      return True
+  return False
+
+
+def none_match(if_none_match: str | None, etag: str):
+  # If-None-Match uses weak comparison, so a weak tag matches its strong ETag
+  if if_none_match is None:
+    return False
+  if if_none_match.strip() == '*':
+    return True
+  return etag in (tag.strip().removeprefix('W/') for tag in if_none_match.split(','))
+
+
+# --------------------------------------------------------------------------------
+# Responses
+# --------------------------------------------------------------------------------
+
+def asset_response(request: Request, asset: Asset):
+  """
+  Sends an asset, compressed if the client accepts gzip, or 304 if the client has it already.
+  """
+
+  headers = {'Cache-Control': asset.cache_control}
+  body, etag = asset.body, asset.etag
+
+  if asset.gzip_body is not None:
+    headers['Vary'] = 'Accept-Encoding'
+    if accepts_gzip(request.headers.get('accept-encoding')):
+      body, etag = asset.gzip_body, asset.gzip_etag
+      headers['Content-Encoding'] = 'gzip'
+
+  headers['ETag'] = etag
+
+  if none_match(request.headers.get('if-none-match'), etag):
+    headers.pop('Content-Encoding', None)
+    return Response(status_code=304, headers=headers)
+
+  return Response(body, media_type=asset.media_type, headers=headers)
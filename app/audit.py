@@ -0,0 +1,304 @@
+"""
+This module keeps an audit trail of who created, updated, and deleted which device.
+Mutations only append a record to a bounded in-memory buffer,
+and a background thread writes the buffer in batches to rotated NDJSON files.
+When the buffer is full, the `overflow` config decides whether to drop the oldest record or the new one.
+Records are appended while the mutation holds the shard and index locks, so appending never waits for the disk.
+Dropped records are counted, and the count is written into the trail so gaps are visible.
+Records are written within `flush_seconds` of their mutation, so queries may briefly lag behind.
+"""
+
+# --------------------------------------------------------------------------------
+# Imports
+# --------------------------------------------------------------------------------
+
+import calendar
+import json
+import os
+import threading
+import time
+
+from collections import deque
+
+from . import config
+from .changes import change_feed
+from .events import CREATE, DELETE, UPDATE
+from .indexes import listen
+
+
+# --------------------------------------------------------------------------------
+# Globals
+# --------------------------------------------------------------------------------
+
+DROPPED = 'dropped'
+
+DROP_OLDEST = 'drop_oldest'
+DROP_NEWEST = 'drop_newest'
+
+FILE_PREFIX = 'audit-'
+FILE_SUFFIX = '.ndjson'
+
+audit = config['audit']
+
+
+# --------------------------------------------------------------------------------
+# File Functions
+# --------------------------------------------------------------------------------
+
+def audit_file_name(created: float):
+  # Names sort in the order the files were created
+  stamp = time.strftime('%Y%m%dT%H%M%S', time.gmtime(created))
+  return f'{FILE_PREFIX}{stamp}-{int(created * 1e6) % 1000000:06d}{FILE_SUFFIX}'
+
+
+def list_audit_files(directory: str):
+  """
+  Returns the audit files in the directory, oldest first.
+  """
+
+  try:
+    names = os.listdir(directory)
+  except FileNotFoundError:
+    return []
+  return sorted(name for name in names if name.startswith(FILE_PREFIX) and name.endswith(FILE_SUFFIX))
+
+
+def _record_fields(device: dict):
+  # Versions are part of each record, not of its device fields
+  return {key: value for key, value in device.items() if key != 'version'}
+
+
+# --------------------------------------------------------------------------------
+# Class: AuditLog
+# --------------------------------------------------------------------------------
+
+class AuditLog:
+  """
+  Buffers audit records from mutations and writes them from a background thread.
+  Call `start()` at startup and `stop()` at shutdown, which writes what is left.
+  Only owners may change their devices, so each device's owner is the user who changed it.
+  """
+
+  def __init__(
+    self,
+    directory: str,
+    queue_size: int,
+    overflow: str,
+    batch_size: int,
+    flush_seconds: float,
+    max_file_bytes: int,
+    max_files: int):
+
+    if overflow not in (DROP_OLDEST, DROP_NEWEST):
+      raise ValueError(f'Unknown audit overflow policy: {overflow}')
+
+    self.directory = directory
+    self.queue_size = queue_size
+    self.overflow = overflow
+    self.batch_size = batch_size
+    self.flush_seconds = flush_seconds
+    self.max_file_bytes = max_file_bytes
+    self.max_files = max_files
+
+    # Records dropped since the last batch was written
+    self.dropped = 0
+    self.written = 0
+
+    self._condition = threading.Condition()
+    self._records = deque()
+    self._stopped = False
+    self._thread = None
+    self._file = None
+
+
+  def append(self, record: dict):
+    with self._condition:
+      if len(self._records) >= self.queue_size:
+        self.dropped += 1
+        if self.overflow == DROP_NEWEST:
+          return
+        self._records.popleft()
+
+      self._records.append(record)
+      if len(self._records) >= self.batch_size:
+        self._condition.notify_all()
+
+
+  def record(self, action: str, device_id: int, device: dict, details: dict):
+    self.append({
+      'seq': change_feed.seq,
+      'time': time.time(),
+      'user': device['owner'],
+      'action': action,
+      'device_id': device_id,
+      'version': device.get('version'),
+      **details,
+    })
+
+
+  def inserted(self, device_id: int, device: dict):
+    self.record(CREATE, device_id, device, {'device': _record_fields(device)})
+
+
+  def updated(self, device_id: int, before: dict, after: dict):
+    changes = {
+      key: {'from': before.get(key), 'to': value}
+      for key, value in _record_fields(after).items()
+      if before.get(key) != value
+    }
+    self.record(UPDATE, device_id, after, {'changes': changes})
+
+
+  def removed(self, device_id: int, device: dict):
+    self.record(DELETE, device_id, device, {'device': _record_fields(device)})
+
+
+  def start(self):
+    with self._condition:
+      self._stopped = False
+    self._thread = threading.Thread(target=self._run, name='audit-writer', daemon=True)
+    self._thread.start()
+
+
+  def stop(self):
+    with self._condition:
+      self._stopped = True
+      self._condition.notify_all()
+    if self._thread is not None:
+      self._thread.join()
+      self._thread = None
+
+
+  def _run(self):
+    while True:
+      with self._condition:
+        self._condition.wait_for(
+          lambda: len(self._records) >= self.batch_size or self._stopped,
+          timeout=self.flush_seconds)
+
+        batch = list(self._records)
+        self._records.clear()
+        dropped = self.dropped
+        self.dropped = 0
+        stopped = self._stopped
+
+      if dropped:
+        batch.append({'time': time.time(), 'action': DROPPED, 'count': dropped})
+      if batch:
+        self._write(batch)
+
+      if stopped:
+        self._close()
+        return
+
+
+  def _write(self, batch: list[dict]):
+    lines = ''.join(json.dumps(record, separators=(',', ':')) + '\n' for record in batch)
+
+    try:
+      if self._file is None or self._file.tell() >= self.max_file_bytes:
+        self._rotate()
+      self._file.write(lines)
+      self._file.flush()
+    except OSError:
+      # The trail must never fail the mutations it records, so the batch is counted as dropped
+      with self._condition:
+        self.dropped += sum(1 for record in batch if record['action'] != DROPPED)
+      return
+
+    self.written += len(batch)
+
+
+  def _rotate(self):
+    self._close()
+    os.makedirs(self.directory, exist_ok=True)
+
+    name = audit_file_name(time.time())
+    self._file = open(os.path.join(self.directory, name), 'a', encoding='utf-8')
+
+    # Deletes the oldest files beyond the limit, never the new one
+    for old_name in list_audit_files(self.directory)[:-self.max_files]:
+      os.remove(os.path.join(self.directory, old_name))
+
+
+  def _close(self):
+    if self._file is not None:
+      self._file.close()
+      self._file = None
+
+
+# --------------------------------------------------------------------------------
+# Queries
+# --------------------------------------------------------------------------------
+
+def _file_start(name: str):
+  # Files may start within the same second, so the microseconds count too
+  stamp, micros = name[len(FILE_PREFIX):-len(FILE_SUFFIX)].split('-')
+  return calendar.timegm(time.strptime(stamp, '%Y%m%dT%H%M%S')) + int(micros) / 1e6
+
+
+def query_audit(
+  directory: str,
+  user: str | None = None,
+  device_id: int | None = None,
+  action: str | None = None,
+  since: float | None = None,
+  until: float | None = None,
+  limit: int | None = None):
+  """
+  Yields matching audit records as NDJSON lines, oldest first.
+  Files are read one line at a time, so memory use does not grow with the trail.
+  Files that were finished before `since` are skipped without being read.
+  """
+
+  names = list_audit_files(directory)
+  matched = 0
+
+  for position, name in enumerate(names):
+    if since is not None and position + 1 < len(names) and _file_start(names[position + 1]) < since:
+      continue
+
+    try:
+      audit_file = open(os.path.join(directory, name), encoding='utf-8')
+    except FileNotFoundError:
+      # Rotation deleted the file after it was listed
+      continue
+
+    with audit_file:
+      for line in audit_file:
+
+        # The writer may be partway through the last line
+        if not line.endswith('\n'):
+          break
+
+        record = json.loads(line)
+        if user is not None and record.get('user') != user:
+          continue
+        if device_id is not None and record.get('device_id') != device_id:
+          continue
+        if action is not None and record['action'] != action:
+          continue
+        if since is not None and record['time'] < since:
+          continue
+        if until is not None and record['time'] >= until:
+          continue
+
+        yield line
+        matched += 1
+        if limit is not None and matched >= limit:
+          return
+
+
+# --------------------------------------------------------------------------------
+# Registration
+# --------------------------------------------------------------------------------
+
+# Registered after the change feed, so record sequence numbers match change feed sequence numbers
+audit_log = listen(AuditLog(
+  audit['directory'],
+  audit['queue_size'],
+  audit['overflow'],
+  audit['batch_size'],
+  audit['flush_seconds'],
+  audit['max_file_bytes'],
+  audit['max_files']))
@@ -9,8 +9,8 @@ This module provides security and authentication.
 import jwt
 import secrets
 
-from . import users, secret_key
-from .exceptions import UnauthorizedException
+from . import admins, users, secret_key
+from .exceptions import ForbiddenException, UnauthorizedException
 from fastapi import Depends
 from fastapi.security import HTTPBasic, HTTPBasicCredentials
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
@@ -59,3 +59,9 @@ def get_current_username(
         return current_username
     
   raise UnauthorizedException()
+
+
+def get_admin_username(username: str = Depends(get_current_username)):
+  if username not in admins:
+    raise ForbiddenException()
+  return username
@@ -0,0 +1,199 @@
+"""
+This module streams consistent backups of the registry.
+A backup is a gzip-compressed tar archive of the shard files from one database checkpoint,
+ending with a 'manifest.json' member that lists each file's size and SHA-256 checksum.
+Files are streamed from the checkpoint in chunks, so a backup never loads the registry into memory.
+"""
+
+# --------------------------------------------------------------------------------
+# Imports
+# --------------------------------------------------------------------------------
+
+import hashlib
+import json
+import os
+import tarfile
+import time
+import zlib
+
+
+# --------------------------------------------------------------------------------
+# Archive Layout
+# --------------------------------------------------------------------------------
+
+BACKUP_VERSION = 1
+MANIFEST_NAME = 'manifest.json'
+
+CHUNK_SIZE = 1024 * 1024
+GZIP_LEVEL = 6
+
+
+def backup_name(created: float):
+  stamp = time.strftime('%Y%m%dT%H%M%SZ', time.gmtime(created))
+  return f'registry-backup-{stamp}.tar.gz'
+
+
+def _member_header(name: str, size: int, mtime: float):
+  info = tarfile.TarInfo(name)
+  info.size = size
+  info.mtime = int(mtime)
+  info.mode = 0o644
+  return info.tobuf(format=tarfile.PAX_FORMAT)
+
+
+def _padding(size: int):
+  return b'\0' * (-size % tarfile.BLOCKSIZE)
+
+
+# --------------------------------------------------------------------------------
+# Backup Functions
+# --------------------------------------------------------------------------------
+
+def _archive(files: list, names: list[str], created: float):
+  """
+  Yields the uncompressed tar archive for open files, closing them when done.
+  """
+
+  entries = []
+  try:
+    for name, registry in zip(names, files):
+      size = os.fstat(registry.fileno()).st_size
+      digest = hashlib.sha256()
+      yield _member_header(name, size, created)
+
+      remaining = size
+      while remaining > 0:
+        chunk = registry.read(min(CHUNK_SIZE, remaining))
+        if not chunk:
+          raise OSError(f"Backup file '{name}' ended early")
+        digest.update(chunk)
+        remaining -= len(chunk)
+        yield chunk
+
+      yield _padding(size)
+      entries.append({'name': name, 'size': size, 'sha256': digest.hexdigest()})
+
+  finally:
+    for registry in files:
+      registry.close()
+
+  manifest = json.dumps({
+    'version': BACKUP_VERSION,
+    'created': created,
+    'shards': len(entries),
+    'files': entries,
+  }, indent=2).encode('utf-8')
+
+  yield _member_header(MANIFEST_NAME, len(manifest), created)
+  yield manifest
+  yield _padding(len(manifest))
+
+  # A tar archive ends with two empty blocks
+  yield b'\0' * (tarfile.BLOCKSIZE * 2)
+
+
+def stream_backup(files: list, names: list[str], created: float | None = None):
+  """
+  Yields a compressed backup archive of open files, like those from a database checkpoint.
+  The files are closed once they are read, or when the generator is closed.
+  """
+
+  created = time.time() if created is None else created
+
+  # wbits of 16 + 15 writes a gzip header and trailer around the deflate stream
+  compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+  archive = _archive(files, names, created)
+  try:
+    for part in archive:
+      if compressed := compressor.compress(part):
+        yield compressed
+  finally:
+    archive.close()
+
+  yield compressor.flush()
+
+
+def verify_backup(fileobj):
+  """
+  Reads a backup archive and checks every file against its manifest.
+  Returns the manifest, or raises ValueError if the backup is damaged or incomplete.
+  """
+
+  return _read_backup(fileobj)
+
+
+def restore_backup(fileobj, directory: str):
+  """
+  Verifies a backup archive and writes its registry files into a directory.
+  Each file is written to a temporary name first and renamed only after the whole backup checks out,
+  so a damaged backup never replaces existing files.
+  """
+
+  return _read_backup(fileobj, directory)
+
+
+def _read_backup(fileobj, directory: str | None = None):
+  digests = dict()
+  temp_paths = dict()
+  manifest = None
+
+  try:
+    with tarfile.open(fileobj=fileobj, mode='r|gz') as archive:
+      for member in archive:
+        reader = archive.extractfile(member)
+        if reader is None:
+          raise ValueError(f"Unexpected backup member: '{member.name}'")
+
+        if member.name == MANIFEST_NAME:
+          manifest = json.loads(reader.read())
+          continue
+
+        if os.path.basename(member.name) != member.name:
+          raise ValueError(f"Unexpected backup member: '{member.name}'")
+
+        digest = hashlib.sha256()
+        output = None
+        if directory is not None:
+          temp_paths[member.name] = os.path.join(directory, member.name + '.restore')
+          output = open(temp_paths[member.name], 'wb')
+
+        try:
+          while chunk := reader.read(CHUNK_SIZE):
+            digest.update(chunk)
+            if output is not None:
+              output.write(chunk)
+        finally:
+          if output is not None:
+            output.close()
+
+        digests[member.name] = (member.size, digest.hexdigest())
+
+    if manifest is None:
+      raise ValueError('The backup has no manifest')
+
+    expected = {entry['name']: (entry['size'], entry['sha256']) for entry in manifest['files']}
+    if expected != digests:
+      raise ValueError('The backup does not match its manifest checksums')
+
+  except (tarfile.TarError, EOFError, OSError, zlib.error) as error:
+    for path in temp_paths.values():
+      _remove(path)
+    raise ValueError(f'The backup is damaged: {error}')
+
+  except ValueError:
+    for path in temp_paths.values():
+      _remove(path)
+    raise
+
+  for name, path in temp_paths.items():
+    os.replace(path, os.path.join(directory, name))
+
+  return manifest
+
+
+def _remove(path: str):
+  try:
+    os.remove(path)
+  except FileNotFoundError:
+    pass
@@ -0,0 +1,171 @@
+"""
+This module caches rendered device listings per owner.
+Entries are evicted least recently used first to stay within a memory budget.
+A write invalidates only the entries of the owner whose devices changed.
+It also remembers the rendered lengths of each device's responses,
+so HEAD requests can send Content-Length without rendering a body.
+"""
+
+# --------------------------------------------------------------------------------
+# Imports
+# --------------------------------------------------------------------------------
+
+import threading
+
+from collections import OrderedDict
+
+from . import config
+from .indexes import listen
+
+
+# --------------------------------------------------------------------------------
+# Globals
+# --------------------------------------------------------------------------------
+
+# Rough per-entry cost of the key, bookkeeping, and bytes object header
+ENTRY_OVERHEAD = 256
+
+
+# --------------------------------------------------------------------------------
+# Class: ResponseCache
+# --------------------------------------------------------------------------------
+
+class ResponseCache:
+
+  def __init__(self, max_bytes: int):
+    self.max_bytes = max_bytes
+    self.size = 0
+    self.hits = 0
+    self.misses = 0
+
+    self._lock = threading.Lock()
+    self._entries = OrderedDict()
+    self._owner_keys = dict()
+    self._generations = dict()
+
+
+  def generation(self, owner: str):
+    """
+    Returns a number that changes whenever the owner's devices change.
+    Read it before a lookup and pass it to `put` to avoid caching stale results.
+    """
+
+    with self._lock:
+      return self._generations.get(owner, 0)
+
+
+  def get(self, owner: str, key: tuple):
+    with self._lock:
+      body = self._entries.get((owner, key))
+      if body is None:
+        self.misses += 1
+      else:
+        self.hits += 1
+        self._entries.move_to_end((owner, key))
+      return body
+
+
+  def put(self, owner: str, key: tuple, body: bytes, generation: int):
+    cost = len(body) + ENTRY_OVERHEAD
+    if cost > self.max_bytes:
+      return
+
+    with self._lock:
+
+      # The owner's devices changed during the lookup, so the body may be stale
+      if self._generations.get(owner, 0) != generation:
+        return
+
+      self._discard((owner, key))
+      self._entries[(owner, key)] = body
+      self._owner_keys.setdefault(owner, set()).add(key)
+      self.size += cost
+
+      while self.size > self.max_bytes:
+        oldest = next(iter(self._entries))
+        self._discard(oldest)
+
+
+  def _discard(self, entry_key: tuple):
+    body = self._entries.pop(entry_key, None)
+    if body is None:
+      return
+
+    owner, key = entry_key
+    self.size -= len(body) + ENTRY_OVERHEAD
+    keys = self._owner_keys[owner]
+    keys.discard(key)
+    if not keys:
+      del self._owner_keys[owner]
+
+
+  def invalidate(self, owner: str):
+    with self._lock:
+      self._generations[owner] = self._generations.get(owner, 0) + 1
+      for key in list(self._owner_keys.get(owner, ())):
+        self._discard((owner, key))
+
+
+  def inserted(self, device_id: int, device: dict):
+    self.invalidate(device['owner'])
+
+
+  def updated(self, device_id: int, before: dict, after: dict):
+    self.invalidate(after['owner'])
+
+
+  def removed(self, device_id: int, device: dict):
+    self.invalidate(device['owner'])
+
+
+# --------------------------------------------------------------------------------
+# Class: ResponseLengths
+# --------------------------------------------------------------------------------
+
+class ResponseLengths:
+  """
+  Maps each device and kind of response, like 'device' or 'report', to its length in bytes.
+  Lengths are kept for the device's current version, so updates make old ones miss.
+  """
+
+  def __init__(self):
+    self._lock = threading.Lock()
+    self._lengths = dict()
+
+
+  def get(self, kind: str, device_id: int, version: int):
+    with self._lock:
+      entry = self._lengths.get(device_id, {}).get(kind)
+    if entry is None or entry[0] != version:
+      return None
+    return entry[1]
+
+
+  def put(self, kind: str, device_id: int, version: int, length: int):
+    with self._lock:
+      self._lengths.setdefault(device_id, dict())[kind] = (version, length)
+
+
+  def discard(self, device_id: int):
+    with self._lock:
+      self._lengths.pop(device_id, None)
+
+
+  def inserted(self, device_id: int, device: dict):
+    pass
+
+
+  def updated(self, device_id: int, before: dict, after: dict):
+    self.discard(device_id)
+
+
+  def removed(self, device_id: int, device: dict):
+    self.discard(device_id)
+
+
+# --------------------------------------------------------------------------------
+# Registration
+# --------------------------------------------------------------------------------
+
+response_cache = listen(ResponseCache(config['cache']['max_bytes']))
+response_lengths = listen(ResponseLengths())
@@ -0,0 +1,136 @@
+"""
+This module records a change feed of device mutations for incremental sync.
+Every mutation gets a sequence number that only ever increases.
+Each owner's log is compacted to the latest change per device,
+and delete tombstones are dropped after the retention window.
+Clients that ask for changes older than dropped tombstones must resync.
+"""
+
+# --------------------------------------------------------------------------------
+# Imports
+# --------------------------------------------------------------------------------
+
+import time
+
+from collections import OrderedDict, deque
+
+from . import config
+from .indexes import listen
+
+
+# --------------------------------------------------------------------------------
+# Change Actions
+# --------------------------------------------------------------------------------
+
+# Creates and updates are both upserts, since compaction merges them.
+UPSERT = 'upsert'
+DELETE = 'delete'
+
+
+# --------------------------------------------------------------------------------
+# Class: ChangeFeed
+# --------------------------------------------------------------------------------
+
+class _OwnerLog:
+
+  def __init__(self, horizon: int):
+    # Device ID -> (seq, action), ordered by seq
+    self.entries = OrderedDict()
+    # Clients that synced before this seq may have missed dropped tombstones
+    self.horizon = horizon
+
+
+class ChangeFeed:
+
+  def __init__(self, retention_seconds: float):
+    self.retention_seconds = retention_seconds
+
+    # Sequence numbers start from the clock so they keep rising across restarts.
+    # Anything older than the starting point belongs to a previous run.
+    self.start_seq = time.time_ns() // 1000
+    self.seq = self.start_seq
+
+    self._owners = dict()
+    self._tombstones = deque()
+
+
+  def __len__(self):
+    # Number of changes retained, one per changed device
+    return sum(len(log.entries) for log in self._owners.values())
+
+
+  def _record(self, owner: str, device_id: int, action: str):
+    self.seq += 1
+    if owner not in self._owners:
+      self._owners[owner] = _OwnerLog(self.start_seq)
+    log = self._owners[owner]
+    log.entries[device_id] = (self.seq, action)
+    log.entries.move_to_end(device_id)
+
+    if action == DELETE:
+      # Wall-clock time, since the feed can be saved in a snapshot and restored
+      self._tombstones.append((time.time(), owner, device_id, self.seq))
+
+    self.compact()
+
+
+  def compact(self):
+    cutoff = time.time() - self.retention_seconds
+
+    while self._tombstones and self._tombstones[0][0] < cutoff:
+      _, owner, device_id, seq = self._tombstones.popleft()
+      log = self._owners[owner]
+
+      # The tombstone may already be replaced by a later change
+      if log.entries.get(device_id) == (seq, DELETE):
+        del log.entries[device_id]
+      log.horizon = max(log.horizon, seq)
+
+
+  def inserted(self, device_id: int, device: dict):
+    self._record(device['owner'], device_id, UPSERT)
+
+
+  def updated(self, device_id: int, before: dict, after: dict):
+    self._record(after['owner'], device_id, UPSERT)
+
+
+  def removed(self, device_id: int, device: dict):
+    self._record(device['owner'], device_id, DELETE)
+
+
+  def since(self, owner: str, seq: int):
+    """
+    Returns the owner's changes after a sequence number as (seq, action, id), oldest first.
+    A sequence number of 0 returns every change still retained.
+    Returns None if the client must resync because changes were dropped.
+    """
+
+    self.compact()
+    log = self._owners.get(owner) or _OwnerLog(self.start_seq)
+
+    if seq != 0 and (seq < log.horizon or seq > self.seq):
+      return None
+
+    changes = []
+    for device_id in reversed(log.entries):
+      change_seq, action = log.entries[device_id]
+      if change_seq <= seq:
+        break
+      changes.append((change_seq, action, device_id))
+
+    changes.reverse()
+    return changes
+
+
+# --------------------------------------------------------------------------------
+# Feed Registration
+# --------------------------------------------------------------------------------
+
+change_feed = listen(
+  ChangeFeed(config['changes']['retention_seconds']),
+  replay=True,
+  name='changes')
+
+# A feed restored from a snapshot keeps its old setting, so apply the current one
+change_feed.retention_seconds = config['changes']['retention_seconds']
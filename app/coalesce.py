@@ -0,0 +1,97 @@
+"""
+This module coalesces identical concurrent reads into a single lookup.
+The first request for a key runs the lookup, and the others wait for its result.
+Writes detach an owner's in-flight lookups,
+so requests arriving after a write start a fresh lookup instead of sharing a stale one.
+"""
+
+# --------------------------------------------------------------------------------
+# Imports
+# --------------------------------------------------------------------------------
+
+import threading
+
+from .indexes import listen
+
+
+# --------------------------------------------------------------------------------
+# Class: SingleFlight
+# --------------------------------------------------------------------------------
+
+class _Flight:
+  __slots__ = ('done', 'result', 'error')
+
+  def __init__(self):
+    self.done = threading.Event()
+    self.result = None
+    self.error = None
+
+
+class SingleFlight:
+
+  def __init__(self):
+    self._lock = threading.Lock()
+    self._owners = dict()
+
+
+  def do(self, owner: str, key: tuple, lookup):
+    """
+    Returns the result of `lookup()`, sharing it with concurrent calls for the same key.
+    Exceptions raised by the lookup are raised for every caller.
+    """
+
+    with self._lock:
+      flights = self._owners.setdefault(owner, dict())
+      flight = flights.get(key)
+      leader = flight is None
+      if leader:
+        flight = flights[key] = _Flight()
+
+    if not leader:
+      flight.done.wait()
+      if flight.error is not None:
+        raise flight.error
+      return flight.result
+
+    try:
+      flight.result = lookup()
+      return flight.result
+    except Exception as error:
+      flight.error = error
+      raise
+    finally:
+      self._finish(owner, key, flight)
+      flight.done.set()
+
+
+  def _finish(self, owner: str, key: tuple, flight: _Flight):
+    with self._lock:
+      flights = self._owners.get(owner)
+      if flights is not None and flights.get(key) is flight:
+        del flights[key]
+        if not flights:
+          del self._owners[owner]
+
+
+  def invalidate(self, owner: str):
+    with self._lock:
+      self._owners.pop(owner, None)
+
+
+  def inserted(self, device_id: int, device: dict):
+    self.invalidate(device['owner'])
+
+
+  def updated(self, device_id: int, before: dict, after: dict):
+    self.invalidate(after['owner'])
+
+
+  def removed(self, device_id: int, device: dict):
+    self.invalidate(device['owner'])
+
+
+# --------------------------------------------------------------------------------
+# Registration
+# --------------------------------------------------------------------------------
+
+single_flight = listen(SingleFlight())
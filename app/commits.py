@@ -0,0 +1,179 @@
+"""
+This module coalesces concurrent writes into shared storage flushes.
+Each mutation is applied in memory and then waits until a flush makes it durable.
+The first waiter leads the next flush and briefly waits for other writes in progress to join it,
+so one file write commits a whole batch of mutations.
+A lone write does not wait, since nothing could join its batch.
+Every waiter in a batch gets a `FlushError` if the flush fails.
+By then the mutations are visible to readers and listeners, and they are not rolled back,
+so the error means they are not durable yet, not that they did not happen.
+The next successful flush writes them, unless the process stops first.
+"""
+
+# --------------------------------------------------------------------------------
+# Imports
+# --------------------------------------------------------------------------------
+
+import threading
+import time
+
+from collections import deque
+from contextlib import contextmanager
+
+
+# --------------------------------------------------------------------------------
+# Class: FlushError
+# --------------------------------------------------------------------------------
+
+class FlushError(Exception):
+  """
+  Raised to each writer whose mutation was applied in memory but could not be written to disk.
+  The cause is the storage's original error.
+  """
+
+
+# --------------------------------------------------------------------------------
+# Class: GroupCommit
+# --------------------------------------------------------------------------------
+
+class GroupCommit:
+  """
+  Commits mutations to one storage in batches.
+  `lock` must be the lock that guards the storage's in-memory data.
+  Call `enter()` before taking it for a mutation, `record()` while still holding it afterward,
+  and then `wait()` with the returned ticket after releasing it.
+  The storage must count its writes in `writes`, so only mutations that wrote get tickets.
+  """
+
+  def __init__(self, storage, lock, window_seconds: float, max_batch: int):
+    self.storage = storage
+    self.lock = lock
+    self.window_seconds = window_seconds
+    self.max_batch = max_batch
+
+    # Mutations applied in memory, and how many of those are durable
+    self.applied = 0
+    self.durable = 0
+    self.flushes = 0
+
+    # Durations of recent flushes, in seconds
+    self.flush_seconds = deque(maxlen=256)
+
+    self._condition = threading.Condition()
+    self._active = 0
+    self._flushing = False
+    self._failed_through = 0
+    self._error = None
+
+
+  def enter(self):
+    with self._condition:
+      self._active += 1
+
+
+  def record(self, writes: int):
+    """
+    Ends a mutation started with `enter()`.
+    `writes` is the storage's write count from when the mutation took the lock.
+    Returns a ticket for it, or None if it wrote nothing that needs a flush.
+    """
+
+    with self._condition:
+      self._active -= 1
+      ticket = None
+
+      # Other mutations may have left the storage dirty, but their writers wait for them
+      if self.storage.writes != writes and self.storage.dirty:
+        self.applied += 1
+        ticket = self.applied
+
+      # Wakes a leader that is waiting for this write to join its batch
+      self._condition.notify_all()
+      return ticket
+
+
+  def wait(self, ticket: int):
+    """
+    Blocks until the mutation with the ticket is durable.
+    Raises `FlushError` if its batch failed, in which case the mutation stays applied.
+    """
+
+    with self._condition:
+      while True:
+        if self.durable >= ticket:
+          return
+        if self._failed_through >= ticket:
+          raise FlushError('The mutation was applied but is not durable yet') from self._error
+        if not self._flushing:
+          break
+        self._condition.wait()
+
+      # This waiter leads the next flush.
+      # Writes in progress may join until the window closes or the batch is full.
+      self._flushing = True
+      deadline = time.monotonic() + self.window_seconds
+      while self._active > 0 and self.applied - self.durable < self.max_batch:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+          break
+        self._condition.wait(remaining)
+
+    self._flush(ticket)
+
+
+  def _flush(self, ticket: int):
+    seq = ticket
+
+    try:
+      # Copy the data under the lock, then write it without holding the lock
+      with self.lock:
+        seq = self.applied
+        data = self.storage.snapshot()
+      start = time.perf_counter()
+      self.storage.write_snapshot(data)
+      self.flush_seconds.append(time.perf_counter() - start)
+
+    except Exception as error:
+      with self.lock:
+        # The data is still in memory, so a later flush writes it again
+        self.storage.dirty = True
+      with self._condition:
+        self._failed_through = seq
+        self._error = error
+        self._flushing = False
+        self._condition.notify_all()
+      raise FlushError('The mutation was applied but is not durable yet') from error
+
+    with self._condition:
+      self.durable = max(self.durable, seq)
+      self.flushes += 1
+      self._flushing = False
+      self._condition.notify_all()
+
+
+  @contextmanager
+  def exclusive(self):
+    """
+    Holds off every other flush, so the storage's file changes only through the caller.
+    Call `mark_durable()` with `applied`, read under the lock, after writing the data yourself.
+    Waiting writers lead the next flush once the block ends.
+    """
+
+    with self._condition:
+      while self._flushing:
+        self._condition.wait()
+      self._flushing = True
+
+    try:
+      yield
+    finally:
+      with self._condition:
+        self._flushing = False
+        self._condition.notify_all()
+
+
+  def mark_durable(self, seq: int):
+    with self._condition:
+      self.durable = max(self.durable, seq)
+      self.flushes += 1
+      self._condition.notify_all()
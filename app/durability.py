@@ -0,0 +1,126 @@
+"""
+This module writes registry files atomically with a configurable fsync policy.
+Every write goes to a temporary file that then replaces the registry,
+so a process crash never leaves a truncated or half-written registry behind.
+The durability mode decides when written data is forced to disk:
+
+* 'fsync': the file and its directory entry before every write returns,
+  so acknowledged writes survive power loss
+* 'interval': the file and its directory entry in the background, so writes never wait for the disk,
+  but power loss may undo the last few seconds of writes,
+  and on filesystems that do not write data before renames, may leave the newest registry incomplete
+* 'buffered': whenever the operating system decides, which is fastest,
+  but power loss may leave an empty or partly written registry on some filesystems
+"""
+
+# --------------------------------------------------------------------------------
+# Imports
+# --------------------------------------------------------------------------------
+
+import os
+import threading
+import time
+
+
+# --------------------------------------------------------------------------------
+# Durability Modes
+# --------------------------------------------------------------------------------
+
+FSYNC = 'fsync'
+INTERVAL = 'interval'
+BUFFERED = 'buffered'
+
+DURABILITY_MODES = (FSYNC, INTERVAL, BUFFERED)
+
+
+def fsync_file(path: str):
+  """
+  Forces a file's data to disk.
+  """
+
+  with open(path, 'rb') as synced:
+    os.fsync(synced.fileno())
+
+
+def fsync_directory(path: str):
+  """
+  Forces the directory entry of a renamed file to disk.
+  """
+
+  # Some platforms cannot open directories, and there is nothing more to do there
+  try:
+    directory = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+  except OSError:
+    return
+  try:
+    os.fsync(directory)
+  finally:
+    os.close(directory)
+
+
+# --------------------------------------------------------------------------------
+# Class: Durability
+# --------------------------------------------------------------------------------
+
+class Durability:
+
+  def __init__(self, mode: str = FSYNC, interval_seconds: float = 1.0):
+    if mode not in DURABILITY_MODES:
+      raise ValueError(f"Unknown durability mode: '{mode}'")
+
+    self.mode = mode
+    self.interval_seconds = interval_seconds
+
+    self._lock = threading.Lock()
+    self._pending = set()
+    self._thread = None
+
+
+  def write(self, path: str, raw: bytes):
+    temp_path = path + '.tmp'
+    with open(temp_path, 'wb') as registry:
+      registry.write(raw)
+
+      # Otherwise power loss after the rename could leave the registry empty
+      if self.mode == FSYNC:
+        registry.flush()
+        os.fsync(registry.fileno())
+
+    os.replace(temp_path, path)
+
+    if self.mode == FSYNC:
+      fsync_directory(path)
+    elif self.mode == INTERVAL:
+      self._schedule(path)
+
+
+  def sync(self):
+    """
+    Forces files written since the last sync to disk, and then their directory entries.
+    """
+
+    with self._lock:
+      paths, self._pending = self._pending, set()
+
+    # Each path now names its newest file, so one sync covers all of its writes since the last one
+    for path in paths:
+      fsync_file(path)
+      fsync_directory(path)
+
+
+  def _schedule(self, path: str):
+    with self._lock:
+      self._pending.add(path)
+      if self._thread is None:
+        self._thread = threading.Thread(target=self._run, name='fsync', daemon=True)
+        self._thread.start()
+
+
+  def _run(self):
+    while True:
+      time.sleep(self.interval_seconds)
+      try:
+        self.sync()
+      except OSError:
+        # Keep syncing later writes even if one sync fails
+        pass
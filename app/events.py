@@ -0,0 +1,174 @@
+"""
+This module publishes live device events to Server-Sent Events subscribers.
+Mutations happen in worker threads, so events are handed to each
+subscriber's event loop without blocking the writer.
+Each subscriber has a bounded queue.
+A subscriber that falls too far behind is told to resync and is disconnected.
+"""
+
+# --------------------------------------------------------------------------------
+# Imports
+# --------------------------------------------------------------------------------
+
+import asyncio
+import json
+import threading
+
+from . import config
+from .changes import change_feed
+from .indexes import listen
+
+
+# --------------------------------------------------------------------------------
+# Event Types
+# --------------------------------------------------------------------------------
+
+CREATE = 'create'
+UPDATE = 'update'
+DELETE = 'delete'
+RESYNC = 'resync'
+
+
+def format_event(event: str, data: dict, event_id: int | None = None):
+  lines = []
+  if event_id is not None:
+    lines.append(f'id: {event_id}')
+  lines.append(f'event: {event}')
+  lines.append(f'data: {json.dumps(data)}')
+  return '\n'.join(lines) + '\n\n'
+
+
+KEEPALIVE = ': keepalive\n\n'
+
+
+def _with_id(device_id: int, device: dict):
+  # Versions are sent in ETag headers, not in device bodies
+  data = {key: value for key, value in device.items() if key != 'version'}
+  data['id'] = device_id
+  return data
+
+
+# --------------------------------------------------------------------------------
+# Class: Subscriber
+# --------------------------------------------------------------------------------
+
+class Subscriber:
+  __slots__ = ('owner', 'loop', 'queue', 'overflowed')
+
+  def __init__(self, owner: str, queue_size: int):
+    self.owner = owner
+    self.loop = asyncio.get_running_loop()
+    self.queue = asyncio.Queue(queue_size)
+    self.overflowed = False
+
+
+  def put(self, message: str):
+    # Runs on the subscriber's event loop
+    if self.overflowed:
+      return
+    try:
+      self.queue.put_nowait(message)
+    except asyncio.QueueFull:
+      self.overflowed = True
+
+
+  async def get(self, timeout: float):
+    """
+    Waits for the next message, returning None if the timeout passes first.
+    """
+
+    try:
+      return await asyncio.wait_for(self.queue.get(), timeout)
+    except asyncio.TimeoutError:
+      return None
+
+
+# --------------------------------------------------------------------------------
+# Class: EventHub
+# --------------------------------------------------------------------------------
+
+class EventHub:
+
+  def __init__(self, queue_size: int):
+    self.queue_size = queue_size
+    self._lock = threading.Lock()
+    self._owners = dict()
+
+
+  def subscribe(self, owner: str):
+    subscriber = Subscriber(owner, self.queue_size)
+    with self._lock:
+      self._owners.setdefault(owner, set()).add(subscriber)
+    return subscriber
+
+
+  def unsubscribe(self, subscriber: Subscriber):
+    with self._lock:
+      subscribers = self._owners.get(subscriber.owner)
+      if subscribers is not None:
+        subscribers.discard(subscriber)
+        if not subscribers:
+          del self._owners[subscriber.owner]
+
+
+  def publish(self, owner: str, event: str, device_id: int, device: dict | None):
+    with self._lock:
+      subscribers = tuple(self._owners.get(owner, ()))
+    if not subscribers:
+      return
+
+    # Format once and share the same message with every subscriber
+    data = {'id': device_id, 'device': device}
+    message = format_event(event, data, change_feed.seq)
+
+    for subscriber in subscribers:
+      try:
+        subscriber.loop.call_soon_threadsafe(subscriber.put, message)
+      except RuntimeError:
+        # The subscriber's loop has already closed
+        self.unsubscribe(subscriber)
+
+
+  def inserted(self, device_id: int, device: dict):
+    self.publish(device['owner'], CREATE, device_id, _with_id(device_id, device))
+
+
+  def updated(self, device_id: int, before: dict, after: dict):
+    self.publish(after['owner'], UPDATE, device_id, _with_id(device_id, after))
+
+
+  def removed(self, device_id: int, device: dict):
+    self.publish(device['owner'], DELETE, device_id, None)
+
+
+# --------------------------------------------------------------------------------
+# Hub Registration
+# --------------------------------------------------------------------------------
+
+# Registered after the change feed, so event IDs match change feed sequence numbers
+event_hub = listen(EventHub(config['events']['queue_size']))
+
+
+async def stream_events(subscriber: Subscriber):
+  """
+  Yields Server-Sent Events for a subscriber until it disconnects or falls behind.
+  Idle streams only wake up to send keepalive comments.
+  """
+
+  keepalive = config['events']['keepalive_seconds']
+
+  try:
+    while True:
+      message = await subscriber.get(keepalive)
+
+      if subscriber.overflowed:
+        # Queued events are stale, so the client resumes from its last event ID instead
+        yield format_event(RESYNC, {})
+        break
+      elif message is None:
+        yield KEEPALIVE
+      else:
+        yield message
+
+  finally:
+    event_hub.unsubscribe(subscriber)
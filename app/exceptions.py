@@ -26,3 +26,30 @@ class ForbiddenException(HTTPException):
 class NotFoundException(HTTPException):
   def __init__(self):
     super().__init__(status.HTTP_404_NOT_FOUND, "Not Found")
+
+
+class ConflictException(HTTPException):
+  def __init__(self):
+    super().__init__(status.HTTP_409_CONFLICT, "Conflict")
+
+
+class ResyncRequiredException(HTTPException):
+  def __init__(self):
+    super().__init__(status.HTTP_410_GONE, "Resync Required")
+
+
+class PreconditionFailedException(HTTPException):
+  def __init__(self):
+    super().__init__(status.HTTP_412_PRECONDITION_FAILED, "Precondition Failed")
+
+
+class TooManyRequestsException(HTTPException):
+  def __init__(self, retry_after: int):
+    headers = {"Retry-After": str(retry_after)}
+    super().__init__(status.HTTP_429_TOO_MANY_REQUESTS, "Too Many Requests", headers)
+
+
+class ServiceUnavailableException(HTTPException):
+  def __init__(self, retry_after: int):
+    headers = {"Retry-After": str(retry_after)}
+    super().__init__(status.HTTP_503_SERVICE_UNAVAILABLE, "Service Unavailable", headers)
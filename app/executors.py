@@ -0,0 +1,166 @@
+"""
+This module runs heavy endpoints in named executors instead of the default threadpool.
+Each executor has its own thread limit and queue limit from the `executors` config,
+so slow reports and listings cannot take the threads that quick lookups need.
+Requests that would wait behind a full queue get 503 instead.
+Streamed exports read each chunk in their executor too, so long downloads stay within its limit.
+Every executor keeps its recent queue times, so saturation shows up before rejections do.
+"""
+
+# --------------------------------------------------------------------------------
+# Imports
+# --------------------------------------------------------------------------------
+
+import functools
+import time
+
+from collections import deque
+
+from . import config
+from .exceptions import ServiceUnavailableException
+from .health import milliseconds, percentile
+from .limits import limits
+from .profiling import profile_endpoint
+from anyio import CapacityLimiter, to_thread
+
+
+# --------------------------------------------------------------------------------
+# Globals
+# --------------------------------------------------------------------------------
+
+QUEUE_TIME_SAMPLES = 1024
+
+# Returned by `next()` when an iterator is exhausted
+_DONE = object()
+
+
+# --------------------------------------------------------------------------------
+# Class: Executor
+# --------------------------------------------------------------------------------
+
+class Executor:
+  """
+  Runs sync functions in worker threads, at most `threads` at a time.
+  Up to `max_queue` more may wait for a thread.
+  The counters are only changed on the event loop, so they need no locks.
+  """
+
+  def __init__(self, name: str, threads: int, max_queue: int):
+    self.name = name
+    self.max_queue = max_queue
+    self.limiter = CapacityLimiter(threads)
+
+    # Calls running or waiting for a thread
+    self.pending = 0
+    self.completed = 0
+    self.rejected = 0
+
+    # Seconds each recent call waited for a thread
+    self.queue_seconds = deque(maxlen=QUEUE_TIME_SAMPLES)
+
+
+  async def run(self, func, *args, **kwargs):
+    if self.pending >= self.limiter.total_tokens + self.max_queue:
+      self.rejected += 1
+      raise ServiceUnavailableException(limits['retry_after_seconds'])
+
+    self.pending += 1
+    submitted = time.perf_counter()
+
+    def timed_call():
+      self.queue_seconds.append(time.perf_counter() - submitted)
+      return func(*args, **kwargs)
+
+    try:
+      return await to_thread.run_sync(timed_call, limiter=self.limiter)
+    finally:
+      self.pending -= 1
+      self.completed += 1
+
+
+  async def iterate(self, iterator):
+    """
+    Yields the items of a sync iterator, reading each one in a worker thread.
+    Items are never rejected, since the response has already started.
+    The iterator is closed when iteration ends, even early.
+    """
+
+    try:
+      while True:
+        self.pending += 1
+        try:
+          item = await to_thread.run_sync(next, iterator, _DONE, limiter=self.limiter)
+        finally:
+          self.pending -= 1
+        if item is _DONE:
+          return
+        yield item
+    finally:
+      if hasattr(iterator, 'close'):
+        iterator.close()
+
+
+  def statistics(self):
+    statistics = self.limiter.statistics()
+    queue_seconds = tuple(self.queue_seconds)
+
+    return {
+      'name': self.name,
+      'threads': int(statistics.total_tokens),
+      'busy_threads': statistics.borrowed_tokens,
+      'queued': max(0, self.pending - statistics.borrowed_tokens),
+      'max_queue': self.max_queue,
+      'completed': self.completed,
+      'rejected': self.rejected,
+      'queue_p50_ms': milliseconds(percentile(queue_seconds, 0.5)),
+      'queue_p99_ms': milliseconds(percentile(queue_seconds, 0.99)),
+    }
+
+
+# --------------------------------------------------------------------------------
+# Endpoint Decorators
+# --------------------------------------------------------------------------------
+
+def run_in(name: str):
+  """
+  Makes a sync endpoint run in the named executor.
+  Put it below the route decorators, so the route gets the wrapped endpoint.
+  """
+
+  executor = executors[name]
+
+  def decorator(endpoint):
+
+    # The route sees a coroutine and will not profile it, so the sync function is profiled here
+    profiled = profile_endpoint(endpoint)
+
+    @functools.wraps(endpoint)
+    async def executor_endpoint(*args, **kwargs):
+      return await executor.run(profiled, *args, **kwargs)
+
+    return executor_endpoint
+
+  return decorator
+
+
+def stream_in(name: str, iterator):
+  """
+  Returns an async iterator over a sync one, for a streaming response body.
+  Each item is read in the named executor instead of the default threadpool.
+  """
+
+  return executors[name].iterate(iterator)
+
+
+def get_statistics():
+  return [executor.statistics() for executor in executors.values()]
+
+
+# --------------------------------------------------------------------------------
+# Registration
+# --------------------------------------------------------------------------------
+
+executors = {
+  name: Executor(name, options['threads'], options['max_queue'])
+  for name, options in config['executors'].items()
+}
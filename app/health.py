@@ -0,0 +1,263 @@
+"""
+This module samples the health of the running service in the background.
+An asyncio task measures event-loop lag and threadpool saturation,
+and a daemon thread probes the registry files and collects sizes and counters.
+Both keep only their latest sample, so reporting health costs a dictionary copy.
+The probe thread is separate from the threadpool so a saturated pool cannot delay it.
+"""
+
+# --------------------------------------------------------------------------------
+# Imports
+# --------------------------------------------------------------------------------
+
+import asyncio
+import os
+import threading
+import time
+
+from collections import deque
+
+from . import config, db, indexes
+from .cache import response_cache
+from .limits import get_counters
+from .mapped import DocumentCache
+from anyio.to_thread import current_default_thread_limiter
+
+
+# --------------------------------------------------------------------------------
+# Globals
+# --------------------------------------------------------------------------------
+
+PROBE_BYTES = 4096
+
+health = config['health']
+
+
+# --------------------------------------------------------------------------------
+# Statistics Functions
+# --------------------------------------------------------------------------------
+
+def percentile(samples: list, fraction: float):
+  if not samples:
+    return 0.0
+  ordered = sorted(samples)
+  return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def hit_ratio(hits: int, misses: int):
+  lookups = hits + misses
+  return round(hits / lookups, 4) if lookups else None
+
+
+def milliseconds(seconds: float):
+  return round(seconds * 1000, 3)
+
+
+# --------------------------------------------------------------------------------
+# Class: LatencyWindow
+# --------------------------------------------------------------------------------
+
+class LatencyWindow:
+  """
+  Keeps the latencies of the most recent requests, up to a count and an age.
+  Appending to a deque is atomic, so requests record without a lock.
+  """
+
+  def __init__(self, size: int, max_age_seconds: float):
+    self.max_age_seconds = max_age_seconds
+    self._samples = deque(maxlen=size)
+
+
+  def record(self, seconds: float):
+    self._samples.append((time.monotonic(), seconds))
+
+
+  def recent(self):
+    cutoff = time.monotonic() - self.max_age_seconds
+    return [seconds for recorded, seconds in tuple(self._samples) if recorded >= cutoff]
+
+
+# --------------------------------------------------------------------------------
+# Class: RequestTimer
+# --------------------------------------------------------------------------------
+
+class RequestTimer:
+  """
+  ASGI middleware that records how long each HTTP request takes to start its response.
+  Streaming bodies, like backups and event streams, are not counted past their first byte.
+  """
+
+  def __init__(self, app, window: LatencyWindow):
+    self.app = app
+    self.window = window
+
+
+  async def __call__(self, scope, receive, send):
+    if scope['type'] != 'http':
+      return await self.app(scope, receive, send)
+
+    start = time.perf_counter()
+
+    async def timed_send(message):
+      if message['type'] == 'http.response.start':
+        self.window.record(time.perf_counter() - start)
+      await send(message)
+
+    await self.app(scope, receive, timed_send)
+
+
+# --------------------------------------------------------------------------------
+# Class: HealthSampler
+# --------------------------------------------------------------------------------
+
+class HealthSampler:
+  """
+  Samples service health every `interval_seconds` while the app runs.
+  Call `start()` from the event loop at startup and `stop()` at shutdown.
+  """
+
+  def __init__(self, interval_seconds: float, latencies: LatencyWindow):
+    self.interval_seconds = interval_seconds
+    self.latencies = latencies
+
+    # Each sampler replaces its own keys with every sample
+    self.latest = dict()
+
+    self._stopped = threading.Event()
+    self._thread = None
+    self._task = None
+
+
+  def start(self):
+    self._stopped.clear()
+    self.sample_loop(0.0)
+    self.sample_registry()
+
+    self._task = asyncio.get_running_loop().create_task(self._run_loop_sampler())
+    self._thread = threading.Thread(target=self._run_registry_sampler, name='health-sampler', daemon=True)
+    self._thread.start()
+
+
+  def stop(self):
+    self._stopped.set()
+    if self._task is not None:
+      self._task.cancel()
+    if self._thread is not None:
+      self._thread.join(timeout=self.interval_seconds * 2)
+
+
+  async def _run_loop_sampler(self):
+    loop = asyncio.get_running_loop()
+    while True:
+      start = loop.time()
+      await asyncio.sleep(self.interval_seconds)
+
+      # The sleep ends late by however long other callbacks held the loop
+      self.sample_loop(max(0.0, loop.time() - start - self.interval_seconds))
+
+
+  def sample_loop(self, lag_seconds: float):
+    statistics = current_default_thread_limiter().statistics()
+
+    self.latest['loop'] = {
+      'lag_ms': milliseconds(lag_seconds),
+      'sampled_at': time.time(),
+    }
+    self.latest['threadpool'] = {
+      'busy_threads': statistics.borrowed_tokens,
+      'total_threads': int(statistics.total_tokens),
+      'waiting': statistics.tasks_waiting,
+    }
+
+
+  def _run_registry_sampler(self):
+    while not self._stopped.wait(self.interval_seconds):
+      try:
+        self.sample_registry()
+      except Exception:
+        # A failed sample leaves the previous one to go stale, which marks the service unhealthy
+        pass
+
+
+  def probe_storage(self):
+    # Reads the head of each shard file, which is what a cold read would wait for
+    slowest = 0.0
+    size_bytes = 0
+    for path in db.paths:
+      start = time.perf_counter()
+      with open(path, 'rb') as registry:
+        registry.read(PROBE_BYTES)
+        size_bytes += os.fstat(registry.fileno()).st_size
+      slowest = max(slowest, time.perf_counter() - start)
+    return slowest, size_bytes
+
+
+  def sample_registry(self):
+    probe_seconds, size_bytes = self.probe_storage()
+
+    flush_seconds = [seconds for commit in db.commits for seconds in tuple(commit.flush_seconds)]
+    document_caches = [
+      shard.storage.cache for shard in db.shards
+      if isinstance(shard.storage.cache, DocumentCache)
+    ]
+    latencies = self.latencies.recent()
+
+    self.latest['registry'] = {
+      'probe_ms': milliseconds(probe_seconds),
+      'devices': len(db),
+      'size_bytes': size_bytes,
+      'shards': db.count,
+      'pending_writes': sum(commit.applied - commit.durable for commit in db.commits),
+      'flush_p99_ms': milliseconds(percentile(flush_seconds, 0.99)),
+      'indexes': indexes.sizes(),
+      'sampled_at': time.time(),
+    }
+    self.latest['caches'] = {
+      'responses': hit_ratio(response_cache.hits, response_cache.misses),
+      'documents': hit_ratio(
+        sum(cache.hits for cache in document_caches),
+        sum(cache.misses for cache in document_caches)),
+    }
+    self.latest['requests'] = {
+      'count': len(latencies),
+      'p50_ms': milliseconds(percentile(latencies, 0.5)),
+      'p99_ms': milliseconds(percentile(latencies, 0.99)),
+      **get_counters(),
+    }
+
+
+  def report(self):
+    """
+    Returns the latest samples with whether the service is healthy, and why not if it is not.
+    """
+
+    latest = dict(self.latest)
+    reasons = []
+
+    now = time.time()
+    max_age = self.interval_seconds * health['stale_intervals']
+    for name in ('loop', 'registry'):
+      if name not in latest:
+        reasons.append(f'{name} has not been sampled')
+      elif now - latest[name]['sampled_at'] > max_age:
+        reasons.append(f'{name} samples are stale')
+
+    checks = [
+      (latest.get('loop', {}).get('lag_ms', 0), health['max_loop_lag_ms'], 'event loop lag'),
+      (latest.get('threadpool', {}).get('waiting', 0), health['max_threadpool_waiting'], 'threadpool queue'),
+      (latest.get('registry', {}).get('probe_ms', 0), health['max_probe_ms'], 'storage probe latency'),
+      (latest.get('requests', {}).get('p99_ms', 0), health['max_p99_ms'], 'request p99 latency'),
+    ]
+    for value, limit, name in checks:
+      if value > limit:
+        reasons.append(f'{name} is {value}, over the limit of {limit}')
+
+    return {'healthy': not reasons, 'reasons': reasons, **latest}
+
+
+# --------------------------------------------------------------------------------
+# Registration
+# --------------------------------------------------------------------------------
+
+request_latencies = LatencyWindow(health['latency_window'], health['latency_window_seconds'])
+sampler = HealthSampler(health['sample_seconds'], request_latencies)
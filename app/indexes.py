@@ -0,0 +1,200 @@
+"""
+This module keeps in-memory indexes in step with the device database.
+Indexes are built once from the database when they are registered.
+After that, every insert, update, and remove must be reported here.
+Listeners are also told about each mutation, in the order they happen.
+
+Named indexes and listeners are saved to a snapshot file next to the registry
+when the app shuts down, along with each shard's next document ID.
+On startup, they are loaded from the snapshot instead of rebuilt,
+as long as no registry file has changed since the snapshot was saved.
+"""
+
+# --------------------------------------------------------------------------------
+# Imports
+# --------------------------------------------------------------------------------
+
+import os
+import pickle
+import threading
+
+from . import db, db_file
+
+
+# --------------------------------------------------------------------------------
+# Globals
+# --------------------------------------------------------------------------------
+
+# Guards database mutations together with their index updates.
+# Readers take it too so they never see an index that is half updated.
+lock = threading.RLock()
+
+_indexes = []
+_listeners = []
+
+# Named structures that are saved in snapshots
+_structures = dict()
+
+
+# --------------------------------------------------------------------------------
+# Snapshots
+# --------------------------------------------------------------------------------
+
+SNAPSHOT_VERSION = 3
+
+snapshot_path = db_file + '.idx'
+
+
+def _fingerprint():
+  # The registry's generation: any write changes a shard file's size, mtime, or inode
+  fingerprint = []
+  for path in db.paths:
+    stat = os.stat(path)
+    fingerprint.append((path, stat.st_size, stat.st_mtime_ns, stat.st_ino))
+  return fingerprint
+
+
+def _load_snapshot():
+  try:
+    with open(snapshot_path, 'rb') as snapshot_file:
+      snapshot = pickle.load(snapshot_file)
+  except Exception:
+    # A missing, corrupt or incompatible snapshot just means a full rebuild
+    return dict()
+
+  if snapshot.get('version') != SNAPSHOT_VERSION or snapshot.get('fingerprint') != _fingerprint():
+    return dict()
+
+  # Restoring the ID allocators also keeps IDs of deleted devices from being reused
+  db.next_ids = snapshot['next_ids']
+
+  # Structures stay pickled until their modules register them,
+  # since unpickling needs their classes, which are not imported yet
+  return snapshot['structures']
+
+
+def _restore(name: str):
+  try:
+    return pickle.loads(_snapshot.pop(name))
+  except Exception:
+    return None
+
+
+_snapshot = _load_snapshot()
+
+# True if indexes were loaded from a snapshot instead of rebuilt
+warm_start = bool(_snapshot)
+
+
+def save_snapshot():
+  """
+  Saves named indexes and listeners next to the registry file.
+  Call it only after the last write, since any later write makes the snapshot stale.
+  Nothing is saved while a shard has changes that are not in its file yet,
+  since the snapshot would pair the old file with indexes that include the changes.
+  """
+
+  with lock:
+    if any(getattr(shard.storage, 'dirty', False) for shard in db.shards):
+      return
+
+    snapshot = dict(
+      version=SNAPSHOT_VERSION,
+      fingerprint=_fingerprint(),
+      next_ids=list(db.next_ids),
+      structures={
+        name: pickle.dumps(structure, protocol=pickle.HIGHEST_PROTOCOL)
+        for name, structure in _structures.items()
+      },
+    )
+
+    temp_path = snapshot_path + '.tmp'
+    with open(temp_path, 'wb') as snapshot_file:
+      pickle.dump(snapshot, snapshot_file)
+    os.replace(temp_path, snapshot_path)
+
+
+# --------------------------------------------------------------------------------
+# Registration
+# --------------------------------------------------------------------------------
+
+def register(name: str, index):
+  """
+  Builds an index from the current database contents and keeps it updated.
+  An index is any object with `add(device_id, device)` and `discard(device_id, device)`.
+  If the snapshot has an index with the same name, that index is used instead.
+  Callers must use the returned index.
+  """
+
+  with lock:
+    restored = _restore(name) if name in _snapshot else None
+    if restored is not None:
+      index = restored
+    else:
+      for device in db.all():
+        index.add(device.doc_id, device)
+
+    _structures[name] = index
+    _indexes.append(index)
+
+  return index
+
+
+def listen(listener, replay: bool = False, name: str | None = None):
+  """
+  Reports every later mutation to a listener.
+  A listener is any object with `inserted(device_id, device)`,
+  `updated(device_id, before, after)`, and `removed(device_id, device)`.
+  With `replay`, existing devices are first reported as inserts.
+  Named listeners are saved in snapshots, like indexes.
+  Callers must use the returned listener.
+  """
+
+  with lock:
+    restored = _restore(name) if name in _snapshot else None
+    if restored is not None:
+      listener = restored
+    elif replay:
+      for device in db.all():
+        listener.inserted(device.doc_id, device)
+
+    if name is not None:
+      _structures[name] = listener
+    _listeners.append(listener)
+
+  return listener
+
+
+def sizes():
+  """
+  Returns the number of entries in each named index and listener.
+  """
+
+  with lock:
+    return {name: len(structure) for name, structure in _structures.items()}
+
+
+# --------------------------------------------------------------------------------
+# Mutation Hooks
+# --------------------------------------------------------------------------------
+
+def on_insert(device_id: int, device: dict):
+  for index in _indexes:
+    index.add(device_id, device)
+  for listener in _listeners:
+    listener.inserted(device_id, device)
+
+
+def on_update(device_id: int, before: dict, after: dict):
+  for index in _indexes:
+    index.discard(device_id, before)
+    index.add(device_id, after)
+  for listener in _listeners:
+    listener.updated(device_id, before, after)
+
+
+def on_remove(device_id: int, device: dict):
+  for index in _indexes:
+    index.discard(device_id, device)
+  for listener in _listeners:
+    listener.removed(device_id, device)
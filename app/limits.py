@@ -0,0 +1,134 @@
+"""
+This module provides per-user rate limiting and admission control.
+Each user has separate token buckets for reads and writes.
+A global cap on concurrent requests sheds excess load before it reaches the threadpool.
+Both checks run as async dependencies on the event loop, so they need no locks.
+"""
+
+# --------------------------------------------------------------------------------
+# Imports
+# --------------------------------------------------------------------------------
+
+import math
+import time
+
+from collections import Counter
+
+from . import config
+from .auth import get_current_username
+from .exceptions import ServiceUnavailableException, TooManyRequestsException
+from fastapi import Depends, Request
+
+
+# --------------------------------------------------------------------------------
+# Globals
+# --------------------------------------------------------------------------------
+
+READ = 'read'
+WRITE = 'write'
+SHED = 'shed'
+
+READ_METHODS = {'GET', 'HEAD', 'OPTIONS'}
+
+limits = config['limits']
+
+# Counts of rejected requests by reason
+throttled = Counter()
+
+
+# --------------------------------------------------------------------------------
+# Class: TokenBucket
+# --------------------------------------------------------------------------------
+
+class TokenBucket:
+  __slots__ = ('rate', 'capacity', 'tokens', 'updated')
+
+  def __init__(self, rate: float, capacity: float):
+    self.rate = rate
+    self.capacity = capacity
+    self.tokens = capacity
+    self.updated = time.monotonic()
+
+
+  def take(self):
+    """
+    Takes one token, returning 0 on success.
+    Otherwise, returns the seconds to wait until a token is available.
+    """
+
+    now = time.monotonic()
+    self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+    self.updated = now
+
+    if self.tokens >= 1:
+      self.tokens -= 1
+      return 0
+    return (1 - self.tokens) / self.rate
+
+
+_buckets = dict()
+
+
+def _bucket(username: str, kind: str):
+  key = (username, kind)
+  if key not in _buckets:
+    _buckets[key] = TokenBucket(limits[kind]['rate'], limits[kind]['burst'])
+  return _buckets[key]
+
+
+def reset_buckets():
+  """
+  Gives every user a full budget again.
+  """
+
+  _buckets.clear()
+
+
+# --------------------------------------------------------------------------------
+# Dependencies
+# --------------------------------------------------------------------------------
+
+async def limit_rate(request: Request, username: str = Depends(get_current_username)):
+  """
+  Charges the request to the user's read or write budget.
+  Raises 429 with Retry-After when the budget is spent.
+  """
+
+  kind = READ if request.method in READ_METHODS else WRITE
+  wait = _bucket(username, kind).take()
+
+  if wait:
+    throttled[kind] += 1
+    raise TooManyRequestsException(math.ceil(wait))
+
+
+_in_flight = 0
+
+
+async def admit_request():
+  """
+  Admits the request if fewer than the maximum are already running.
+  Raises 503 with Retry-After otherwise.
+  The slot is held until the response is sent.
+  """
+
+  global _in_flight
+
+  if _in_flight >= limits['max_concurrent_requests']:
+    throttled[SHED] += 1
+    raise ServiceUnavailableException(limits['retry_after_seconds'])
+
+  _in_flight += 1
+  try:
+    yield
+  finally:
+    _in_flight -= 1
+
+
+def get_counters():
+  return {
+    'in_flight': _in_flight,
+    'throttled_reads': throttled[READ],
+    'throttled_writes': throttled[WRITE],
+    'shed': throttled[SHED],
+  }
@@ -1,29 +1,78 @@
 """
 This module is the main module for the FastAPI app.
+The OpenAPI schema is rendered once at startup and served from memory.
 """
 
 # --------------------------------------------------------------------------------
 # Imports
 # --------------------------------------------------------------------------------
 
+import json
+
 from fastapi import FastAPI, Request, status as fastapi_status
 from fastapi.exceptions import RequestValidationError
 from fastapi.openapi.utils import get_openapi
 from fastapi.responses import JSONResponse
 
-from .routers import auth, devices, root, status
+from . import db, indexes
+from .assets import REVALIDATE, Asset, asset_response
+from .audit import audit_log
+from .commits import FlushError
+from .health import RequestTimer, request_latencies, sampler
+from .routers import admin, auth, devices, events, root, status
+from .routing import use_indexed_router
 
 
 # --------------------------------------------------------------------------------
 # App Creation
 # --------------------------------------------------------------------------------
 
-app = FastAPI()
+app = use_indexed_router(FastAPI())
+
+# FastAPI's own schema route renders the schema on every request, so it is replaced below
+app.router.routes = [route for route in app.router.routes if getattr(route, 'path', None) != app.openapi_url]
+
+app.include_router(admin.router)
 app.include_router(auth.router)
+app.include_router(events.router)
 app.include_router(devices.router)
 app.include_router(root.router)
 app.include_router(status.router)
 
+app.add_middleware(RequestTimer, window=request_latencies)
+
+
+# --------------------------------------------------------------------------------
+# Lifecycle Events
+# --------------------------------------------------------------------------------
+
+@app.on_event("startup")
+async def start_health_sampler():
+  sampler.start()
+
+
+@app.on_event("shutdown")
+async def stop_health_sampler():
+  sampler.stop()
+
+
+@app.on_event("startup")
+def start_audit_log():
+  audit_log.start()
+
+
+@app.on_event("shutdown")
+def stop_audit_log():
+  audit_log.stop()
+
+
+@app.on_event("shutdown")
+def save_index_snapshot():
+  # Writes shards left dirty by a failed flush first, so the snapshot matches the files.
+  # If that fails, it raises and no snapshot is saved.
+  db.close()
+  indexes.save_snapshot()
+
 
 # --------------------------------------------------------------------------------
 # OpenAPI Customization
@@ -48,6 +97,24 @@ def custom_openapi():
 app.openapi = custom_openapi
 
 
+# --------------------------------------------------------------------------------
+# OpenAPI Serving
+# --------------------------------------------------------------------------------
+
+def render_openapi():
+  # Matches the compact encoding used by JSONResponse
+  schema = json.dumps(app.openapi(), ensure_ascii=False, allow_nan=False, separators=(',', ':'))
+  return schema.encode('utf-8')
+
+
+openapi = Asset(render_openapi(), 'application/json', REVALIDATE)
+
+
+@app.get(app.openapi_url, include_in_schema=False)
+def get_openapi_json(request: Request):
+  return asset_response(request, openapi)
+
+
 # --------------------------------------------------------------------------------
 # Exception Overrides
 # --------------------------------------------------------------------------------
@@ -60,4 +127,17 @@ async def validation_exception_handler(request: Request, exc: RequestValidationE
       "detail": "Unprocessable Entity",
       "specifics": exc.errors(),
     },
-  )
\ No newline at end of file
+  )
+
+
+@app.exception_handler(FlushError)
+async def flush_exception_handler(request: Request, exc: FlushError):
+  # The change already happened in memory, so clients must not treat this as a failed write
+  return JSONResponse(
+    status_code=fastapi_status.HTTP_500_INTERNAL_SERVER_ERROR,
+    content={
+      "detail": "Write Not Durable",
+      "specifics": "The change was applied but could not be saved to disk yet. "
+                   "It is saved by the next successful write, unless the service stops first.",
+    },
+  )
@@ -0,0 +1,269 @@
+"""
+This module provides a read-optimized, memory-mapped registry format.
+The file holds each document as its own JSON blob, followed by a sorted binary
+index of document IDs and offsets for each table.
+Opening the file only maps it into memory, so startup does not parse any documents.
+Documents are decoded one at a time when they are looked up,
+and a bounded LRU cache keeps recently decoded documents.
+Writes rewrite the whole file, so this mode suits read-heavy registries.
+"""
+
+# --------------------------------------------------------------------------------
+# Imports
+# --------------------------------------------------------------------------------
+
+import json
+import mmap
+import os
+import struct
+import threading
+
+from collections import OrderedDict
+from collections.abc import Mapping
+
+from .durability import Durability
+from tinydb.storages import Storage, touch
+
+
+# --------------------------------------------------------------------------------
+# File Layout
+# --------------------------------------------------------------------------------
+
+# Header: magic, directory offset, directory length
+MAGIC = b'DRMMAP01'
+HEADER = struct.Struct('<8sQQ')
+
+# Index entry: document ID, offset, length
+INDEX_ENTRY = struct.Struct('<QQI')
+
+
+def encode_mapped(data: dict):
+  """
+  Serializes database data like {'_default': {'1': {...}}} into the mapped layout.
+  """
+
+  body = bytearray(HEADER.size)
+  directory = dict()
+
+  for name, table in data.items():
+
+    # Documents
+    entries = []
+    for doc_id, document in table.items():
+      raw = json.dumps(dict(document), separators=(',', ':')).encode('utf-8')
+      entries.append((int(doc_id), len(body), len(raw)))
+      body += raw
+
+    # Index, sorted by document ID for binary search
+    entries.sort()
+    directory[name] = [len(body), len(entries)]
+    for entry in entries:
+      body += INDEX_ENTRY.pack(*entry)
+
+  raw_directory = json.dumps(directory).encode('utf-8')
+  HEADER.pack_into(body, 0, MAGIC, len(body), len(raw_directory))
+  body += raw_directory
+  return bytes(body)
+
+
+def not_mapped_error(path: str):
+  return ValueError(
+    f"'{path}' is not a memory-mapped registry file. "
+    f"Convert it first with `python -m tools.convert_registry {path} <output>.mmap`.")
+
+
+def read_directory(buffer):
+  if len(buffer) < HEADER.size or buffer[:len(MAGIC)] != MAGIC:
+    raise ValueError('Not a memory-mapped registry file')
+  magic, offset, length = HEADER.unpack_from(buffer, 0)
+  return json.loads(buffer[offset:offset + length])
+
+
+def decode_mapped(buffer):
+  """
+  Fully decodes mapped data into plain dicts.
+  """
+
+  data = dict()
+  for name, (index_offset, count) in read_directory(buffer).items():
+    table = MappedTable(buffer, name, index_offset, count, None)
+    data[name] = dict(table.items())
+  return data
+
+
+# --------------------------------------------------------------------------------
+# Class: DocumentCache
+# --------------------------------------------------------------------------------
+
+class DocumentCache:
+
+  def __init__(self, max_size: int):
+    self.max_size = max_size
+    self.hits = 0
+    self.misses = 0
+    self._lock = threading.Lock()
+    self._documents = OrderedDict()
+
+
+  def get(self, key: tuple):
+    with self._lock:
+      document = self._documents.get(key)
+      if document is None:
+        self.misses += 1
+      else:
+        self.hits += 1
+        self._documents.move_to_end(key)
+      return document
+
+
+  def put(self, key: tuple, document: dict):
+    with self._lock:
+      self._documents[key] = document
+      self._documents.move_to_end(key)
+      while len(self._documents) > self.max_size:
+        self._documents.popitem(last=False)
+
+
+  def __len__(self):
+    return len(self._documents)
+
+
+# --------------------------------------------------------------------------------
+# Class: MappedTable
+# --------------------------------------------------------------------------------
+
+class MappedTable(Mapping):
+  """
+  Maps TinyDB's string document IDs to documents decoded on demand.
+  Lookups binary search the index, so they cost O(log n) without decoding anything else.
+  Iterating with `items()` decodes every document but bypasses the cache,
+  so full scans do not evict the working set.
+  """
+
+  def __init__(self, buffer, name: str, index_offset: int, count: int, cache: DocumentCache | None):
+    self.buffer = buffer
+    self.name = name
+    self.index_offset = index_offset
+    self.count = count
+    self.cache = cache
+
+
+  def _entry(self, position: int):
+    return INDEX_ENTRY.unpack_from(self.buffer, self.index_offset + position * INDEX_ENTRY.size)
+
+
+  def _find(self, doc_id: int):
+    low, high = 0, self.count
+    while low < high:
+      middle = (low + high) // 2
+      entry_id, offset, length = self._entry(middle)
+      if entry_id < doc_id:
+        low = middle + 1
+      elif entry_id > doc_id:
+        high = middle
+      else:
+        return offset, length
+    return None
+
+
+  def _decode(self, offset: int, length: int):
+    return json.loads(self.buffer[offset:offset + length])
+
+
+  def __getitem__(self, key):
+    try:
+      doc_id = int(key)
+    except ValueError:
+      raise KeyError(key)
+
+    if self.cache is not None:
+      document = self.cache.get((self.name, doc_id))
+      if document is not None:
+        return document
+
+    location = self._find(doc_id)
+    if location is None:
+      raise KeyError(key)
+
+    document = self._decode(*location)
+    if self.cache is not None:
+      self.cache.put((self.name, doc_id), document)
+    return document
+
+
+  def __iter__(self):
+    for position in range(self.count):
+      yield str(self._entry(position)[0])
+
+
+  def __len__(self):
+    return self.count
+
+
+  def items(self):
+    for position in range(self.count):
+      doc_id, offset, length = self._entry(position)
+      yield str(doc_id), self._decode(offset, length)
+
+
+# --------------------------------------------------------------------------------
+# Class: MappedStorage
+# --------------------------------------------------------------------------------
+
+class MappedStorage(Storage):
+  """
+  Stores the database in a memory-mapped file.
+  Writes go to a temporary file that atomically replaces the old one,
+  with the fsync policy from `durability`, and then the new file is mapped.
+  Readers still holding the old tables keep using the old mapping until they finish.
+  """
+
+  def __init__(
+    self,
+    path: str,
+    cache_size: int = 10000,
+    create_dirs: bool = False,
+    durability: Durability | None = None):
+
+    touch(path, create_dirs)
+    self.path = path
+    self.cache_size = cache_size
+    self.durability = durability or Durability()
+    self.cache = None
+    self._tables = None
+
+    # Writes are never deferred, since each one replaces the mapped file
+    self.dirty = False
+    self.writes = 0
+
+
+  def _map(self):
+    self.cache = DocumentCache(self.cache_size)
+    self._tables = dict()
+
+    if os.path.getsize(self.path) == 0:
+      return
+
+    with open(self.path, 'rb') as registry:
+      buffer = mmap.mmap(registry.fileno(), 0, access=mmap.ACCESS_READ)
+
+    for name, (index_offset, count) in read_directory(buffer).items():
+      self._tables[name] = MappedTable(buffer, name, index_offset, count, self.cache)
+
+
+  def read(self):
+    if self._tables is None:
+      self._map()
+
+    # TinyDB replaces tables in the returned dict, so each read gets a new one
+    return dict(self._tables) or None
+
+
+  def flush(self):
+    pass
+
+
+  def write(self, data):
+    self.writes += 1
+    self.durability.write(self.path, encode_mapped(data))
+    self._map()
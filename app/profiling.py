@@ -0,0 +1,254 @@
+"""
+This module profiles individual requests on demand.
+A request is profiled when an admin sends the `X-Profile` header,
+or when it is sampled by the `profiling` config rule.
+The endpoint runs under cProfile, and the profile is written to the configured directory
+along with a JSON file of the route, owner, status, and timing.
+Requests that are not profiled pay only for a header lookup and, with sampling, a random number.
+Async endpoints share their thread with other requests, so they are timed but not profiled.
+"""
+
+# --------------------------------------------------------------------------------
+# Imports
+# --------------------------------------------------------------------------------
+
+import cProfile
+import contextvars
+import functools
+import inspect
+import json
+import os
+import random
+import threading
+import time
+import uuid
+
+from . import admins, config
+from .auth import get_current_username, securityBasic, securityBearer
+from fastapi import HTTPException, Request
+from fastapi.routing import APIRoute
+
+
+# --------------------------------------------------------------------------------
+# Globals
+# --------------------------------------------------------------------------------
+
+PROFILE_HEADER = 'x-profile'
+PROFILE_ID_HEADER = 'X-Profile-Id'
+
+# Each profile is a '.prof' file and a '.json' sidecar
+PROFILE_SUFFIXES = ('.prof', '.json')
+
+profiling = config['profiling']
+
+# The profiler for the current request, if it is being profiled
+_current_profiler = contextvars.ContextVar('current_profiler', default=None)
+
+
+# --------------------------------------------------------------------------------
+# Class: ProfileStore
+# --------------------------------------------------------------------------------
+
+class ProfileStore:
+  """
+  Writes profiles into a directory, up to a maximum number of files and bytes.
+  Existing files count toward the limits, so old profiles must be deleted to make room.
+  When the store is full, the directory is scanned again, so deleted profiles free their room.
+  """
+
+  def __init__(self, directory: str, max_files: int, max_bytes: int):
+    self.directory = directory
+    self.max_files = max_files
+    self.max_bytes = max_bytes
+    self.saved = 0
+    self.skipped = 0
+
+    self._lock = threading.Lock()
+    self._files = None
+    self._bytes = None
+
+    # Files claimed by profiles that are not saved yet
+    self._reserved = 0
+
+
+  def _full(self):
+    return self._files + len(PROFILE_SUFFIXES) > self.max_files or self._bytes >= self.max_bytes
+
+
+  def _scan(self):
+    os.makedirs(self.directory, exist_ok=True)
+    files = 0
+    size = 0
+    for entry in os.scandir(self.directory):
+      if entry.is_file() and entry.name.endswith(PROFILE_SUFFIXES):
+        files += 1
+        size += entry.stat().st_size
+    self._files = files + self._reserved
+    self._bytes = size
+
+
+  def reserve(self):
+    """
+    Returns whether there is room for another profile, and claims it if there is.
+    """
+
+    with self._lock:
+      if self._files is None or self._full():
+        try:
+          self._scan()
+        except OSError:
+          # The directory cannot be used, so it is tried again for the next profile
+          self._files = None
+          self.skipped += 1
+          return False
+      if self._full():
+        self.skipped += 1
+        return False
+      self._files += len(PROFILE_SUFFIXES)
+      self._reserved += len(PROFILE_SUFFIXES)
+      return True
+
+
+  def release(self):
+    with self._lock:
+      self._files -= len(PROFILE_SUFFIXES)
+      self._reserved -= len(PROFILE_SUFFIXES)
+
+
+  def save(self, profiler: cProfile.Profile, metadata: dict):
+    name = f'{time.strftime("%Y%m%dT%H%M%S", time.gmtime(metadata["started"]))}-{metadata["id"]}'
+    path = os.path.join(self.directory, name + '.prof')
+
+    sidecar_path = os.path.join(self.directory, name + '.json')
+
+    profiler.dump_stats(path)
+    with open(sidecar_path, 'w') as sidecar:
+      json.dump(metadata, sidecar, indent=2)
+
+    with self._lock:
+      self._bytes += os.path.getsize(path) + os.path.getsize(sidecar_path)
+      self._reserved -= len(PROFILE_SUFFIXES)
+      self.saved += 1
+
+
+# --------------------------------------------------------------------------------
+# Selection Functions
+# --------------------------------------------------------------------------------
+
+async def request_username(request: Request):
+  # The route's own dependencies have not run yet, so the credentials are checked here
+  try:
+    return get_current_username(await securityBasic(request), await securityBearer(request))
+  except HTTPException:
+    return None
+
+
+def is_sampled(route_path: str):
+  rate = profiling['sample_rate']
+  if rate <= 0:
+    return False
+  if profiling['paths'] and route_path not in profiling['paths']:
+    return False
+  return random.random() < rate
+
+
+# --------------------------------------------------------------------------------
+# Endpoint Wrappers
+# --------------------------------------------------------------------------------
+
+def profile_endpoint(endpoint):
+  """
+  Wraps a sync endpoint so it runs under the request's profiler, if it has one.
+  Sync endpoints run in a worker thread, and cProfile only sees the thread that enables it.
+  """
+
+  if inspect.iscoroutinefunction(endpoint):
+    return endpoint
+
+  @functools.wraps(endpoint)
+  def profiled_endpoint(*args, **kwargs):
+    profiler = _current_profiler.get()
+    if profiler is None:
+      return endpoint(*args, **kwargs)
+
+    profiler.enable()
+    try:
+      return endpoint(*args, **kwargs)
+    finally:
+      profiler.disable()
+
+  return profiled_endpoint
+
+
+# --------------------------------------------------------------------------------
+# Class: ProfiledRoute
+# --------------------------------------------------------------------------------
+
+class ProfiledRoute(APIRoute):
+  """
+  A route that profiles requests chosen by the admin header or the sampling rule.
+  """
+
+  def __init__(self, path: str, endpoint, **kwargs):
+    super().__init__(path, profile_endpoint(endpoint), **kwargs)
+
+
+  def get_route_handler(self):
+    handler = super().get_route_handler()
+
+    async def profiled_handler(request: Request):
+      requested = PROFILE_HEADER in request.headers
+      if not requested and not is_sampled(self.path):
+        return await handler(request)
+
+      owner = await request_username(request)
+      if requested and owner not in admins:
+        return await handler(request)
+      if not store.reserve():
+        return await handler(request)
+
+      return await self.capture(handler, request, owner, 'header' if requested else 'sample')
+
+    return profiled_handler
+
+
+  async def capture(self, handler, request: Request, owner: str | None, reason: str):
+    profiler = cProfile.Profile()
+    metadata = {
+      'id': uuid.uuid4().hex[:12],
+      'method': request.method,
+      'route': self.path,
+      'path': request.url.path,
+      'owner': owner,
+      'reason': reason,
+      'started': time.time(),
+    }
+
+    token = _current_profiler.set(profiler)
+    start = time.perf_counter()
+    status_code = 500
+    try:
+      response = await handler(request)
+      status_code = response.status_code
+      response.headers[PROFILE_ID_HEADER] = metadata['id']
+      return response
+    except HTTPException as error:
+      status_code = error.status_code
+      error.headers = {**(error.headers or {}), PROFILE_ID_HEADER: metadata['id']}
+      raise
+    finally:
+      _current_profiler.reset(token)
+      metadata['duration_ms'] = round((time.perf_counter() - start) * 1000, 3)
+      metadata['status_code'] = status_code
+      try:
+        store.save(profiler, metadata)
+      except OSError:
+        # Profiling must never fail the request it measures
+        store.release()
+
+
+# --------------------------------------------------------------------------------
+# Registration
+# --------------------------------------------------------------------------------
+
+store = ProfileStore(profiling['directory'], profiling['max_files'], profiling['max_bytes'])
@@ -0,0 +1,152 @@
+"""
+This module provides a compact in-memory representation of device documents.
+Each record stores its fields in slots instead of a per-document dict.
+Low-cardinality fields are interned, so devices that share a type, model,
+location, or owner also share one string object for it.
+Records behave like mappings, so TinyDB can query and update them directly.
+Plain dicts are built only when documents are read out or serialized.
+"""
+
+# --------------------------------------------------------------------------------
+# Imports
+# --------------------------------------------------------------------------------
+
+from collections.abc import Mapping, MutableMapping
+
+
+# --------------------------------------------------------------------------------
+# Interning
+# --------------------------------------------------------------------------------
+
+CATEGORICAL_FIELDS = ('owner', 'type', 'model', 'location')
+
+# One dictionary of distinct values per categorical field
+_vocabularies = {field: dict() for field in CATEGORICAL_FIELDS}
+
+
+def intern_value(field: str, value):
+  vocabulary = _vocabularies.get(field)
+  if vocabulary is None or not isinstance(value, str):
+    return value
+  return vocabulary.setdefault(value, value)
+
+
+# --------------------------------------------------------------------------------
+# Class: DeviceRecord
+# --------------------------------------------------------------------------------
+
+_MISSING = object()
+
+
+class DeviceRecord(MutableMapping):
+
+  FIELDS = ('owner', 'name', 'location', 'type', 'model', 'serial_number', 'version')
+
+  # Any fields beyond the known ones go in 'extra', which is usually None
+  __slots__ = FIELDS + ('extra',)
+
+
+  def __init__(self, document: Mapping):
+    for field in self.FIELDS:
+      setattr(self, field, _MISSING)
+    self.extra = None
+
+    for key, value in document.items():
+      self[key] = value
+
+
+  def __getitem__(self, key):
+    if key in self.FIELDS:
+      value = getattr(self, key)
+      if value is _MISSING:
+        raise KeyError(key)
+      return value
+    if self.extra is None:
+      raise KeyError(key)
+    return self.extra[key]
+
+
+  def __setitem__(self, key, value):
+    if key in self.FIELDS:
+      setattr(self, key, intern_value(key, value))
+    else:
+      if self.extra is None:
+        self.extra = dict()
+      self.extra[key] = value
+
+
+  def __delitem__(self, key):
+    if key in self.FIELDS:
+      if getattr(self, key) is _MISSING:
+        raise KeyError(key)
+      setattr(self, key, _MISSING)
+    else:
+      if self.extra is None:
+        raise KeyError(key)
+      del self.extra[key]
+      if not self.extra:
+        self.extra = None
+
+
+  def __iter__(self):
+    for field in self.FIELDS:
+      if getattr(self, field) is not _MISSING:
+        yield field
+    if self.extra is not None:
+      yield from self.extra
+
+
+  def __len__(self):
+    count = sum(getattr(self, field) is not _MISSING for field in self.FIELDS)
+    return count + (len(self.extra) if self.extra is not None else 0)
+
+
+  def __repr__(self):
+    return f'DeviceRecord({dict(self)!r})'
+
+
+def to_record(document: Mapping):
+  if isinstance(document, DeviceRecord):
+    return document
+  return DeviceRecord(document)
+
+
+# --------------------------------------------------------------------------------
+# Class: RecordTable
+# --------------------------------------------------------------------------------
+
+class RecordTable(Mapping):
+  """
+  Maps TinyDB's string document IDs to records.
+  IDs are stored as ints, which are smaller than their strings.
+  """
+
+  __slots__ = ('_records',)
+
+  def __init__(self, table: Mapping):
+    self._records = {int(doc_id): to_record(doc) for doc_id, doc in table.items()}
+
+
+  def __getitem__(self, doc_id):
+    try:
+      return self._records[int(doc_id)]
+    except ValueError:
+      raise KeyError(doc_id)
+
+
+  def __iter__(self):
+    for doc_id in self._records:
+      yield str(doc_id)
+
+
+  def __len__(self):
+    return len(self._records)
+
+
+  def items(self):
+    for doc_id, record in self._records.items():
+      yield str(doc_id), record
+
+
+  def to_dict(self):
+    return {str(doc_id): dict(record) for doc_id, record in self._records.items()}
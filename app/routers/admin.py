@@ -0,0 +1,115 @@
+"""
+This module provides routes for administering the service.
+They require an admin user from the `admins` config.
+Backups and audit queries stream for as long as they take, so they are rate limited
+but do not hold one of the admission slots used by the device routes.
+They run in the `exports` executor, including their streams, so they cannot take the default threads.
+"""
+
+# --------------------------------------------------------------------------------
+# Imports
+# --------------------------------------------------------------------------------
+
+import os
+import time
+
+from .. import db
+from ..audit import DROPPED, audit, query_audit
+from ..auth import get_admin_username
+from ..backups import backup_name, stream_backup
+from ..events import CREATE, DELETE, UPDATE
+from ..executors import run_in, stream_in
+from ..limits import limit_rate, reset_buckets
+from ..profiling import ProfiledRoute
+
+from fastapi import APIRouter, Depends
+from fastapi.responses import StreamingResponse
+from pydantic import conint, constr
+
+
+# --------------------------------------------------------------------------------
+# Router
+# --------------------------------------------------------------------------------
+
+router = APIRouter(dependencies=[Depends(get_admin_username), Depends(limit_rate)], route_class=ProfiledRoute)
+
+
+# --------------------------------------------------------------------------------
+# Models
+# --------------------------------------------------------------------------------
+
+AuditAction = constr(regex=f'^({CREATE}|{UPDATE}|{DELETE}|{DROPPED})$')
+
+
+# --------------------------------------------------------------------------------
+# Routes
+# --------------------------------------------------------------------------------
+
+@router.get("/admin/backup", summary="Download a consistent backup of the registry")
+@run_in('exports')
+def get_admin_backup():
+  """
+  Streams a gzip-compressed tar archive of every registry file as of one point in time.
+  The archive ends with 'manifest.json', which lists each file's size and SHA-256 checksum.
+  Writes keep flowing while the backup streams.
+  Requires an admin user.
+  """
+
+  created = time.time()
+  files = db.checkpoint()
+  names = [os.path.basename(path) for path in db.paths]
+
+  return StreamingResponse(
+    stream_in('exports', stream_backup(files, names, created)),
+    media_type='application/gzip',
+    headers={
+      'content-disposition': f'attachment; filename="{backup_name(created)}"',
+      'cache-control': 'no-store',
+    })
+
+
+@router.get("/admin/audit", summary="Query the audit trail of device changes")
+@run_in('exports')
+def get_admin_audit(
+  user: str | None = None,
+  device_id: int | None = None,
+  action: AuditAction | None = None,
+  since: float | None = None,
+  until: float | None = None,
+  limit: conint(ge=1) = 1000):
+  """
+  Streams matching audit records as newline-delimited JSON, oldest first.
+  Each record has the change feed 'seq', the 'time' in epoch seconds, the 'user', the 'action',
+  and the 'device_id', plus the 'device' for creates and deletes or the 'changes' for updates.
+  A 'dropped' record counts records lost because the audit buffer was full.
+  May filter by 'user', 'device_id', 'action', and a 'since' and 'until' time range.
+  Records are written in the background, so the newest changes may take a moment to appear.
+  Requires an admin user.
+  """
+
+  records = query_audit(
+    audit['directory'],
+    user=user,
+    device_id=device_id,
+    action=action,
+    since=since,
+    until=until,
+    limit=limit)
+
+  return StreamingResponse(
+    stream_in('exports', records),
+    media_type='application/x-ndjson',
+    headers={'cache-control': 'no-store'})
+
+
+@router.delete("/admin/limits", summary="Reset every user's rate limit budget", response_model=dict)
+async def delete_admin_limits():
+  """
+  Refills every user's read and write token buckets.
+  Throttle counters are not reset.
+  Runs on the event loop, like the rate limiter, so the buckets need no lock.
+  Requires an admin user.
+  """
+
+  reset_buckets()
+  return dict()
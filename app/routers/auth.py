@@ -7,6 +7,8 @@ This module provides routes for authentication.
 # --------------------------------------------------------------------------------
 
 from ..auth import get_current_username, serialize_token
+from ..limits import admit_request, limit_rate
+from ..profiling import ProfiledRoute
 
 from fastapi import APIRouter, Depends
 from pydantic import BaseModel
@@ -16,7 +18,7 @@ from pydantic import BaseModel
 # Router
 # --------------------------------------------------------------------------------
 
-router = APIRouter()
+router = APIRouter(dependencies=[Depends(admit_request), Depends(limit_rate)], route_class=ProfiledRoute)
 
 
 # --------------------------------------------------------------------------------
@@ -32,9 +34,7 @@ class Token(BaseModel):
 # --------------------------------------------------------------------------------
 
 @router.get("/authenticate", summary="Generate an auth token", response_model=Token)
-@router.get("/authenticate/", include_in_schema=False)
 @router.head("/authenticate", summary="Generate an auth token")
-@router.head("/authenticate/", include_in_schema=False)
 def get_authenticate(username: str = Depends(get_current_username)):
   """
   Uses HTTP basic authentication to generate an authentication token.
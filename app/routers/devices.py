@@ -6,14 +6,29 @@ This module provides routes for devices.
 # Imports
 # --------------------------------------------------------------------------------
 
-from .. import db
+import json
+
+from .. import db, indexes
 from ..auth import get_current_username
-from ..exceptions import ForbiddenException, NotFoundException
+from ..cache import response_cache, response_lengths
+from ..changes import DELETE, change_feed
+from ..coalesce import single_flight
+from ..exceptions import (
+  ConflictException, ForbiddenException, NotFoundException,
+  PreconditionFailedException, ResyncRequiredException)
+from ..executors import run_in
+from ..limits import admit_request, limit_rate
+from ..profiling import ProfiledRoute
+from ..search import search_devices
+from ..serials import find_serial, is_serial_taken
+from ..sorting import SORT_FIELDS, order_devices
+from ..stats import get_counts
+from ..storage import versioned_update
 
 from io import BytesIO
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Header, Request, Response
 from fastapi.responses import StreamingResponse
-from pydantic import BaseModel
+from pydantic import BaseModel, conint, constr
 from tinydb import Query
 
 
@@ -21,7 +36,7 @@ from tinydb import Query
 # Router
 # --------------------------------------------------------------------------------
 
-router = APIRouter()
+router = APIRouter(dependencies=[Depends(admit_request), Depends(limit_rate)], route_class=ProfiledRoute)
 
 
 # --------------------------------------------------------------------------------
@@ -54,6 +69,41 @@ class DevicePostPut(BaseDeviceModel):
 class DevicePatch(BaseDeviceModel):
   name: str | None = None
   location: str | None = None
+
+
+class DeviceChange(BaseModel):
+  seq: int
+  action: str
+  id: int
+  device: Device | None
+
+
+class DeviceChanges(BaseModel):
+  changes: list[DeviceChange]
+  last_seq: int
+
+
+class DeviceStats(BaseModel):
+  total: int
+  type: dict[str, int]
+  location: dict[str, int]
+  model: dict[str, int]
+
+
+# --------------------------------------------------------------------------------
+# Query Parameter Types
+# --------------------------------------------------------------------------------
+
+DEVICE_FIELDS = tuple(Device.__fields__)
+
+_device_fields = '|'.join(DEVICE_FIELDS)
+_sort_fields = '|'.join(SORT_FIELDS)
+
+# A comma-separated list of device fields, like 'id,name'
+FieldList = constr(regex=rf'^({_device_fields})(,({_device_fields}))*$')
+
+# A sortable field, optionally prefixed by '-' for descending order
+SortKey = constr(regex=rf'^-?({_sort_fields})$')
   
 
 # --------------------------------------------------------------------------------
@@ -72,13 +122,187 @@ def query_device(device_id: int, username: str):
   return device
 
 
-def update_device(device_id: int, data: dict, username: str):
-  query_device(device_id, username)
-  db.update(data, doc_ids=[device_id])
+def find_devices(owner: str, filters: dict, sort: str | None):
+
+  # A serial number matches few devices, so they are looked up directly
+  if 'serial_number' in filters:
+    devices = fetch_devices(find_serial(filters['serial_number']))
+    return [
+      d for d in devices
+      if d['owner'] == owner and all(d[field] == value for field, value in filters.items())
+    ]
+
+  DeviceQuery = Query()
+  query = DeviceQuery.owner == owner
+
+  for field, value in filters.items():
+    query = (query) & (DeviceQuery[field] == value)
+
+  devices = db.search(query, owner=owner)
+
+  for d in devices:
+    d['id'] = d.doc_id
+
+  if sort is not None:
+    devices = order_devices(owner, sort, devices)
+
+  return devices
+
+
+def fetch_devices(device_ids: list[int]):
+  devices = []
+
+  for device_id in device_ids:
+    # Devices removed since their IDs were looked up are skipped
+    if device := db.get(doc_id=device_id):
+      device.pop('version', None)
+      device['id'] = device_id
+      devices.append(device)
+
+  return devices
+
+
+# --------------------------------------------------------------------------------
+# Rendering Functions
+# --------------------------------------------------------------------------------
+
+def render_json(content):
+  # Matches the compact encoding used by JSONResponse
+  return json.dumps(content, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def render_device(device: dict, names: tuple[str, ...] = DEVICE_FIELDS):
+  return render_json({name: device[name] for name in names})
+
+
+def render_devices(devices: list[dict], names: tuple[str, ...] = DEVICE_FIELDS):
+  # Only the requested fields are copied and encoded
+  return render_json([{name: d[name] for name in names} for d in devices])
+
+
+def render_report(device: dict):
+  report = BytesIO()
+  report.write(bytes(f'ID: {device["id"]}\n', 'ascii'))
+  report.write(bytes(f'Owner: {device["owner"]}\n', 'ascii'))
+  report.write(bytes(f'Name: {device["name"]}\n', 'ascii'))
+  report.write(bytes(f'Location: {device["location"]}\n', 'ascii'))
+  report.write(bytes(f'Type: {device["type"]}\n', 'ascii'))
+  report.write(bytes(f'Model: {device["model"]}\n', 'ascii'))
+  report.write(bytes(f'Serial Number: {device["serial_number"]}\n', 'ascii'))
+  return report.getvalue()
+
+
+# --------------------------------------------------------------------------------
+# HEAD Functions
+# --------------------------------------------------------------------------------
+
+def rendered_length(kind: str, device: dict, render):
+  """
+  Returns the length of a device's rendered response without keeping the body.
+  Lengths are remembered for the device's version, so later HEAD requests skip rendering.
+  Devices read without their version are rendered every time.
+  """
+
+  version = device.get('version')
+  if version is not None:
+    length = response_lengths.get(kind, device['id'], version)
+    if length is not None:
+      return length
+
+  length = len(render(device))
+  if version is not None:
+    response_lengths.put(kind, device['id'], version, length)
+  return length
+
+
+def listing_length(devices: list[dict]):
+  # A full listing is each rendered device, separated by commas, inside brackets
+  lengths = sum(rendered_length('device', d, render_device) for d in devices)
+  return 2 + lengths + max(len(devices) - 1, 0)
+
+
+def head_response(length: int, media_type: str, headers: dict | None = None):
+  # Sends the headers that GET would, with no body
+  response = Response(media_type=media_type, headers=headers)
+  response.headers['content-length'] = str(length)
+  return response
+
+
+# --------------------------------------------------------------------------------
+# Version Functions
+# --------------------------------------------------------------------------------
+
+def make_etag(device: dict):
+  # Devices saved before versioning have version 0
+  return f'"{device.get("version", 0)}"'
+
+
+def etag_matches(if_match: str | None, device: dict):
+  # Weak tags never match, since If-Match uses strong comparison
+  if if_match is None or if_match.strip() == '*':
+    return True
+  return make_etag(device) in (tag.strip() for tag in if_match.split(','))
+
+
+def device_response(device: dict):
+  # The version is sent as the ETag instead of in the body
+  response = Response(render_device(device), media_type='application/json')
+  response.headers['ETag'] = make_etag(device)
+  return response
+
+
+# --------------------------------------------------------------------------------
+# Mutation Functions
+# --------------------------------------------------------------------------------
+
+def insert_device(data: dict):
+  data['version'] = 1
+
+  # The shard's file is written after the index lock is released,
+  # so writes to other shards are not held up by the file write
+  with db.writing(db.shard_for_owner(data['owner'])), indexes.lock:
+    if is_serial_taken(data['serial_number']):
+      raise ConflictException()
+
+    device_id = db.insert(data)
+    indexes.on_insert(device_id, data)
+
+  return device_id
+
+
+def update_device(device_id: int, data: dict, username: str, if_match: str | None = None):
+
+  # Runs inside the storage update, so nothing can change the device in between
+  def check(device: dict):
+    if device['owner'] != username:
+      raise ForbiddenException()
+    if not etag_matches(if_match, device):
+      raise PreconditionFailedException()
+    # Keeping a serial number that older registries repeat is not a conflict
+    serial_number = data.get('serial_number', device['serial_number'])
+    if serial_number != device['serial_number'] and is_serial_taken(serial_number, device_id):
+      raise ConflictException()
+
+  with db.writing(db.shard_for_id(device_id)), indexes.lock:
+    result = versioned_update(db, device_id, data, check)
+    if result is None:
+      raise NotFoundException()
+
+    before, device = result
+    indexes.on_update(device_id, before, device)
 
-  device = db.get(doc_id=device_id)
   device['id'] = device_id
   return device
+
+
+def remove_device(device_id: int, username: str, if_match: str | None = None):
+  with db.writing(db.shard_for_id(device_id)), indexes.lock:
+    device = query_device(device_id, username)
+    if not etag_matches(if_match, device):
+      raise PreconditionFailedException()
+
+    db.remove(doc_ids=[device_id])
+    indexes.on_remove(device_id, device)
   
 
 # --------------------------------------------------------------------------------
@@ -86,136 +310,250 @@ def update_device(device_id: int, data: dict, username: str):
 # --------------------------------------------------------------------------------
 
 @router.get("/devices", summary="Get the user's devices", response_model=list[Device])
-@router.get("/devices/", include_in_schema=False)
 @router.head("/devices", summary="Get the user's devices")
-@router.head("/devices/", include_in_schema=False)
+@run_in('listings')
 def get_devices(
+  request: Request,
   owner: str = Depends(get_current_username),
   name: str | None = None,
   location: str | None = None,
   type: str | None = None,
   model: str | None = None,
-  serial_number: str | None = None):
+  serial_number: str | None = None,
+  fields: FieldList | None = None,
+  sort: SortKey | None = None):
   """
   Gets a list of all devices owned by the user.
   May optionally take query parameters for filtering results.
+  May return only some fields with `fields`, like 'id,name'.
+  May sort results with `sort`, like 'name' or '-name' for descending order.
+  HEAD computes the length of a full listing from remembered device lengths.
   Requires authentication.
   """
 
-  DeviceQuery = Query()
-  query = DeviceQuery.owner == owner
+  filters = dict(name=name, location=location, type=type, model=model, serial_number=serial_number)
+  filters = {field: value for field, value in filters.items() if value is not None}
+  names = tuple(dict.fromkeys(fields.split(','))) if fields else DEVICE_FIELDS
 
-  if name is not None:
-    query = (query) & (DeviceQuery.name == name)
-  if location is not None:
-    query = (query) & (DeviceQuery.location == location)
-  if type is not None:
-    query = (query) & (DeviceQuery.type == type)
-  if model is not None:
-    query = (query) & (DeviceQuery.model == model)
-  if serial_number is not None:
-    query = (query) & (DeviceQuery.serial_number == serial_number)
+  key = ('list', tuple(sorted(filters.items())), names, sort)
 
-  devices = db.search(query)
+  def lookup():
+    generation = response_cache.generation(owner)
+    body = render_devices(find_devices(owner, filters, sort), names)
+    response_cache.put(owner, key, body, generation)
+    return body
 
-  for d in devices:
-    d['id'] = d.doc_id
+  # Cached listings are reused until the owner's devices change
+  # Otherwise, identical concurrent listings share one lookup and one rendered body
+  body = response_cache.get(owner, key)
+  if body is None and request.method == 'HEAD' and names == DEVICE_FIELDS:
+    return head_response(listing_length(find_devices(owner, filters, sort)), 'application/json')
+  if body is None:
+    body = single_flight.do(owner, key, lookup)
 
-  return devices
+  return Response(body, media_type='application/json')
+
+
+@router.get("/devices/search", summary="Search the user's devices", response_model=list[Device])
+@router.head("/devices/search", summary="Search the user's devices")
+@run_in('listings')
+def get_devices_search(
+  q: str,
+  limit: conint(ge=1, le=100) = 20,
+  owner: str = Depends(get_current_username)):
+  """
+  Searches the user's devices by name and location.
+  Each word in the query may match a whole word or the start of one.
+  Results are ranked best match first, with name matches above location matches.
+  Requires authentication.
+  """
+
+  device_ids = search_devices(owner, q, limit)
+  return fetch_devices(device_ids)
+
+
+@router.get("/devices/changes", summary="Get changes to the user's devices", response_model=DeviceChanges)
+@router.head("/devices/changes", summary="Get changes to the user's devices")
+@run_in('listings')
+def get_devices_changes(
+  since: conint(ge=0) = 0,
+  owner: str = Depends(get_current_username)):
+  """
+  Gets changes to the user's devices after the sequence number `since`.
+  Each change is an 'upsert' with the current device or a 'delete' without one.
+  Pass the returned `last_seq` as `since` on the next call to get only new changes.
+  Returns 410 if the client is too far behind and must reload all devices.
+  Requires authentication.
+  """
+
+  # Every write takes the index lock, so only the feed is read under it
+  with indexes.lock:
+    changes = change_feed.since(owner, since)
+    if changes is None:
+      raise ResyncRequiredException()
+    last_seq = change_feed.seq
+
+  results = []
+  for seq, action, device_id in changes:
+    device = None
+    if action != DELETE:
+      device = db.get(doc_id=device_id)
+
+    # A device removed after the feed was read is reported as deleted, as its own later change will be
+    if device is None:
+      action = DELETE
+    else:
+      device.pop('version', None)
+      device['id'] = device_id
+    results.append(dict(seq=seq, action=action, id=device_id, device=device))
+
+  return dict(changes=results, last_seq=last_seq)
+
+
+@router.get("/devices/stats", summary="Get counts of the user's devices", response_model=DeviceStats)
+@router.head("/devices/stats", summary="Get counts of the user's devices")
+def get_devices_stats(owner: str = Depends(get_current_username)):
+  """
+  Gets counts of the user's devices grouped by type, location, and model.
+  Requires authentication.
+  """
+
+  counts = get_counts(owner)
+  total = sum(counts['type'].values())
+  return DeviceStats(total=total, **counts)
+
+
+@router.get("/devices/by-serial/{serial_number}", summary="Get a device by serial number", response_model=Device)
+@router.head("/devices/by-serial/{serial_number}", summary="Get a device by serial number")
+def get_devices_by_serial(serial_number: str, username: str = Depends(get_current_username)):
+  """
+  Gets a device owned by the user by its serial number.
+  Requires authentication.
+  """
+
+  device_ids = find_serial(serial_number)
+  if not device_ids:
+    raise NotFoundException()
+
+  # Older registries may give several devices the serial number, so the user's own is preferred
+  for device_id in device_ids:
+    device = db.get(doc_id=device_id)
+    if device and device['owner'] == username:
+      device['id'] = device_id
+      return device_response(device)
+
+  # Raises 403 for another user's device, or 404 if it was removed meanwhile
+  return device_response(query_device(device_ids[0], username))
 
 
 @router.post("/devices", summary="Create a new device", response_model=Device)
-@router.post("/devices/", include_in_schema=False)
 def post_devices(device: DevicePostPut, username: str = Depends(get_current_username)):
   """
   Adds a new device owned by the user.
+  Returns 409 if another device already has the serial number.
   Requires authentication.
   """
 
   new_device = device.dict()
   new_device["owner"] = username
-  device_id = db.insert(new_device)
+  device_id = insert_device(new_device)
 
-  return query_device(device_id, username)
+  return device_response(query_device(device_id, username))
 
 
 @router.get("/devices/{device_id}", summary="Get a device by ID", response_model=Device)
-@router.get("/devices/{device_id}/", include_in_schema=False)
 @router.head("/devices/{device_id}", summary="Get a device by ID")
-@router.head("/devices/{device_id}/", include_in_schema=False)
-def get_devices_id(device_id: int, username: str = Depends(get_current_username)):
+def get_devices_id(request: Request, device_id: int, username: str = Depends(get_current_username)):
   """
   Gets a device owned by the user.
+  The device's version is returned in the ETag header.
   Requires authentication.
   """
 
-  return query_device(device_id, username)
+  if request.method == 'HEAD':
+    device = query_device(device_id, username)
+    length = rendered_length('device', device, render_device)
+    return head_response(length, 'application/json', {'ETag': make_etag(device)})
+
+  def lookup():
+    device = query_device(device_id, username)
+    return render_device(device), make_etag(device)
+
+  key = ('device', device_id)
+  body, etag = single_flight.do(username, key, lookup)
+  return Response(body, media_type='application/json', headers={'ETag': etag})
 
 
 @router.put("/devices/{device_id}", summary="Fully update a device", response_model=Device)
-@router.put("/devices/{device_id}/", include_in_schema=False)
-def put_devices_id(device_id: int, device: DevicePostPut, username: str = Depends(get_current_username)):
+def put_devices_id(
+  device_id: int,
+  device: DevicePostPut,
+  username: str = Depends(get_current_username),
+  if_match: str | None = Header(default=None)):
   """
   Fully updates a device owned by the user.
+  Returns 409 if another device already has the serial number.
+  With `If-Match`, returns 412 unless it has the device's current ETag.
   Requires authentication.
   """
 
   data = device.dict()
-  return update_device(device_id, data, username)
+  return device_response(update_device(device_id, data, username, if_match))
 
 
 @router.patch("/devices/{device_id}", summary="Update a device's name and location", response_model=Device)
-@router.patch("/devices/{device_id}/", include_in_schema=False)
-def patch_devices_id(device_id: int, device: DevicePatch, username: str = Depends(get_current_username)):
+def patch_devices_id(
+  device_id: int,
+  device: DevicePatch,
+  username: str = Depends(get_current_username),
+  if_match: str | None = Header(default=None)):
   """
   Partially updates a device owned by the user.
   Can only update name and location - not other fields.
+  With `If-Match`, returns 412 unless it has the device's current ETag.
   Requires authentication.
   """
 
   data = device.dict(exclude_unset=True, exclude_none=True)
-  return update_device(device_id, data, username)
+  return device_response(update_device(device_id, data, username, if_match))
 
 
 @router.delete("/devices/{device_id}", summary="Delete a device by ID", response_model=dict)
-@router.delete("/devices/{device_id}/", include_in_schema=False)
-def delete_devices_id(device_id: int, username: str = Depends(get_current_username)):
+def delete_devices_id(
+  device_id: int,
+  username: str = Depends(get_current_username),
+  if_match: str | None = Header(default=None)):
   """
   Deletes a device owned by the user.
+  With `If-Match`, returns 412 unless it has the device's current ETag.
   Requires authentication.
   """
 
-  query_device(device_id, username)
-  db.remove(doc_ids=[device_id])
+  remove_device(device_id, username, if_match)
   return dict()
 
 
 @router.get("/devices/{device_id}/report", summary="Download a device report")
-@router.get("/devices/{device_id}/report/", include_in_schema=False)
 @router.head("/devices/{device_id}/report", summary="Download a device report")
-@router.head("/devices/{device_id}/report/", include_in_schema=False)
-def get_devices_id_report(device_id: int, username: str = Depends(get_current_username)):
+@run_in('reports')
+def get_devices_id_report(request: Request, device_id: int, username: str = Depends(get_current_username)):
   """
   Prints a text-based report for a device owned by the user.
+  HEAD sends the report's length without printing it.
   Requires authentication.
   """
 
   device = query_device(device_id, username)
+  content_disposition = f'attachment; filename="{device["name"]}.txt"'
 
-  report = BytesIO()
-  report.write(bytes(f'ID: {device_id}\n', 'ascii'))
-  report.write(bytes(f'Owner: {device["owner"]}\n', 'ascii'))
-  report.write(bytes(f'Name: {device["name"]}\n', 'ascii'))
-  report.write(bytes(f'Location: {device["location"]}\n', 'ascii'))
-  report.write(bytes(f'Type: {device["type"]}\n', 'ascii'))
-  report.write(bytes(f'Model: {device["model"]}\n', 'ascii'))
-  report.write(bytes(f'Serial Number: {device["serial_number"]}\n', 'ascii'))
-  report.seek(0)
+  if request.method == 'HEAD':
+    length = rendered_length('report', device, render_report)
+    return head_response(length, 'text/plain', {'content-disposition': content_disposition})
 
+  report = BytesIO(render_report(device))
   report_length = str(report.getbuffer().nbytes)
 
   response = StreamingResponse(report, media_type='text/plain')
-  content_disposition = f'attachment; filename="{device["name"]}.txt"'
   response.headers.setdefault("content-disposition", content_disposition)
   response.headers.setdefault("content-length", report_length)
   return response
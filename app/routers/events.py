@@ -0,0 +1,49 @@
+"""
+This module provides routes for live device events.
+Event streams stay open indefinitely, so they are rate limited
+but do not hold one of the admission slots used by the device routes.
+Its static '/devices/events' path wins over '/devices/{device_id}',
+so the order in which the routers are included does not matter.
+"""
+
+# --------------------------------------------------------------------------------
+# Imports
+# --------------------------------------------------------------------------------
+
+from ..auth import get_current_username
+from ..events import event_hub, stream_events
+from ..limits import limit_rate
+from ..profiling import ProfiledRoute
+
+from fastapi import APIRouter, Depends
+from fastapi.responses import StreamingResponse
+
+
+# --------------------------------------------------------------------------------
+# Router
+# --------------------------------------------------------------------------------
+
+router = APIRouter(dependencies=[Depends(limit_rate)], route_class=ProfiledRoute)
+
+
+# --------------------------------------------------------------------------------
+# Routes
+# --------------------------------------------------------------------------------
+
+@router.get("/devices/events", summary="Stream live changes to the user's devices")
+async def get_devices_events(owner: str = Depends(get_current_username)):
+  """
+  Streams create, update, and delete events for the user's devices as Server-Sent Events.
+  Each event's ID is its change feed sequence number.
+  A 'resync' event means the client fell behind and was disconnected.
+  It should then call '/devices/changes' with the last event ID it received.
+  Requires authentication.
+  """
+
+  # Subscribe before responding so no event is missed once the stream opens
+  subscriber = event_hub.subscribe(owner)
+
+  return StreamingResponse(
+    stream_events(subscriber),
+    media_type='text/event-stream',
+    headers={'cache-control': 'no-cache'})
@@ -1,20 +1,31 @@
 """
 This module provides top-level routes.
+Images are loaded into memory once, when the module is imported.
 """
 
 # --------------------------------------------------------------------------------
 # Imports
 # --------------------------------------------------------------------------------
 
-from fastapi import APIRouter
-from fastapi.responses import FileResponse, RedirectResponse
+from ..assets import asset_response, load_asset
+from ..profiling import ProfiledRoute
+from fastapi import APIRouter, Request
+from fastapi.responses import RedirectResponse
 
 
 # --------------------------------------------------------------------------------
 # Router
 # --------------------------------------------------------------------------------
 
-router = APIRouter()
+router = APIRouter(route_class=ProfiledRoute)
+
+
+# --------------------------------------------------------------------------------
+# Assets
+# --------------------------------------------------------------------------------
+
+favicon = load_asset('img/favicon.ico')
+logo = load_asset('img/logo.png')
 
 
 # --------------------------------------------------------------------------------
@@ -31,18 +42,18 @@ def get_root():
 
 
 @router.get("/favicon.ico", include_in_schema=False)
-def get_favicon():
+def get_favicon(request: Request):
   """
   Provides the app's favicon.
   """
 
-  return FileResponse('img/favicon.ico')
+  return asset_response(request, favicon)
 
 
 @router.get("/logo.png", include_in_schema=False)
-def get_logo():
+def get_logo(request: Request):
   """
   Provides the app's logo.
   """
 
-  return FileResponse('img/logo.png')
+  return asset_response(request, logo)
@@ -9,7 +9,11 @@ This module provides routes for status.
 import time
 
 from .. import start_time
-from fastapi import APIRouter
+from ..executors import get_statistics
+from ..health import sampler
+from ..limits import get_counters
+from ..profiling import ProfiledRoute
+from fastapi import APIRouter, Response, status
 from pydantic import BaseModel
 
 
@@ -17,7 +21,7 @@ from pydantic import BaseModel
 # Router
 # --------------------------------------------------------------------------------
 
-router = APIRouter()
+router = APIRouter(route_class=ProfiledRoute)
 
 
 # --------------------------------------------------------------------------------
@@ -29,14 +33,74 @@ class Status(BaseModel):
   uptime: float
 
 
+class LimitCounters(BaseModel):
+  in_flight: int
+  throttled_reads: int
+  throttled_writes: int
+  shed: int
+
+
+class ExecutorStatistics(BaseModel):
+  name: str
+  threads: int
+  busy_threads: int
+  queued: int
+  max_queue: int
+  completed: int
+  rejected: int
+  queue_p50_ms: float
+  queue_p99_ms: float
+
+
+class LoopHealth(BaseModel):
+  lag_ms: float
+  sampled_at: float
+
+
+class ThreadpoolHealth(BaseModel):
+  busy_threads: int
+  total_threads: int
+  waiting: int
+
+
+class RegistryHealth(BaseModel):
+  probe_ms: float
+  devices: int
+  size_bytes: int
+  shards: int
+  pending_writes: int
+  flush_p99_ms: float
+  indexes: dict[str, int]
+  sampled_at: float
+
+
+class CacheHealth(BaseModel):
+  responses: float | None
+  documents: float | None
+
+
+class RequestHealth(LimitCounters):
+  count: int
+  p50_ms: float
+  p99_ms: float
+
+
+class StatusDetail(Status):
+  healthy: bool
+  reasons: list[str]
+  loop: LoopHealth | None
+  threadpool: ThreadpoolHealth | None
+  registry: RegistryHealth | None
+  caches: CacheHealth | None
+  requests: RequestHealth | None
+
+
 # --------------------------------------------------------------------------------
 # Routes
 # --------------------------------------------------------------------------------
 
 @router.get("/status", summary="Get the status of the service", response_model=Status)
-@router.get("/status/", include_in_schema=False)
 @router.head("/status", summary="Get the status of the service")
-@router.head("/status/", include_in_schema=False)
 def get_status():
   """
   Provides uptime information about the web service.
@@ -45,4 +109,48 @@ def get_status():
   return Status(
     online=True,
     uptime=round(time.time() - start_time, 3)
-  )
\ No newline at end of file
+  )
+
+
+@router.get("/status/limits", summary="Get rate limiting counters", response_model=LimitCounters)
+@router.head("/status/limits", summary="Get rate limiting counters")
+def get_status_limits():
+  """
+  Provides counts of requests rejected by rate limits and admission control,
+  plus the number of admitted requests currently in flight.
+  """
+
+  return LimitCounters(**get_counters())
+
+
+@router.get("/status/executors", summary="Get executor statistics", response_model=list[ExecutorStatistics])
+@router.head("/status/executors", summary="Get executor statistics")
+def get_status_executors():
+  """
+  Provides thread and queue usage for each named executor that runs heavy device routes,
+  including recent queue times and requests rejected because a queue was full.
+  """
+
+  return [ExecutorStatistics(**statistics) for statistics in get_statistics()]
+
+
+@router.get("/status/detail", summary="Get the detailed health of the service", response_model=StatusDetail)
+@router.head("/status/detail", summary="Get the detailed health of the service")
+def get_status_detail(response: Response):
+  """
+  Provides the latest health samples, which are taken in the background every few seconds.
+  They cover event-loop lag, threadpool saturation, storage probe latency,
+  registry and index sizes, cache hit ratios, and recent request latencies.
+  Responds with 503 when any sample is over its configured limit or has gone stale,
+  and 'reasons' says which.
+  """
+
+  report = sampler.report()
+  if not report['healthy']:
+    response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+
+  return StatusDetail(
+    online=True,
+    uptime=round(time.time() - start_time, 3),
+    **report
+  )
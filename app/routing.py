@@ -0,0 +1,170 @@
+"""
+This module dispatches requests through an index of routes instead of a linear scan.
+Routes are grouped by how many path segments they match and by their first segment,
+so a request is matched only against routes that could possibly match its path.
+Static paths like '/devices/search' find their route with one dictionary lookup,
+so a static route wins over any parameterized route that could also match, whatever their order.
+Otherwise, routes keep their declared order within each group, so the first matching route wins.
+Paths with a trailing slash are normalized before matching,
+so each route is registered once instead of once per slash variant.
+"""
+
+# --------------------------------------------------------------------------------
+# Imports
+# --------------------------------------------------------------------------------
+
+from fastapi import APIRouter
+from starlette.routing import Match, Route
+
+
+# --------------------------------------------------------------------------------
+# Path Functions
+# --------------------------------------------------------------------------------
+
+def normalize_path(path: str):
+  # '/devices/' is the same resource as '/devices'
+  if path != '/' and path.endswith('/'):
+    return path.rstrip('/') or '/'
+  return path
+
+
+def path_shape(path: str):
+  """
+  Returns the number of segments in a request path and its first segment.
+  """
+
+  segments = path.split('/')
+  return len(segments) - 1, segments[1]
+
+
+def route_shape(route):
+  """
+  Returns the shape of the paths a route can match, with None for a parameterized first segment.
+  Returns None for routes that may match paths of any shape, like mounts and ':path' parameters.
+  """
+
+  if not isinstance(route, Route) or ':path}' in route.path:
+    return None
+
+  count, first = path_shape(route.path)
+  return count, (None if '{' in first else first)
+
+
+# --------------------------------------------------------------------------------
+# Class: RouteIndex
+# --------------------------------------------------------------------------------
+
+class RouteIndex:
+  """
+  Lists the candidate routes for request paths, in the routes' declared order.
+  A path that is exactly a static route's path gets only the static routes for it,
+  so parameterized routes declared earlier do not shadow it.
+  """
+
+  def __init__(self, routes: list):
+    self.size = len(routes)
+    self._routes = [(route, route_shape(route)) for route in routes]
+
+    # Static paths, then shapes with a known first segment, then any first segment
+    self._static = dict()
+    self._shapes = dict()
+    self._counts = dict()
+    self._wildcards = self._select(None, None)
+
+    for route, shape in self._routes:
+      if shape is None:
+        continue
+      count, first = shape
+      if '{' not in route.path:
+        self._static.setdefault(route.path, self._select(shape, route.path))
+      if first is not None:
+        self._shapes.setdefault(shape, self._select(shape))
+      self._counts.setdefault(count, self._select((count, None)))
+
+
+  def _select(self, shape: tuple | None, path: str | None = None):
+    selected = []
+    for route, candidate_shape in self._routes:
+      if candidate_shape is None:
+        selected.append(route)
+      elif shape is None:
+        continue
+      elif '{' not in route.path:
+        # Static routes match only their own path
+        if route.path == path:
+          selected.append(route)
+      elif candidate_shape[0] == shape[0] and candidate_shape[1] in (None, shape[1]):
+        selected.append(route)
+    return selected
+
+
+  def candidates(self, path: str):
+    static = self._static.get(path)
+    if static is not None:
+      return static
+
+    shape = path_shape(path)
+    dynamic = self._shapes.get(shape)
+    if dynamic is None:
+      dynamic = self._counts.get(shape[0], self._wildcards)
+    return dynamic
+
+
+# --------------------------------------------------------------------------------
+# Class: IndexedRouter
+# --------------------------------------------------------------------------------
+
+class IndexedRouter(APIRouter):
+  """
+  Matches HTTP requests through a route index, rebuilt whenever routes are added.
+  Requests that match no route fall back to the standard scan,
+  which handles redirects and 404 responses.
+  """
+
+  async def __call__(self, scope, receive, send):
+    if scope['type'] != 'http':
+      await super().__call__(scope, receive, send)
+      return
+
+    path = normalize_path(scope['path'])
+    if path != scope['path']:
+      scope['path'] = path
+      if 'raw_path' in scope:
+        scope['raw_path'] = scope['raw_path'].rstrip(b'/') or b'/'
+
+    index = getattr(self, '_route_index', None)
+    if index is None or index.size != len(self.routes):
+      index = self._route_index = RouteIndex(self.routes)
+
+    if 'router' not in scope:
+      scope['router'] = self
+
+    partial = None
+    for route in index.candidates(path):
+      match, child_scope = route.matches(scope)
+      if match == Match.FULL:
+        scope.update(child_scope)
+        await route.handle(scope, receive, send)
+        return
+      elif match == Match.PARTIAL and partial is None:
+        partial = route
+        partial_scope = child_scope
+
+    if partial is not None:
+      # The route exists, but not for this method, so it responds with 405
+      scope.update(partial_scope)
+      await partial.handle(scope, receive, send)
+      return
+
+    await super().__call__(scope, receive, send)
+
+
+def use_indexed_router(app):
+  """
+  Switches an app's router to the indexed router.
+  FastAPI always creates a plain APIRouter, and the indexed router only adds behavior,
+  so the existing router and its routes are kept as they are.
+  """
+
+  app.router.__class__ = IndexedRouter
+  return app
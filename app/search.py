@@ -0,0 +1,210 @@
+"""
+This module provides full-text search over device names and locations.
+Each owner has an inverted index from tokens to devices,
+plus a prefix trie of tokens so partial words can be completed.
+"""
+
+# --------------------------------------------------------------------------------
+# Imports
+# --------------------------------------------------------------------------------
+
+import re
+
+from .indexes import lock, register
+
+
+# --------------------------------------------------------------------------------
+# Tokenization
+# --------------------------------------------------------------------------------
+
+# Field weights: a name match is worth more than a location match.
+FIELD_WEIGHTS = {
+  'name': 2,
+  'location': 1,
+}
+
+# Multiplier for a query token that matches a whole token, not just a prefix.
+EXACT_BONUS = 2
+
+_token_pattern = re.compile(r'[a-z0-9]+')
+
+
+def tokenize(text: str):
+  return _token_pattern.findall(text.lower())
+
+
+# --------------------------------------------------------------------------------
+# Class: TokenTrie
+# --------------------------------------------------------------------------------
+
+class _TrieNode:
+  __slots__ = ('children', 'terminal')
+
+  def __init__(self):
+    self.children = dict()
+    self.terminal = False
+
+
+class TokenTrie:
+
+  def __init__(self):
+    self.root = _TrieNode()
+
+
+  def add(self, token: str):
+    node = self.root
+    for char in token:
+      node = node.children.setdefault(char, _TrieNode())
+    node.terminal = True
+
+
+  def discard(self, token: str):
+
+    # Walk down the token while remembering the path for pruning
+    path = []
+    node = self.root
+    for char in token:
+      if char not in node.children:
+        return
+      path.append((node, char))
+      node = node.children[char]
+    node.terminal = False
+
+    # Prune nodes that no longer lead to any token
+    for parent, char in reversed(path):
+      child = parent.children[char]
+      if child.terminal or child.children:
+        break
+      del parent.children[char]
+
+
+  def complete(self, prefix: str):
+    node = self.root
+    for char in prefix:
+      node = node.children.get(char)
+      if node is None:
+        return
+
+    stack = [(node, prefix)]
+    while stack:
+      node, token = stack.pop()
+      if node.terminal:
+        yield token
+      for char, child in node.children.items():
+        stack.append((child, token + char))
+
+
+# --------------------------------------------------------------------------------
+# Class: SearchIndex
+# --------------------------------------------------------------------------------
+
+class _OwnerIndex:
+
+  def __init__(self):
+    self.postings = dict()
+    self.trie = TokenTrie()
+
+
+  def is_empty(self):
+    return not self.postings
+
+
+class SearchIndex:
+
+  def __init__(self):
+    self._owners = dict()
+
+
+  def __len__(self):
+    # Number of distinct tokens indexed, counted per owner
+    return sum(len(index.postings) for index in self._owners.values())
+
+
+  def _weights(self, device: dict):
+    weights = dict()
+    for field, weight in FIELD_WEIGHTS.items():
+      for token in set(tokenize(device[field])):
+        weights[token] = weights.get(token, 0) + weight
+    return weights
+
+
+  def add(self, device_id: int, device: dict):
+    owner_index = self._owners.setdefault(device['owner'], _OwnerIndex())
+
+    for token, weight in self._weights(device).items():
+      if token not in owner_index.postings:
+        owner_index.postings[token] = dict()
+        owner_index.trie.add(token)
+      owner_index.postings[token][device_id] = weight
+
+
+  def discard(self, device_id: int, device: dict):
+    owner_index = self._owners.get(device['owner'])
+    if owner_index is None:
+      return
+
+    for token in self._weights(device):
+      posting = owner_index.postings.get(token)
+      if posting is None:
+        continue
+      posting.pop(device_id, None)
+      if not posting:
+        del owner_index.postings[token]
+        owner_index.trie.discard(token)
+
+    if owner_index.is_empty():
+      del self._owners[device['owner']]
+
+
+  def search(self, owner: str, text: str, limit: int):
+    """
+    Returns the IDs of the owner's devices that match every token in the text.
+    Each query token may match a whole token or the beginning of one.
+    IDs are ranked by score, highest first.
+    """
+
+    query_tokens = tokenize(text)
+    owner_index = self._owners.get(owner)
+    if not query_tokens or owner_index is None:
+      return []
+
+    scores = None
+
+    for query_token in query_tokens:
+
+      # Score every device matching this query token
+      token_scores = dict()
+      for token in owner_index.trie.complete(query_token):
+        bonus = EXACT_BONUS if token == query_token else 1
+        for device_id, weight in owner_index.postings[token].items():
+          score = weight * bonus
+          if score > token_scores.get(device_id, 0):
+            token_scores[device_id] = score
+
+      # Keep only devices that matched all query tokens so far
+      if scores is None:
+        scores = token_scores
+      else:
+        scores = {
+          device_id: score + token_scores[device_id]
+          for device_id, score in scores.items()
+          if device_id in token_scores
+        }
+
+      if not scores:
+        return []
+
+    ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+    return [device_id for device_id, _ in ranked[:limit]]
+
+
+# --------------------------------------------------------------------------------
+# Index Registration
+# --------------------------------------------------------------------------------
+
+search_index = register('search', SearchIndex())
+
+
+def search_devices(owner: str, text: str, limit: int):
+  with lock:
+    return search_index.search(owner, text, limit)
@@ -0,0 +1,74 @@
+"""
+This module keeps an index of device serial numbers.
+Each serial number maps to the devices that have it,
+so devices can be looked up by serial number without scanning the database.
+New serial numbers are unique, but registries saved before that may repeat them,
+so a serial number can still map to several devices.
+"""
+
+# --------------------------------------------------------------------------------
+# Imports
+# --------------------------------------------------------------------------------
+
+from .indexes import lock, register
+
+
+# --------------------------------------------------------------------------------
+# Class: SerialIndex
+# --------------------------------------------------------------------------------
+
+class SerialIndex:
+
+  def __init__(self):
+    self._devices = dict()
+    self._count = 0
+
+
+  def __len__(self):
+    # Counts devices, not serial numbers, so the size matches the database
+    return self._count
+
+
+  def add(self, device_id: int, device: dict):
+    device_ids = self._devices.setdefault(device['serial_number'], set())
+    if device_id not in device_ids:
+      device_ids.add(device_id)
+      self._count += 1
+
+
+  def discard(self, device_id: int, device: dict):
+    device_ids = self._devices.get(device['serial_number'])
+    if device_ids is not None and device_id in device_ids:
+      device_ids.remove(device_id)
+      self._count -= 1
+      if not device_ids:
+        del self._devices[device['serial_number']]
+
+
+  def find(self, serial_number: str):
+    return sorted(self._devices.get(serial_number, ()))
+
+
+# --------------------------------------------------------------------------------
+# Index Registration
+# --------------------------------------------------------------------------------
+
+serial_index = register('serials', SerialIndex())
+
+
+def find_serial(serial_number: str):
+  """
+  Returns the IDs of the devices with a serial number, lowest first.
+  """
+
+  with lock:
+    return serial_index.find(serial_number)
+
+
+def is_serial_taken(serial_number: str, device_id: int | None = None):
+  """
+  Returns True if a device other than `device_id` has the serial number.
+  Call it while holding the index lock, together with the write it guards.
+  """
+
+  return any(holder != device_id for holder in serial_index.find(serial_number))
@@ -0,0 +1,274 @@
+"""
+This module spreads the device database over several shard files by owner.
+Each owner's devices live in one shard, chosen by hashing the owner's name,
+so a write rewrites only that shard's file instead of every owner's data.
+Device IDs encode their shard as `id % count`, so lookups by ID need no owner.
+Each shard has its own lock and group commit, so writes to different shards run in parallel,
+and concurrent writes to the same shard share file writes.
+With one shard, the database is the registry file itself, just like before sharding.
+"""
+
+# --------------------------------------------------------------------------------
+# Imports
+# --------------------------------------------------------------------------------
+
+import os
+import threading
+import zlib
+
+from contextlib import ExitStack, contextmanager
+
+from .commits import FlushError, GroupCommit
+from .durability import Durability
+from .storage import open_database
+from tinydb.table import Document
+
+
+# --------------------------------------------------------------------------------
+# Shard Functions
+# --------------------------------------------------------------------------------
+
+def shard_paths(path: str, count: int):
+  """
+  Returns the shard file paths for a registry, like 'registry.shard0.json'.
+  A single shard uses the registry path itself.
+  """
+
+  if count == 1:
+    return [path]
+
+  directory, name = os.path.split(path)
+  stem, dot, extensions = name.partition('.')
+  return [os.path.join(directory, f'{stem}.shard{i}{dot}{extensions}') for i in range(count)]
+
+
+def shard_of_owner(owner: str, count: int):
+  # CRC32 is stable across runs, unlike Python's salted string hashes
+  return zlib.crc32(owner.encode('utf-8')) % count
+
+
+def shard_of_id(doc_id: int, count: int):
+  return doc_id % count
+
+
+def first_id(shard: int, count: int):
+  # IDs start at 1 with one shard, and never collide across shards
+  return shard + count
+
+
+# --------------------------------------------------------------------------------
+# Class: ShardedDatabase
+# --------------------------------------------------------------------------------
+
+class ShardedDatabase:
+  """
+  Routes TinyDB operations to shards by owner or by device ID.
+  Inserts allocate IDs per shard, stepping by the shard count.
+  Mutations should run inside `writing()`, which holds the shard's lock
+  and waits for the shard's group commit when the block ends.
+  Documents are changed only with `replace()`, never in place, since readers take no lock.
+  """
+
+  def __init__(
+    self,
+    paths: list[str],
+    format_name: str = 'auto',
+    mmap_cache_size: int = 10000,
+    commit_window_seconds: float = 0.0,
+    commit_max_batch: int = 1,
+    durability: Durability | None = None):
+
+    self.paths = paths
+    self.count = len(paths)
+    self.durability = durability or Durability()
+    self.shards = [
+      open_database(path, format_name, mmap_cache_size, deferred=True, durability=self.durability)
+      for path in paths
+    ]
+    self.locks = [threading.RLock() for _ in paths]
+    self.commits = [
+      GroupCommit(shard.storage, lock, commit_window_seconds, commit_max_batch)
+      for shard, lock in zip(self.shards, self.locks)
+    ]
+
+    # Next ID for each shard, found from existing IDs on the first insert
+    self.next_ids = [None] * self.count
+
+
+  def shard_for_owner(self, owner: str):
+    return shard_of_owner(owner, self.count)
+
+
+  def shard_for_id(self, doc_id: int):
+    return shard_of_id(doc_id, self.count)
+
+
+  @contextmanager
+  def writing(self, shard: int):
+    """
+    Holds a shard's lock for a mutation, then waits until the mutation is durable.
+    The wait happens after the lock is released, so other writes can join the same flush.
+    Blocks that write nothing, like those that raise before writing, do not wait.
+    Mutations that raise partway are still flushed before the error propagates,
+    and the block's own error is raised even if that flush fails.
+    """
+
+    commit = self.commits[shard]
+    commit.enter()
+
+    ticket = None
+    try:
+      with self.locks[shard]:
+        writes = commit.storage.writes
+        try:
+          yield
+        finally:
+          ticket = commit.record(writes)
+    except Exception:
+      if ticket is not None:
+        try:
+          commit.wait(ticket)
+        except FlushError:
+          # The mutation stays applied, and a later flush writes it
+          pass
+      raise
+
+    if ticket is not None:
+      commit.wait(ticket)
+
+
+  def _allocate_id(self, shard: int):
+    if self.next_ids[shard] is None:
+      table = self.shards[shard].table(self.shards[shard].default_table_name)
+      highest = max((int(doc_id) for doc_id in table._read_table()), default=0)
+      self.next_ids[shard] = max(first_id(shard, self.count), highest + self.count)
+
+    doc_id = self.next_ids[shard]
+    self.next_ids[shard] += self.count
+    return doc_id
+
+
+  def get(self, doc_id: int):
+    return self.shards[self.shard_for_id(doc_id)].get(doc_id=doc_id)
+
+
+  def search(self, cond, owner: str | None = None):
+    if owner is not None:
+      return self.shards[self.shard_for_owner(owner)].search(cond)
+    return [document for shard in self.shards for document in shard.search(cond)]
+
+
+  def all(self):
+    return [document for shard in self.shards for document in shard.all()]
+
+
+  def __len__(self):
+    return sum(len(shard) for shard in self.shards)
+
+
+  def insert(self, document: dict):
+    shard = self.shard_for_owner(document['owner'])
+    with self.locks[shard]:
+      doc_id = self._allocate_id(shard)
+      return self.shards[shard].insert(Document(document, doc_id=doc_id))
+
+
+  def replace(self, doc_id: int, replacer):
+    """
+    Replaces one document with the one that `replacer(document)` returns.
+    The old document is never changed, so readers that take no lock see either version whole.
+    Raises KeyError before calling `replacer` if there is no such document.
+    """
+
+    shard = self.shard_for_id(doc_id)
+    table = self.shards[shard].table(self.shards[shard].default_table_name)
+
+    def updater(documents: dict):
+      documents[doc_id] = replacer(documents[doc_id])
+
+    with self.locks[shard]:
+      table._update_table(updater)
+
+
+  def remove(self, doc_ids: list[int]):
+    removed = []
+    for doc_id in doc_ids:
+      shard = self.shard_for_id(doc_id)
+      with self.locks[shard]:
+        removed += self.shards[shard].remove(doc_ids=[doc_id])
+    return removed
+
+
+  def checkpoint(self):
+    """
+    Opens every shard file as of one point in time, for reading a consistent backup.
+    Writes replace shard files instead of changing them, so the opened files never change.
+    Pending writes are copied from all shards under their locks at once, as in a flush,
+    and written without the locks, so writers are held up only as long as a normal flush.
+    Returns open binary files in shard order, which the caller must close.
+    """
+
+    with ExitStack() as flushes:
+      # No other flush may write a shard file between the copy and opening it
+      for commit in self.commits:
+        flushes.enter_context(commit.exclusive())
+
+      pending = []
+      with ExitStack() as locks:
+        for lock in self.locks:
+          locks.enter_context(lock)
+        for shard, commit in zip(self.shards, self.commits):
+          storage = shard.storage
+          if storage.dirty:
+            pending.append((storage, commit, commit.applied, storage.snapshot()))
+
+      for position, (storage, commit, seq, data) in enumerate(pending):
+        try:
+          storage.write_snapshot(data)
+        except Exception:
+          # The data is still in memory, so later flushes write it again
+          for unwritten, unwritten_commit, _, _ in pending[position:]:
+            with unwritten_commit.lock:
+              unwritten.dirty = True
+          raise
+        commit.mark_durable(seq)
+
+      files = []
+      try:
+        for path in self.paths:
+          files.append(open(path, 'rb'))
+      except Exception:
+        for opened in files:
+          opened.close()
+        raise
+      return files
+
+
+  def sync(self):
+    # Forces writes that the durability mode has not synced yet to disk
+    self.durability.sync()
+
+
+  def close(self):
+    for shard in self.shards:
+      shard.close()
+    self.sync()
+
+
+# --------------------------------------------------------------------------------
+# Database Connection
+# --------------------------------------------------------------------------------
+
+def open_sharded_database(
+  path: str,
+  count: int = 1,
+  format_name: str = 'auto',
+  mmap_cache_size: int = 10000,
+  commit_window_seconds: float = 0.0,
+  commit_max_batch: int = 1,
+  durability: Durability | None = None):
+
+  paths = shard_paths(path, count)
+  return ShardedDatabase(
+    paths, format_name, mmap_cache_size,
+    commit_window_seconds, commit_max_batch, durability)
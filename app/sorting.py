@@ -0,0 +1,99 @@
+"""
+This module keeps each owner's devices in sorted order for every sortable field.
+Listings can then be returned in order without sorting them per request.
+"""
+
+# --------------------------------------------------------------------------------
+# Imports
+# --------------------------------------------------------------------------------
+
+from bisect import bisect_left, insort
+
+from .indexes import lock, register
+
+
+# --------------------------------------------------------------------------------
+# Sortable Fields
+# --------------------------------------------------------------------------------
+
+SORT_FIELDS = ('id', 'name', 'location', 'type', 'model', 'serial_number')
+
+
+def _sort_key(field: str, device_id: int, device: dict):
+  if field == 'id':
+    return (device_id, device_id)
+  return (device[field].casefold(), device_id)
+
+
+# --------------------------------------------------------------------------------
+# Class: SortIndex
+# --------------------------------------------------------------------------------
+
+class SortIndex:
+
+  def __init__(self):
+    self._owners = dict()
+
+
+  def __len__(self):
+    # Number of devices indexed
+    return sum(len(owner_lists['id']) for owner_lists in self._owners.values())
+
+
+  def add(self, device_id: int, device: dict):
+    owner_lists = self._owners.setdefault(
+      device['owner'],
+      {field: [] for field in SORT_FIELDS})
+
+    for field, keys in owner_lists.items():
+      insort(keys, _sort_key(field, device_id, device))
+
+
+  def discard(self, device_id: int, device: dict):
+    owner_lists = self._owners.get(device['owner'])
+    if owner_lists is None:
+      return
+
+    for field, keys in owner_lists.items():
+      key = _sort_key(field, device_id, device)
+      position = bisect_left(keys, key)
+      if position < len(keys) and keys[position] == key:
+        del keys[position]
+
+    if not owner_lists['id']:
+      del self._owners[device['owner']]
+
+
+  def ordered_ids(self, owner: str, field: str, descending: bool):
+    owner_lists = self._owners.get(owner)
+    if owner_lists is None:
+      return []
+
+    keys = owner_lists[field]
+    if descending:
+      keys = reversed(keys)
+    return [device_id for _, device_id in keys]
+
+
+# --------------------------------------------------------------------------------
+# Index Registration
+# --------------------------------------------------------------------------------
+
+sort_index = register('sort', SortIndex())
+
+
+def order_devices(owner: str, sort: str, devices: list[dict]):
+  """
+  Orders the owner's devices by a sort key like 'name' or '-name'.
+  A leading '-' sorts in descending order.
+  Devices must already have their 'id' set.
+  """
+
+  field = sort.lstrip('-')
+  descending = sort.startswith('-')
+
+  with lock:
+    device_ids = sort_index.ordered_ids(owner, field, descending)
+
+  by_id = {device['id']: device for device in devices}
+  return [by_id[device_id] for device_id in device_ids if device_id in by_id]
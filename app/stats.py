@@ -0,0 +1,78 @@
+"""
+This module keeps per-owner device counts grouped by category.
+Counts change on every insert, update, and remove,
+so reading them costs only as much as the number of groups.
+"""
+
+# --------------------------------------------------------------------------------
+# Imports
+# --------------------------------------------------------------------------------
+
+from collections import Counter
+
+from .indexes import lock, register
+
+
+# --------------------------------------------------------------------------------
+# Grouped Fields
+# --------------------------------------------------------------------------------
+
+STATS_FIELDS = ('type', 'location', 'model')
+
+
+# --------------------------------------------------------------------------------
+# Class: StatsIndex
+# --------------------------------------------------------------------------------
+
+class StatsIndex:
+
+  def __init__(self):
+    self._owners = dict()
+
+
+  def __len__(self):
+    # Number of devices counted
+    return sum(sum(counters['type'].values()) for counters in self._owners.values())
+
+
+  def add(self, device_id: int, device: dict):
+    counters = self._owners.setdefault(
+      device['owner'],
+      {field: Counter() for field in STATS_FIELDS})
+
+    for field, counter in counters.items():
+      counter[device[field]] += 1
+
+
+  def discard(self, device_id: int, device: dict):
+    counters = self._owners.get(device['owner'])
+    if counters is None:
+      return
+
+    for field, counter in counters.items():
+      value = device[field]
+      counter[value] -= 1
+      if counter[value] <= 0:
+        del counter[value]
+
+    if not counters['type']:
+      del self._owners[device['owner']]
+
+
+  def counts(self, owner: str):
+    counters = self._owners.get(owner)
+    if counters is None:
+      return {field: dict() for field in STATS_FIELDS}
+    return {field: dict(counter) for field, counter in counters.items()}
+
+
+# --------------------------------------------------------------------------------
+# Index Registration
+# --------------------------------------------------------------------------------
+
+stats_index = register('stats', StatsIndex())
+
+
+def get_counts(owner: str):
+  with lock:
+    return stats_index.counts(owner)
@@ -0,0 +1,379 @@
+"""
+This module provides storage classes for the TinyDB database.
+Registry files may be JSON or MessagePack, optionally compressed with gzip or zstd.
+Formats are named like 'json', 'msgpack', 'json.gz', or 'msgpack.zst'.
+MessagePack and zstd need the optional `msgpack` and `zstandard` packages.
+The 'mmap' format is a read-optimized layout that is memory-mapped instead of loaded.
+"""
+
+# --------------------------------------------------------------------------------
+# Imports
+# --------------------------------------------------------------------------------
+
+import gzip
+import json
+import os
+import tinydb
+
+from .durability import Durability
+from .mapped import MAGIC as MMAP_MAGIC, MappedStorage, decode_mapped, encode_mapped, not_mapped_error
+from .records import RecordTable
+from tinydb.middlewares import Middleware
+from tinydb.storages import Storage, touch
+
+
+# --------------------------------------------------------------------------------
+# Serializers
+# --------------------------------------------------------------------------------
+
+def _msgpack():
+  try:
+    import msgpack
+  except ImportError:
+    raise ImportError("The 'msgpack' format requires the msgpack package: pip install msgpack")
+  return msgpack
+
+
+def _json_dumps(data):
+  return json.dumps(data).encode('utf-8')
+
+
+def _json_loads(raw: bytes):
+  return json.loads(raw)
+
+
+def _msgpack_dumps(data):
+  return _msgpack().packb(data)
+
+
+def _msgpack_loads(raw: bytes):
+  return _msgpack().unpackb(raw, raw=False, strict_map_key=False)
+
+
+SERIALIZERS = {
+  'json': (_json_dumps, _json_loads),
+  'msgpack': (_msgpack_dumps, _msgpack_loads),
+  'mmap': (encode_mapped, decode_mapped),
+}
+
+
+# --------------------------------------------------------------------------------
+# Compressions
+# --------------------------------------------------------------------------------
+
+GZIP_LEVEL = 6
+ZSTD_LEVEL = 3
+
+
+def _zstandard():
+  try:
+    import zstandard
+  except ImportError:
+    raise ImportError("The 'zst' compression requires the zstandard package: pip install zstandard")
+  return zstandard
+
+
+def _gzip_compress(raw: bytes):
+  return gzip.compress(raw, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+def _zstd_compress(raw: bytes):
+  return _zstandard().ZstdCompressor(level=ZSTD_LEVEL).compress(raw)
+
+
+def _zstd_decompress(raw: bytes):
+  return _zstandard().ZstdDecompressor().decompressobj().decompress(raw)
+
+
+COMPRESSIONS = {
+  'gz': (_gzip_compress, gzip.decompress),
+  'zst': (_zstd_compress, _zstd_decompress),
+}
+
+# Leading bytes that identify compressed files
+MAGIC_NUMBERS = {
+  b'\x1f\x8b': 'gz',
+  b'\x28\xb5\x2f\xfd': 'zst',
+}
+
+
+# --------------------------------------------------------------------------------
+# Format Functions
+# --------------------------------------------------------------------------------
+
+def parse_format(name: str):
+  """
+  Splits a format name like 'msgpack.zst' into its serializer and compression.
+  """
+
+  serializer, _, compression = name.partition('.')
+  if serializer not in SERIALIZERS or (compression and compression not in COMPRESSIONS):
+    raise ValueError(f"Unknown registry format: '{name}'")
+  if serializer == 'mmap' and compression:
+    raise ValueError("The 'mmap' format cannot be compressed")
+  return serializer, compression or None
+
+
+def format_from_path(path: str):
+  """
+  Guesses a format from a file name, like 'registry.msgpack.gz'.
+  Files with unknown extensions are JSON.
+  """
+
+  parts = os.path.basename(path).split('.')[1:]
+
+  compression = None
+  if parts and parts[-1] in COMPRESSIONS:
+    compression = parts.pop()
+
+  serializer = 'json'
+  if parts and parts[-1] in ('msgpack', 'mpk'):
+    serializer = 'msgpack'
+  elif parts and parts[-1] == 'mmap' and not compression:
+    serializer = 'mmap'
+
+  return f'{serializer}.{compression}' if compression else serializer
+
+
+def _sniff(raw: bytes):
+  """
+  Returns the format of serialized registry data and its decompressed payload.
+  """
+
+  if raw.startswith(MMAP_MAGIC):
+    return 'mmap', raw
+
+  compression = None
+  for magic, name in MAGIC_NUMBERS.items():
+    if raw.startswith(magic):
+      compression = name
+      raw = COMPRESSIONS[name][1](raw)
+      break
+
+  serializer = 'json' if raw.lstrip()[:1] in (b'{', b'') else 'msgpack'
+  format_name = f'{serializer}.{compression}' if compression else serializer
+  return format_name, raw
+
+
+def detect_format(raw: bytes):
+  """
+  Detects the format of serialized registry data from its leading bytes.
+  """
+
+  return _sniff(raw)[0]
+
+
+def encode(data, format_name: str):
+  serializer, compression = parse_format(format_name)
+  raw = SERIALIZERS[serializer][0](data)
+  if compression:
+    raw = COMPRESSIONS[compression][0](raw)
+  return raw
+
+
+def decode(raw: bytes, format_name: str | None = None):
+  if format_name is None:
+    format_name, raw = _sniff(raw)
+    serializer, _ = parse_format(format_name)
+  else:
+    serializer, compression = parse_format(format_name)
+    if compression:
+      raw = COMPRESSIONS[compression][1](raw)
+
+  return SERIALIZERS[serializer][1](raw)
+
+
+# --------------------------------------------------------------------------------
+# Storages
+# --------------------------------------------------------------------------------
+
+class RegistryStorage(Storage):
+  """
+  Stores the database in a file using any supported format.
+  Reads detect the file's format from its contents.
+  Writes use the configured format, or with 'auto', the format the file already has.
+  A new or empty file with 'auto' gets the format implied by its extension.
+  Writes replace the file atomically, with the fsync policy from `durability`.
+  """
+
+  def __init__(
+    self,
+    path: str,
+    format_name: str = 'auto',
+    create_dirs: bool = False,
+    durability: Durability | None = None):
+
+    touch(path, create_dirs)
+    self.path = path
+    self.durability = durability or Durability()
+
+    if format_name != 'auto':
+      parse_format(format_name)
+    self.format_name = format_name
+
+
+  def read(self):
+    with open(self.path, 'rb') as registry:
+      raw = registry.read()
+
+    if not raw:
+      return None
+
+    format_name, payload = _sniff(raw)
+    if self.format_name == 'auto':
+      self.format_name = format_name
+
+    serializer, _ = parse_format(format_name)
+    return SERIALIZERS[serializer][1](payload)
+
+
+  def write(self, data):
+    if self.format_name == 'auto':
+      self.format_name = format_from_path(self.path)
+    self.durability.write(self.path, encode(data, self.format_name))
+
+
+# --------------------------------------------------------------------------------
+# Middlewares
+# --------------------------------------------------------------------------------
+
+class RecordCacheMiddleware(Middleware):
+  """
+  Keeps the database in memory as compact records so reads do not re-parse the file.
+  Every write goes to the underlying storage immediately,
+  unless writes are deferred, in which case they wait for `flush()`.
+  Deferring lets callers do the slow file write after releasing other locks.
+  For that, `snapshot()` copies the data under the caller's lock,
+  and `write_snapshot()` writes the copy without it.
+  """
+
+  def __init__(self, storage_cls, deferred: bool = False):
+    super().__init__(storage_cls)
+    self.cache = None
+    self.deferred = deferred
+    self.dirty = False
+
+    # Counts writes, so callers can tell whether their mutation wrote anything
+    self.writes = 0
+
+
+  def read(self):
+    if self.cache is None:
+      data = self.storage.read() or dict()
+      self.cache = {name: RecordTable(table) for name, table in data.items()}
+
+    # TinyDB replaces tables in the returned dict, so each read gets a new one
+    return dict(self.cache)
+
+
+  def write(self, data):
+    self.writes += 1
+    self.cache = {
+      name: table if isinstance(table, RecordTable) else RecordTable(table)
+      for name, table in data.items()
+    }
+
+    if self.deferred:
+      self.dirty = True
+    else:
+      self._write_through()
+
+
+  def flush(self):
+    if self.dirty:
+      self._write_through()
+
+
+  def snapshot(self):
+    self.dirty = False
+    return {name: table.to_dict() for name, table in self.cache.items()}
+
+
+  def write_snapshot(self, data):
+    self.storage.write(data)
+
+
+  def close(self):
+    self.flush()
+    self.storage.close()
+
+
+  def _write_through(self):
+    self.write_snapshot(self.snapshot())
+
+
+# --------------------------------------------------------------------------------
+# Document Functions
+# --------------------------------------------------------------------------------
+
+def versioned_update(db, doc_id: int, fields: dict, check=None):
+  """
+  Updates one document and increments its version in a single table update.
+  `check(document)` runs inside the update before anything changes,
+  and it may raise to abort the update without writing.
+  This makes it a compare-and-set when `check` compares the current version.
+  The document is replaced rather than changed in place,
+  so readers never see a mix of old fields and the new version.
+  Returns copies of the document before and after the update,
+  or None if there is no such document.
+  """
+
+  results = []
+
+  def replacer(document):
+    before = dict(document)
+    results.append(before)
+    if check is not None:
+      check(before)
+    after = {**before, **fields, 'version': before.get('version', 0) + 1}
+    results.append(dict(after))
+    return after
+
+  try:
+    db.replace(doc_id, replacer)
+  except KeyError:
+    # TinyDB raises before calling the updater if the document is missing
+    if results:
+      raise
+    return None
+
+  before, after = results
+  return before, after
+
+
+# --------------------------------------------------------------------------------
+# Database Connection
+# --------------------------------------------------------------------------------
+
+def open_database(
+  path: str,
+  format_name: str = 'auto',
+  mmap_cache_size: int = 10000,
+  deferred: bool = False,
+  durability: Durability | None = None):
+  """
+  Opens the TinyDB database with the storage that suits its format.
+  Memory-mapped registries are read lazily, and they are always written immediately.
+  All other formats are loaded into memory as compact records.
+  With `deferred`, their writes wait until the storage's `flush()` is called.
+  Writes use the fsync policy from `durability`, which defaults to fsync on every write.
+  """
+
+  if format_name in ('auto', 'mmap') and os.path.exists(path) and os.path.getsize(path) > 0:
+    with open(path, 'rb') as registry:
+      mapped = registry.read(len(MMAP_MAGIC)) == MMAP_MAGIC
+    if format_name == 'auto' and mapped:
+      format_name = 'mmap'
+
+    # Otherwise the file would only fail once it is read, with a less helpful error
+    elif format_name == 'mmap' and not mapped:
+      raise not_mapped_error(path)
+
+  if format_name == 'auto' and format_from_path(path) == 'mmap':
+    format_name = 'mmap'
+
+  if format_name == 'mmap':
+    return tinydb.TinyDB(path, mmap_cache_size, durability=durability, storage=MappedStorage)
+
+  storage = RecordCacheMiddleware(RegistryStorage, deferred)
+  return tinydb.TinyDB(path, format_name, durability=durability, storage=storage)
@@ -0,0 +1,92 @@
+"""
+This module benchmarks write throughput as concurrent writers increase.
+It compares group commit, where concurrent writes share file writes,
+against flushing the file once for every write while holding the shard's lock.
+Run it from the project root: `python -m benchmarks.bench_commits --devices 5000`.
+"""
+
+# --------------------------------------------------------------------------------
+# Imports
+# --------------------------------------------------------------------------------
+
+import argparse
+import os
+import tempfile
+import time
+
+from app.shards import open_sharded_database
+from benchmarks.bench_memory import generate_registry
+from benchmarks.bench_shards import new_device
+from concurrent.futures import ThreadPoolExecutor
+
+
+# --------------------------------------------------------------------------------
+# Globals
+# --------------------------------------------------------------------------------
+
+THREAD_COUNTS = [1, 2, 4, 8, 16, 32]
+
+OWNER = 'bench'
+
+
+# --------------------------------------------------------------------------------
+# Write Functions
+# --------------------------------------------------------------------------------
+
+def insert_grouped(db, n: int):
+  with db.writing(0):
+    db.insert(new_device(OWNER, n))
+
+
+def insert_flush_each(db, n: int):
+  with db.locks[0]:
+    db.insert(new_device(OWNER, n))
+    db.shards[0].storage.flush()
+
+
+# --------------------------------------------------------------------------------
+# Measurement
+# --------------------------------------------------------------------------------
+
+def measure(insert, text: str, directory: str, threads: int, writes: int, window: float, max_batch: int):
+  path = os.path.join(directory, f'registry-{insert.__name__}-{threads}.json')
+  with open(path, 'w') as registry:
+    registry.write(text)
+
+  db = open_sharded_database(path, 1, commit_window_seconds=window, commit_max_batch=max_batch)
+  db.get(1)
+
+  start = time.perf_counter()
+  with ThreadPoolExecutor(max_workers=threads) as executor:
+    list(executor.map(lambda n: insert(db, n), range(writes)))
+  elapsed = time.perf_counter() - start
+
+  flushes = db.commits[0].flushes or writes
+  return writes / elapsed, writes / flushes
+
+
+# --------------------------------------------------------------------------------
+# Main
+# --------------------------------------------------------------------------------
+
+def main():
+  parser = argparse.ArgumentParser(description=__doc__)
+  parser.add_argument('--devices', type=int, default=5000)
+  parser.add_argument('--writes', type=int, default=200)
+  parser.add_argument('--window', type=float, default=0.002)
+  parser.add_argument('--max-batch', type=int, default=64)
+  args = parser.parse_args()
+
+  text = generate_registry(args.devices)
+  print(f'Devices: {args.devices}, writes: {args.writes}')
+  print(f'{"threads":>7}  {"flush each/s":>12}  {"grouped/s":>9}  {"batch size":>10}')
+
+  with tempfile.TemporaryDirectory() as directory:
+    for threads in THREAD_COUNTS:
+      each, _ = measure(insert_flush_each, text, directory, threads, args.writes, args.window, args.max_batch)
+      grouped, batch = measure(insert_grouped, text, directory, threads, args.writes, args.window, args.max_batch)
+      print(f'{threads:>7}  {each:12.1f}  {grouped:9.1f}  {batch:10.1f}')
+
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,71 @@
+"""
+This module benchmarks registry write latency in each durability mode.
+Every mode writes a temporary file and renames it over the registry.
+They differ only in when the data is forced to disk.
+Fsync costs depend on the disk, so files are written in `--directory`, the current directory by default.
+On a memory-backed filesystem like tmpfs, every mode costs about the same.
+Run it from the project root: `python -m benchmarks.bench_durability --devices 10000`.
+"""
+
+# --------------------------------------------------------------------------------
+# Imports
+# --------------------------------------------------------------------------------
+
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import time
+
+from app.durability import DURABILITY_MODES, Durability
+from app.storage import RegistryStorage
+from benchmarks.bench_memory import generate_registry
+
+
+# --------------------------------------------------------------------------------
+# Measurement
+# --------------------------------------------------------------------------------
+
+def measure(mode: str, data: dict, directory: str, writes: int):
+  path = os.path.join(directory, f'registry-{mode}.json')
+  durability = Durability(mode)
+  storage = RegistryStorage(path, 'json', durability=durability)
+
+  latencies = []
+  for _ in range(writes):
+    start = time.perf_counter()
+    storage.write(data)
+    latencies.append(time.perf_counter() - start)
+
+  # Background syncs are not part of write latency, but they must finish
+  durability.sync()
+
+  latencies.sort()
+  p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+  return statistics.mean(latencies), statistics.median(latencies), p99
+
+
+# --------------------------------------------------------------------------------
+# Main
+# --------------------------------------------------------------------------------
+
+def main():
+  parser = argparse.ArgumentParser(description=__doc__)
+  parser.add_argument('--devices', type=int, default=10000)
+  parser.add_argument('--writes', type=int, default=50)
+  parser.add_argument('--directory', default='.')
+  args = parser.parse_args()
+
+  data = json.loads(generate_registry(args.devices))
+  print(f'Devices: {args.devices}, writes: {args.writes}')
+  print(f'{"mode":>8}  {"mean ms":>8}  {"p50 ms":>8}  {"p99 ms":>8}')
+
+  with tempfile.TemporaryDirectory(dir=args.directory) as directory:
+    for mode in DURABILITY_MODES:
+      mean, p50, p99 = measure(mode, data, directory, args.writes)
+      print(f'{mode:>8}  {mean * 1000:8.2f}  {p50 * 1000:8.2f}  {p99 * 1000:8.2f}')
+
+
+if __name__ == '__main__':
+  main()
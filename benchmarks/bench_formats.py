@@ -0,0 +1,81 @@
+"""
+This module benchmarks loading and saving the registry in each storage format.
+It also times opening the database and looking up one device, as a server does at startup.
+Formats whose optional packages are not installed are skipped.
+Run it from the project root: `python -m benchmarks.bench_formats --devices 100000`.
+"""
+
+# --------------------------------------------------------------------------------
+# Imports
+# --------------------------------------------------------------------------------
+
+import argparse
+import json
+import os
+import tempfile
+import time
+
+from app.storage import RegistryStorage, open_database
+from benchmarks.bench_memory import generate_registry
+
+
+# --------------------------------------------------------------------------------
+# Globals
+# --------------------------------------------------------------------------------
+
+FORMATS = ['json', 'json.gz', 'json.zst', 'msgpack', 'msgpack.gz', 'msgpack.zst', 'mmap']
+
+
+# --------------------------------------------------------------------------------
+# Measurement
+# --------------------------------------------------------------------------------
+
+def best_time(function, repeat: int):
+  times = []
+  for _ in range(repeat):
+    start = time.perf_counter()
+    function()
+    times.append(time.perf_counter() - start)
+  return min(times)
+
+
+def measure(format_name: str, data: dict, directory: str, repeat: int):
+  path = os.path.join(directory, f'registry.{format_name}')
+  storage = RegistryStorage(path, format_name)
+
+  save = best_time(lambda: storage.write(data), repeat)
+  load = best_time(storage.read, repeat)
+  assert storage.read() == data
+
+  doc_id = len(data['_default']) // 2
+  first_get = best_time(lambda: open_database(path, format_name).get(doc_id=doc_id), repeat)
+
+  return save, load, first_get, os.path.getsize(path)
+
+
+# --------------------------------------------------------------------------------
+# Main
+# --------------------------------------------------------------------------------
+
+def main():
+  parser = argparse.ArgumentParser(description=__doc__)
+  parser.add_argument('--devices', type=int, default=100000)
+  parser.add_argument('--repeat', type=int, default=3)
+  args = parser.parse_args()
+
+  data = json.loads(generate_registry(args.devices))
+  print(f'Devices: {args.devices}')
+  print(f'{"format":>12}  {"save ms":>8}  {"load ms":>8}  {"open+get ms":>11}  {"size KiB":>9}')
+
+  with tempfile.TemporaryDirectory() as directory:
+    for format_name in FORMATS:
+      try:
+        save, load, first_get, size = measure(format_name, data, directory, args.repeat)
+      except ImportError as error:
+        print(f'{format_name:>12}  skipped: {error}')
+        continue
+      print(f'{format_name:>12}  {save * 1000:8.1f}  {load * 1000:8.1f}  {first_get * 1000:11.1f}  {size / 1024:9.0f}')
+
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,98 @@
+"""
+This module benchmarks the memory used to hold a registry in memory.
+It compares TinyDB's dict-per-document layout against compact device records.
+Run it from the project root: `python -m benchmarks.bench_memory --devices 100000`.
+"""
+
+# --------------------------------------------------------------------------------
+# Imports
+# --------------------------------------------------------------------------------
+
+import argparse
+import gc
+import json
+import random
+import tracemalloc
+
+from app.records import RecordTable
+
+
+# --------------------------------------------------------------------------------
+# Data Generation
+# --------------------------------------------------------------------------------
+
+def generate_registry(count: int, seed: int = 42):
+  rng = random.Random(seed)
+  owners = [f'user{i}' for i in range(max(1, count // 100))]
+  types = [f'Type {i}' for i in range(20)]
+  models = [f'Model {i}' for i in range(200)]
+  locations = [f'Room {i}' for i in range(50)]
+
+  table = dict()
+  for doc_id in range(1, count + 1):
+    device_type = rng.choice(types)
+    location = rng.choice(locations)
+    table[str(doc_id)] = {
+      'name': f'{location} {device_type} {doc_id}',
+      'location': location,
+      'type': device_type,
+      'model': rng.choice(models),
+      'serial_number': f'SN-{doc_id:08d}',
+      'owner': rng.choice(owners),
+    }
+
+  return json.dumps({'_default': table})
+
+
+# --------------------------------------------------------------------------------
+# Measurement
+# --------------------------------------------------------------------------------
+
+def measure(build, text: str):
+  """
+  Returns the bytes still allocated by the structure that `build(text)` returns.
+  """
+
+  gc.collect()
+  tracemalloc.start()
+  structure = build(text)
+  gc.collect()
+  size, _ = tracemalloc.get_traced_memory()
+  tracemalloc.stop()
+
+  del structure
+  return size
+
+
+def build_dicts(text: str):
+  return json.loads(text)['_default']
+
+
+def build_records(text: str):
+  return RecordTable(json.loads(text)['_default'])
+
+
+# --------------------------------------------------------------------------------
+# Main
+# --------------------------------------------------------------------------------
+
+def main():
+  parser = argparse.ArgumentParser(description=__doc__)
+  parser.add_argument('--devices', type=int, default=100000)
+  args = parser.parse_args()
+
+  text = generate_registry(args.devices)
+  results = {
+    'dict per document': measure(build_dicts, text),
+    'compact records': measure(build_records, text),
+  }
+
+  baseline = results['dict per document']
+  print(f'Devices: {args.devices}')
+  for layout, size in results.items():
+    per_device = size / args.devices
+    print(f'{layout:>18}: {size / 2**20:8.1f} MiB  {per_device:6.0f} B/device  {size / baseline:5.0%}')
+
+
+if __name__ == '__main__':
+  main()
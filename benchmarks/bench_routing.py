@@ -0,0 +1,112 @@
+"""
+This module benchmarks how long it takes to match a request to its route.
+It compares a linear scan of the route table as it was with trailing-slash duplicates,
+a linear scan of the table without them, and the route index the app uses.
+Run it from the project root: `python -m benchmarks.bench_routing --rounds 20000`.
+"""
+
+# --------------------------------------------------------------------------------
+# Imports
+# --------------------------------------------------------------------------------
+
+import argparse
+import copy
+import time
+
+from app.main import app
+from app.routing import RouteIndex
+from starlette.routing import Match, Route, compile_path
+
+
+# --------------------------------------------------------------------------------
+# Globals
+# --------------------------------------------------------------------------------
+
+REQUESTS = [
+  ('GET', '/devices'),
+  ('POST', '/devices'),
+  ('GET', '/devices/12'),
+  ('PATCH', '/devices/12'),
+  ('GET', '/devices/12/report'),
+  ('GET', '/devices/search'),
+  ('GET', '/devices/by-serial/TB3G-12345'),
+  ('GET', '/status'),
+]
+
+
+# --------------------------------------------------------------------------------
+# Route Tables
+# --------------------------------------------------------------------------------
+
+def with_slash_duplicates(routes: list):
+  """
+  Rebuilds the old route table, where each documented route also had a trailing-slash copy.
+  """
+
+  table = []
+  for route in routes:
+    table.append(route)
+    if isinstance(route, Route) and route.include_in_schema and route.path != '/':
+      duplicate = copy.copy(route)
+      duplicate.path = route.path + '/'
+      duplicate.path_regex, duplicate.path_format, duplicate.param_convertors = compile_path(duplicate.path)
+      table.append(duplicate)
+  return table
+
+
+# --------------------------------------------------------------------------------
+# Measurement
+# --------------------------------------------------------------------------------
+
+def scope_for(method: str, path: str):
+  return {'type': 'http', 'method': method, 'path': path, 'root_path': ''}
+
+
+def match(routes: list, scope: dict):
+  for route in routes:
+    result, _ = route.matches(scope)
+    if result == Match.FULL:
+      return route
+  raise LookupError(scope['path'])
+
+
+def measure(find_routes, rounds: int):
+  scopes = [scope_for(method, path) for method, path in REQUESTS]
+
+  start = time.perf_counter()
+  for _ in range(rounds):
+    for scope in scopes:
+      match(find_routes(scope['path']), scope)
+  elapsed = time.perf_counter() - start
+
+  return elapsed / (rounds * len(scopes))
+
+
+# --------------------------------------------------------------------------------
+# Main
+# --------------------------------------------------------------------------------
+
+def main():
+  parser = argparse.ArgumentParser(description=__doc__)
+  parser.add_argument('--rounds', type=int, default=20000)
+  args = parser.parse_args()
+
+  routes = list(app.router.routes)
+  old_routes = with_slash_duplicates(routes)
+  index = RouteIndex(routes)
+
+  strategies = [
+    (f'scan with slash duplicates ({len(old_routes)} routes)', lambda path: old_routes),
+    (f'scan without duplicates ({len(routes)} routes)', lambda path: routes),
+    ('route index', index.candidates),
+  ]
+
+  print(f'Requests: {len(REQUESTS)} paths x {args.rounds} rounds')
+  print(f'{"strategy":<42}  {"us per match":>12}')
+  for name, find_routes in strategies:
+    seconds = measure(find_routes, args.rounds)
+    print(f'{name:<42}  {seconds * 1e6:12.2f}')
+
+
+if __name__ == '__main__':
+  main()
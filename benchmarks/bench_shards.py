@@ -0,0 +1,96 @@
+"""
+This module benchmarks device writes with different numbers of shards.
+Each write rewrites only its owner's shard, so writes get cheaper with more shards,
+and writes to different shards can run at the same time.
+Run it from the project root: `python -m benchmarks.bench_shards --devices 100000`.
+"""
+
+# --------------------------------------------------------------------------------
+# Imports
+# --------------------------------------------------------------------------------
+
+import argparse
+import json
+import os
+import tempfile
+import time
+
+from app.shards import open_sharded_database
+from benchmarks.bench_memory import generate_registry
+from concurrent.futures import ThreadPoolExecutor
+from tools.shard_registry import reshard
+
+
+# --------------------------------------------------------------------------------
+# Globals
+# --------------------------------------------------------------------------------
+
+SHARD_COUNTS = [1, 4, 16]
+
+
+# --------------------------------------------------------------------------------
+# Measurement
+# --------------------------------------------------------------------------------
+
+def new_device(owner: str, n: int):
+  return {
+    'name': f'Bench Device {n}',
+    'location': 'Lab',
+    'type': 'Sensor',
+    'model': 'Bench 1',
+    'serial_number': f'BENCH-{owner}-{n}',
+    'owner': owner,
+    'version': 1,
+  }
+
+
+def insert(db, owner: str, n: int):
+  with db.writing(db.shard_for_owner(owner)):
+    db.insert(new_device(owner, n))
+
+
+def measure(count: int, text: str, directory: str, writes: int, threads: int):
+  path = os.path.join(directory, f'registry-{count}.json')
+  with open(path, 'w') as registry:
+    registry.write(text)
+  reshard(path, 1, count)
+
+  db = open_sharded_database(path, count)
+  owners = sorted({device['owner'] for device in json.loads(text)['_default'].values()})
+
+  start = time.perf_counter()
+  for n in range(writes):
+    insert(db, owners[n % len(owners)], n)
+  sequential = (time.perf_counter() - start) / writes
+
+  start = time.perf_counter()
+  with ThreadPoolExecutor(max_workers=threads) as executor:
+    list(executor.map(lambda n: insert(db, owners[n % len(owners)], writes + n), range(writes)))
+  concurrent = writes / (time.perf_counter() - start)
+
+  return sequential, concurrent
+
+
+# --------------------------------------------------------------------------------
+# Main
+# --------------------------------------------------------------------------------
+
+def main():
+  parser = argparse.ArgumentParser(description=__doc__)
+  parser.add_argument('--devices', type=int, default=100000)
+  parser.add_argument('--writes', type=int, default=50)
+  parser.add_argument('--threads', type=int, default=8)
+  args = parser.parse_args()
+
+  text = generate_registry(args.devices)
+  print(f'Devices: {args.devices}, writes: {args.writes}, threads: {args.threads}')
+  print(f'{"shards":>6}  {"write ms":>8}  {"concurrent writes/s":>19}')
+
+  with tempfile.TemporaryDirectory() as directory:
+    for count in SHARD_COUNTS:
+      sequential, concurrent = measure(count, text, directory, args.writes, args.threads)
+      print(f'{count:>6}  {sequential * 1000:8.1f}  {concurrent:19.1f}')
+
+
+if __name__ == '__main__':
+  main()
@@ -10,6 +10,7 @@ import json
 import pytest
 import requests
 import time
+import uuid
 
 from testlib.api import BaseUrl, User, TokenHolder
 from testlib.devices import DeviceCreator
@@ -31,6 +32,11 @@ def _build_session(user):
   return session
 
 
+def _unique_serial(prefix):
+  # Serial numbers must be unique, so every test gets its own
+  return f'{prefix}-{uuid.uuid4().hex[:8].upper()}'
+
+
 # --------------------------------------------------------------------------------
 # Config Fixture
 # --------------------------------------------------------------------------------
@@ -57,6 +63,20 @@ def alt_user(test_inputs):
   return _build_user(test_inputs, 1)
 
 
+# --------------------------------------------------------------------------------
+# Limit Fixtures
+# --------------------------------------------------------------------------------
+
+@pytest.fixture(autouse=True)
+def reset_limits(base_url, user):
+
+  # The suite makes more requests than one user's budget allows,
+  # so each test starts with full budgets, as the admin user
+  url = base_url.concat('/admin/limits')
+  response = requests.delete(url, auth=(user.username, user.password))
+  assert response.status_code == 200
+
+
 # --------------------------------------------------------------------------------
 # Session Fixtures
 # --------------------------------------------------------------------------------
@@ -123,7 +143,7 @@ def thermostat_data():
     'location': 'Living Room',
     'type': 'Thermostat',
     'model': 'ThermoBest 3G',
-    'serial_number': 'TB3G-12345'
+    'serial_number': _unique_serial('TB3G')
   }
 
 
@@ -134,7 +154,7 @@ def light_data():
     'location': 'Front Porch',
     'type': 'Light Switch',
     'model': 'GenLight 64B',
-    'serial_number': 'GL64B-99987'
+    'serial_number': _unique_serial('GL64B')
   }
 
 
@@ -145,7 +165,7 @@ def fridge_data():
     'location': 'Kitchen',
     'type': 'Refrigerator',
     'model': 'El Gee Mondo21',
-    'serial_number': 'LGM-20201'
+    'serial_number': _unique_serial('LGM')
   }
 
 
@@ -0,0 +1,169 @@
+"""
+This module contains integration tests for the '/admin/audit' resource.
+The audit trail records who created, updated, and deleted which device.
+Records are written in the background, so tests wait for them to appear.
+Only admin users may query the audit trail.
+Some tests add old audit files to the server's audit directory, and delete them afterwards.
+"""
+
+# --------------------------------------------------------------------------------
+# Imports
+# --------------------------------------------------------------------------------
+
+import json
+import os
+import pytest
+import requests
+import time
+
+
+# --------------------------------------------------------------------------------
+# Helpers
+# --------------------------------------------------------------------------------
+
+def since_created(records, device):
+  # Device IDs may be reused by a registry that was reset, so older records are skipped
+  for position, record in enumerate(records):
+    if record['action'] == 'create' and record['device']['serial_number'] == device['serial_number']:
+      return records[position:]
+  return []
+
+
+def wait_for_records(session, url, params, count, device=None, timeout=5):
+  deadline = time.monotonic() + timeout
+  while True:
+    response = session.get(url, params=params)
+    assert response.status_code == 200
+    records = [json.loads(line) for line in response.text.splitlines()]
+    if device is not None:
+      records = since_created(records, device)
+    if len(records) >= count or time.monotonic() > deadline:
+      return records
+    time.sleep(0.1)
+
+
+# --------------------------------------------------------------------------------
+# Fixtures
+# --------------------------------------------------------------------------------
+
+# Far enough in the past that no real audit file is older
+OLD_START = 978307200.0
+
+
+@pytest.fixture
+def old_audit_files(test_inputs):
+  paths = []
+
+  def write(created: float, records: list[dict]):
+    # Named like the server names its files, with microseconds
+    stamp = time.strftime('%Y%m%dT%H%M%S', time.gmtime(created))
+    name = f'audit-{stamp}-{int(created * 1e6) % 1000000:06d}.ndjson'
+    path = os.path.join(test_inputs['audit_directory'], name)
+    os.makedirs(test_inputs['audit_directory'], exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as audit_file:
+      audit_file.writelines(json.dumps(record) + '\n' for record in records)
+    paths.append(path)
+
+  yield write
+
+  # The server shares the test's working directory when it runs locally
+  for path in paths:
+    os.remove(path)
+
+
+# --------------------------------------------------------------------------------
+# Tests
+# --------------------------------------------------------------------------------
+
+def test_audit_records_device_lifecycle(
+  base_url, session, thermostat, thermostat_patch_data, device_creator):
+
+  # Update and delete the device
+  device_url = base_url.concat(f'/devices/{thermostat["id"]}')
+  assert session.patch(device_url, json=thermostat_patch_data).status_code == 200
+  assert session.delete(device_url).status_code == 200
+  device_creator.remove(thermostat['id'])
+
+  # Query its records
+  url = base_url.concat('/admin/audit')
+  records = wait_for_records(session, url, {'device_id': thermostat['id']}, 3, thermostat)
+
+  # Verify the records
+  assert [record['action'] for record in records] == ['create', 'update', 'delete']
+  assert all(record['user'] == thermostat['owner'] for record in records)
+  assert records[0]['device']['serial_number'] == thermostat['serial_number']
+  assert records[1]['changes']['name'] == {'from': thermostat['name'], 'to': thermostat_patch_data['name']}
+  assert records[0]['seq'] < records[1]['seq'] < records[2]['seq']
+
+
+def test_audit_filters(base_url, session, thermostat, light):
+
+  # Query by action and time
+  url = base_url.concat('/admin/audit')
+  records = wait_for_records(session, url, {'device_id': light['id']}, 1, light)
+  since = records[0]['time']
+  filtered = wait_for_records(session, url, {'action': 'create', 'since': since}, 1)
+
+  # Verify only matching records are returned
+  assert len(filtered) >= 1
+  assert all(record['action'] == 'create' and record['time'] >= since for record in filtered)
+  assert thermostat['id'] not in [record['device_id'] for record in filtered]
+
+
+def test_audit_limit(base_url, session, thermostat, light):
+
+  # Query with a limit
+  url = base_url.concat('/admin/audit')
+  wait_for_records(session, url, {'device_id': light['id']}, 1, light)
+  response = session.get(url, params={'limit': 1})
+
+  # Verify response
+  assert response.status_code == 200
+  assert response.headers['content-type'] == 'application/x-ndjson'
+  assert len(response.text.splitlines()) == 1
+
+
+def test_audit_since_within_a_file_second(base_url, session, old_audit_files):
+
+  # Write two files that start in the same second, with a record in the first
+  record = {'seq': 0, 'time': OLD_START + 0.5, 'user': 'pythonista', 'action': 'delete', 'device_id': -1}
+  old_audit_files(OLD_START, [record])
+  old_audit_files(OLD_START + 0.9, [])
+
+  # Query from before the record
+  url = base_url.concat('/admin/audit')
+  response = session.get(url, params={'since': OLD_START + 0.4, 'until': OLD_START + 1})
+
+  # Verify the record is found
+  assert response.status_code == 200
+  assert [json.loads(line) for line in response.text.splitlines()] == [record]
+
+
+def test_audit_invalid_action(base_url, session):
+
+  # Query with an unknown action
+  url = base_url.concat('/admin/audit')
+  response = session.get(url, params={'action': 'read'})
+
+  # Verify error
+  assert response.status_code == 422
+
+
+def test_audit_as_non_admin(base_url, alt_session):
+
+  # Query
+  url = base_url.concat('/admin/audit')
+  response = alt_session.get(url)
+
+  # Verify error
+  assert response.status_code == 403
+
+
+def test_audit_without_credentials(base_url):
+
+  # Query
+  url = base_url.concat('/admin/audit')
+  response = requests.get(url)
+
+  # Verify error
+  assert response.status_code == 401
@@ -0,0 +1,95 @@
+"""
+This module contains integration tests for the '/admin/backup' resource.
+Backups are gzip-compressed tar archives of the registry files,
+ending with a manifest of each file's size and SHA-256 checksum.
+Only admin users may download backups.
+"""
+
+# --------------------------------------------------------------------------------
+# Imports
+# --------------------------------------------------------------------------------
+
+import hashlib
+import io
+import json
+import pytest
+import requests
+import tarfile
+
+
+# --------------------------------------------------------------------------------
+# Helpers
+# --------------------------------------------------------------------------------
+
+# Leading bytes of gzip and zstd files
+COMPRESSED_MAGIC = (b'\x1f\x8b', b'\x28\xb5\x2f\xfd')
+
+
+def read_backup(content):
+  files = dict()
+  with tarfile.open(fileobj=io.BytesIO(content), mode='r:gz') as archive:
+    for member in archive.getmembers():
+      files[member.name] = archive.extractfile(member).read()
+  return files
+
+
+# --------------------------------------------------------------------------------
+# Tests
+# --------------------------------------------------------------------------------
+
+def test_backup_matches_manifest(base_url, session, thermostat):
+
+  # Download
+  url = base_url.concat('/admin/backup')
+  response = session.get(url)
+
+  # Verify response
+  assert response.status_code == 200
+  assert response.headers['content-type'] == 'application/gzip'
+  assert 'attachment' in response.headers['content-disposition']
+
+  # Verify the manifest is last and matches every file
+  files = read_backup(response.content)
+  assert list(files)[-1] == 'manifest.json'
+  manifest = json.loads(files.pop('manifest.json'))
+  assert manifest['shards'] == len(files)
+  for entry in manifest['files']:
+    data = files[entry['name']]
+    assert len(data) == entry['size']
+    assert hashlib.sha256(data).hexdigest() == entry['sha256']
+
+
+def test_backup_contains_new_device(base_url, session, thermostat):
+
+  # Download
+  url = base_url.concat('/admin/backup')
+  response = session.get(url)
+  assert response.status_code == 200
+
+  # Verify the device created just before the backup is in it
+  files = read_backup(response.content)
+  files.pop('manifest.json')
+  if any(data.startswith(COMPRESSED_MAGIC) for data in files.values()):
+    pytest.skip('The registry files are compressed')
+  assert any(thermostat['serial_number'].encode('utf-8') in data for data in files.values())
+
+
+def test_backup_forbidden_for_non_admin(base_url, alt_session):
+
+  # Download
+  url = base_url.concat('/admin/backup')
+  response = alt_session.get(url)
+
+  # Verify error
+  assert response.status_code == 403
+  assert response.json()['detail'] == 'Forbidden'
+
+
+def test_backup_unauthorized(base_url):
+
+  # Download without credentials
+  url = base_url.concat('/admin/backup')
+  response = requests.get(url)
+
+  # Verify error
+  assert response.status_code == 401
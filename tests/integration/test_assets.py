@@ -0,0 +1,110 @@
+"""
+This module contains integration tests for static assets and the OpenAPI schema.
+They are served from memory with strong ETags and cache headers.
+Compressible assets are sent gzip-compressed to clients that accept it.
+"""
+
+# --------------------------------------------------------------------------------
+# Imports
+# --------------------------------------------------------------------------------
+
+import pytest
+import requests
+
+
+# --------------------------------------------------------------------------------
+# Image Tests
+# --------------------------------------------------------------------------------
+
+@pytest.mark.parametrize('path, content_type', [
+  ('/favicon.ico', 'image/vnd.microsoft.icon'),
+  ('/logo.png', 'image/png'),
+])
+def test_get_image(base_url, path, content_type):
+
+  # Get
+  url = base_url.concat(path)
+  response = requests.get(url)
+
+  # Verify response
+  assert response.status_code == 200
+  assert response.headers['content-type'] == content_type
+  assert 'immutable' in response.headers['cache-control']
+  assert response.headers['etag'].startswith('"')
+  assert len(response.content) > 0
+
+
+@pytest.mark.parametrize('path', ['/favicon.ico', '/logo.png'])
+def test_get_image_not_modified(base_url, path):
+
+  # Get
+  url = base_url.concat(path)
+  first_response = requests.get(url)
+  etag = first_response.headers['etag']
+
+  # Get again with the ETag
+  second_response = requests.get(url, headers={'If-None-Match': etag})
+
+  # Verify not modified
+  assert second_response.status_code == 304
+  assert second_response.headers['etag'] == etag
+  assert second_response.content == b''
+
+
+def test_get_image_modified(base_url):
+
+  # Get with an old ETag
+  url = base_url.concat('/logo.png')
+  response = requests.get(url, headers={'If-None-Match': '"old"'})
+
+  # Verify the image is sent
+  assert response.status_code == 200
+  assert len(response.content) > 0
+
+
+# --------------------------------------------------------------------------------
+# OpenAPI Tests
+# --------------------------------------------------------------------------------
+
+def test_get_openapi_compressed(base_url):
+
+  # Get with gzip
+  url = base_url.concat('/openapi.json')
+  response = requests.get(url, headers={'Accept-Encoding': 'gzip'})
+
+  # Verify response
+  assert response.status_code == 200
+  assert response.headers['content-type'] == 'application/json'
+  assert response.headers['content-encoding'] == 'gzip'
+  assert response.headers['vary'] == 'Accept-Encoding'
+  assert response.headers['cache-control'] == 'no-cache'
+  assert response.json()['info']['title'] == 'Device Registry Service'
+
+
+def test_get_openapi_uncompressed(base_url):
+
+  # Get without compression
+  url = base_url.concat('/openapi.json')
+  compressed_response = requests.get(url, headers={'Accept-Encoding': 'gzip'})
+  response = requests.get(url, headers={'Accept-Encoding': 'identity'})
+
+  # Verify each encoding has its own ETag
+  assert response.status_code == 200
+  assert 'content-encoding' not in response.headers
+  assert response.headers['etag'] != compressed_response.headers['etag']
+  assert response.json() == compressed_response.json()
+
+
+def test_get_openapi_not_modified(base_url):
+
+  # Get
+  url = base_url.concat('/openapi.json')
+  first_response = requests.get(url)
+  etag = first_response.headers['etag']
+
+  # Get again with the ETag
+  second_response = requests.get(url, headers={'If-None-Match': etag})
+
+  # Verify not modified
+  assert second_response.status_code == 304
+  assert second_response.headers['etag'] == etag
@@ -0,0 +1,101 @@
+"""
+This module contains integration tests for the '/devices/changes' resource.
+The change feed lets clients fetch only the changes since their last sync.
+Other tests might change devices too, so assertions check only covered devices.
+"""
+
+# --------------------------------------------------------------------------------
+# Helper Functions
+# --------------------------------------------------------------------------------
+
+def get_changes(base_url, session, since):
+  url = base_url.concat('/devices/changes')
+  response = session.get(url, params={'since': since})
+  assert response.status_code == 200
+  return response.json()
+
+
+def changes_for(data, device_id):
+  return [change for change in data['changes'] if change['id'] == device_id]
+
+
+# --------------------------------------------------------------------------------
+# Change Feed Tests
+# --------------------------------------------------------------------------------
+
+def test_changes_full_sync(base_url, session, devices):
+
+  # Get every retained change
+  data = get_changes(base_url, session, 0)
+
+  # Verify each created device is included as an upsert
+  assert isinstance(data['last_seq'], int)
+  for device in devices:
+    changes = changes_for(data, device['id'])
+    assert len(changes) == 1
+    assert changes[0]['action'] == 'upsert'
+    assert changes[0]['device'] == device
+
+
+def test_changes_since_last_sync(base_url, session, thermostat, thermostat_patch_data):
+
+  # Sync, then update the device
+  last_seq = get_changes(base_url, session, 0)['last_seq']
+  device_url = base_url.concat(f'/devices/{thermostat["id"]}')
+  patch_response = session.patch(device_url, json=thermostat_patch_data)
+  assert patch_response.status_code == 200
+
+  # Verify only the update is returned
+  data = get_changes(base_url, session, last_seq)
+  assert data['last_seq'] > last_seq
+  changes = changes_for(data, thermostat['id'])
+  assert len(changes) == 1
+  assert changes[0]['seq'] > last_seq
+  assert changes[0]['action'] == 'upsert'
+  assert changes[0]['device'] == patch_response.json()
+
+  # Verify nothing new after syncing again
+  data = get_changes(base_url, session, data['last_seq'])
+  assert changes_for(data, thermostat['id']) == []
+
+
+def test_changes_include_delete_tombstone(base_url, session, thermostat, device_creator):
+
+  # Sync, then delete the device
+  last_seq = get_changes(base_url, session, 0)['last_seq']
+  device_url = base_url.concat(f'/devices/{thermostat["id"]}')
+  delete_response = session.delete(device_url)
+  assert delete_response.status_code == 200
+  device_creator.remove(thermostat['id'])
+
+  # Verify a tombstone is returned
+  data = get_changes(base_url, session, last_seq)
+  changes = changes_for(data, thermostat['id'])
+  assert len(changes) == 1
+  assert changes[0]['action'] == 'delete'
+  assert changes[0]['device'] is None
+
+
+def test_changes_exclude_other_users_devices(base_url, alt_session, devices):
+
+  # Get every retained change as another user
+  data = get_changes(base_url, alt_session, 0)
+
+  # Verify the user's devices are NOT in the alt_user's changes
+  for device in devices:
+    assert changes_for(data, device['id']) == []
+
+
+def test_changes_resync_required(base_url, session):
+
+  # Attempt to sync from before the feed started and from the future
+  last_seq = get_changes(base_url, session, 0)['last_seq']
+  url = base_url.concat('/devices/changes')
+
+  for since in [1, last_seq + 1000000]:
+    response = session.get(url, params={'since': since})
+    data = response.json()
+
+    # Verify error
+    assert response.status_code == 410
+    assert data['detail'] == 'Resync Required'
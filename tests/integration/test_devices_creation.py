@@ -10,6 +10,7 @@ Furthermore, be warned that the first two tests do not perform cleanup.
 # --------------------------------------------------------------------------------
 
 import time
+import uuid
 
 
 # --------------------------------------------------------------------------------
@@ -24,7 +25,7 @@ def test_create_device(base_url, session):
     'location': 'Living Room',
     'type': 'Thermostat',
     'model': 'ThermoBest 3G',
-    'serial_number': 'TB3G-12345'
+    'serial_number': f'TB3G-{uuid.uuid4().hex[:8].upper()}'
   }
 
   # Create
@@ -61,7 +62,7 @@ def test_create_device_with_waiting(base_url, session):
     'location': 'Living Room',
     'type': 'Thermostat',
     'model': 'ThermoBest 3G',
-    'serial_number': 'TB3G-12345'
+    'serial_number': f'TB3G-{uuid.uuid4().hex[:8].upper()}'
   }
 
   device_url = base_url.concat('/devices')
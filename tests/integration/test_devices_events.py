@@ -0,0 +1,117 @@
+"""
+This module contains integration tests for the '/devices/events' resource.
+Events are streamed as Server-Sent Events, so tests read the stream line by line.
+Other tests might change devices too, so tests wait for events about their own devices.
+"""
+
+# --------------------------------------------------------------------------------
+# Imports
+# --------------------------------------------------------------------------------
+
+import json
+import requests
+
+
+# --------------------------------------------------------------------------------
+# Helper Functions
+# --------------------------------------------------------------------------------
+
+def open_stream(base_url, session):
+  url = base_url.concat('/devices/events')
+  response = session.get(url, stream=True, timeout=10)
+  assert response.status_code == 200
+  assert response.headers['content-type'].startswith('text/event-stream')
+  return response
+
+
+def read_event(lines, device_id):
+
+  # Read events until one is about the target device
+  event = dict()
+  for line in lines:
+    if line:
+      key, _, value = line.partition(': ')
+      event[key] = value
+    elif 'event' in event:
+      data = json.loads(event['data'])
+      if data['id'] == device_id:
+        return event['event'], int(event['id']), data
+      event = dict()
+
+
+# --------------------------------------------------------------------------------
+# Event Stream Tests
+# --------------------------------------------------------------------------------
+
+def test_events_for_device_lifecycle(
+  base_url, session, device_creator, thermostat_data, thermostat_patch_data):
+
+  stream = open_stream(base_url, session)
+  lines = stream.iter_lines(decode_unicode=True)
+
+  try:
+
+    # Create
+    thermostat = device_creator.create(session, thermostat_data)
+    event, create_id, data = read_event(lines, thermostat['id'])
+    assert event == 'create'
+    assert data['device'] == thermostat
+
+    # Update
+    device_url = base_url.concat(f'/devices/{thermostat["id"]}')
+    patch_response = session.patch(device_url, json=thermostat_patch_data)
+    event, update_id, data = read_event(lines, thermostat['id'])
+    assert event == 'update'
+    assert data['device'] == patch_response.json()
+    assert update_id > create_id
+
+    # Delete
+    session.delete(device_url)
+    device_creator.remove(thermostat['id'])
+    event, delete_id, data = read_event(lines, thermostat['id'])
+    assert event == 'delete'
+    assert data['device'] is None
+    assert delete_id > update_id
+
+  finally:
+    stream.close()
+
+
+def test_events_exclude_other_users_devices(
+  base_url, session, alt_session, device_creator, light_data, fridge_data):
+
+  stream = open_stream(base_url, alt_session)
+  lines = stream.iter_lines(decode_unicode=True)
+
+  try:
+
+    # Create a device for each user
+    light = device_creator.create(session, light_data)
+    fridge = device_creator.create(alt_session, fridge_data)
+
+    # Verify the alt_user's stream reaches its own device without the other one
+    event = dict()
+    for line in lines:
+      if line:
+        key, _, value = line.partition(': ')
+        event[key] = value
+      elif 'event' in event:
+        data = json.loads(event['data'])
+        assert data['id'] != light['id']
+        if data['id'] == fridge['id']:
+          break
+        event = dict()
+
+  finally:
+    stream.close()
+
+
+def test_events_without_auth_error(base_url):
+
+  # Attempt to stream without auth
+  url = base_url.concat('/devices/events')
+  response = requests.get(url)
+
+  # Verify error
+  assert response.status_code == 401
+  assert response.json()['detail'] == 'Unauthorized'
@@ -0,0 +1,114 @@
+"""
+This module contains integration tests for HEAD requests on device resources.
+HEAD responses must have the same status and headers as GET responses, without a body.
+"""
+
+# --------------------------------------------------------------------------------
+# Helpers
+# --------------------------------------------------------------------------------
+
+def assert_same_headers(head_response, get_response, names):
+  assert head_response.status_code == get_response.status_code
+  assert head_response.content == b''
+  for name in names:
+    assert head_response.headers.get(name) == get_response.headers.get(name)
+
+
+# --------------------------------------------------------------------------------
+# Tests
+# --------------------------------------------------------------------------------
+
+def test_head_devices(base_url, session, thermostat, light):
+
+  # HEAD before GET, so the listing is not cached yet
+  url = base_url.concat('/devices')
+  head_response = session.head(url)
+  get_response = session.get(url)
+
+  # Verify headers
+  assert_same_headers(head_response, get_response, ['content-type', 'content-length'])
+  assert int(head_response.headers['content-length']) == len(get_response.content)
+
+
+def test_head_devices_with_filter(base_url, session, thermostat, light):
+
+  # HEAD before GET, for a filtered listing
+  url = base_url.concat(f'/devices?type={light["type"]}')
+  head_response = session.head(url)
+  get_response = session.get(url)
+
+  # Verify headers
+  assert_same_headers(head_response, get_response, ['content-type', 'content-length'])
+
+
+def test_head_devices_with_fields(base_url, session, thermostat):
+
+  # HEAD for a listing with only some fields
+  url = base_url.concat('/devices?fields=id,name')
+  head_response = session.head(url)
+  get_response = session.get(url)
+
+  # Verify headers
+  assert_same_headers(head_response, get_response, ['content-type', 'content-length'])
+
+
+def test_head_device(base_url, session, thermostat):
+
+  # HEAD and GET
+  url = base_url.concat(f'/devices/{thermostat["id"]}')
+  head_response = session.head(url)
+  get_response = session.get(url)
+
+  # Verify headers
+  assert_same_headers(head_response, get_response, ['content-type', 'content-length', 'etag'])
+
+
+def test_head_device_after_patch(base_url, session, thermostat):
+
+  # HEAD remembers the length of the current version
+  url = base_url.concat(f'/devices/{thermostat["id"]}')
+  old_response = session.head(url)
+
+  # Patch with a longer name
+  patch_response = session.patch(url, json={'name': thermostat['name'] + ' With A Longer Name'})
+  assert patch_response.status_code == 200
+
+  # Verify the new version's headers
+  head_response = session.head(url)
+  get_response = session.get(url)
+  assert_same_headers(head_response, get_response, ['content-type', 'content-length', 'etag'])
+  assert head_response.headers['etag'] != old_response.headers['etag']
+  assert int(head_response.headers['content-length']) > int(old_response.headers['content-length'])
+
+
+def test_head_device_not_found(base_url, session):
+
+  # HEAD
+  url = base_url.concat('/devices/99999999')
+  head_response = session.head(url)
+
+  # Verify error
+  assert head_response.status_code == 404
+
+
+def test_head_other_users_device(base_url, alt_session, thermostat):
+
+  # HEAD
+  url = base_url.concat(f'/devices/{thermostat["id"]}')
+  head_response = alt_session.head(url)
+
+  # Verify error
+  assert head_response.status_code == 403
+
+
+def test_head_device_report(base_url, session, thermostat):
+
+  # HEAD and GET
+  url = base_url.concat(f'/devices/{thermostat["id"]}/report')
+  head_response = session.head(url)
+  get_response = session.get(url)
+
+  # Verify headers
+  names = ['content-type', 'content-length', 'content-disposition']
+  assert_same_headers(head_response, get_response, names)
+  assert int(head_response.headers['content-length']) == len(get_response.content)
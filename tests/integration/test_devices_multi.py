@@ -12,6 +12,7 @@ Therefore, test assertions must check only what is covered by the test.
 
 import pytest
 
+from concurrent.futures import ThreadPoolExecutor
 from testlib.devices import verify_included, verify_excluded, verify_value
 
 
@@ -62,18 +63,14 @@ def test_delete_device_from_multiple(base_url, session, devices, device_creator)
 
 
 @pytest.mark.parametrize(
-  'parameter, value',
-  [
-    ('name', 'Front Porch Light'),
-    ('location', 'Front Porch'),
-    ('type', 'Light Switch'),
-    ('model', 'GenLight 64B'),
-    ('serial_number', 'GL64B-99987')
-  ]
+  'parameter',
+  ['name', 'location', 'type', 'model', 'serial_number']
 )
-def test_devices_with_query_parameters(base_url, session, devices, parameter, value):
+def test_devices_with_query_parameters(base_url, session, devices, light, parameter):
 
   # Get all devices
+  # Serial numbers are unique per test, so values come from the light fixture
+  value = light[parameter]
   url = base_url.concat('/devices')
   get_response = session.get(url, params={parameter: value})
   get_data = get_response.json()
@@ -130,3 +127,162 @@ def test_devices_with_multiple_query_parameters_matching_no_device(base_url, ses
   assert get_response.status_code == 200
   assert isinstance(get_data, list)
   assert len(get_data) == 0
+
+
+# --------------------------------------------------------------------------------
+# Tests for Sparse Fieldsets
+# --------------------------------------------------------------------------------
+
+def test_devices_with_fields(base_url, session, devices):
+
+  # Get only IDs and names
+  url = base_url.concat('/devices')
+  get_response = session.get(url, params={'fields': 'id,name'})
+  get_data = get_response.json()
+
+  # Verify each device has only the requested fields
+  assert get_response.status_code == 200
+  assert isinstance(get_data, list)
+  expected = [{'id': d['id'], 'name': d['name']} for d in devices]
+  verify_included(get_data, expected)
+
+  for device in get_data:
+    assert set(device) == {'id', 'name'}
+
+
+def test_devices_with_invalid_fields_error(base_url, session):
+
+  # Attempt to get a nonexistent field
+  url = base_url.concat('/devices')
+  get_response = session.get(url, params={'fields': 'id,garbage'})
+  get_data = get_response.json()
+
+  # Verify error
+  assert get_response.status_code == 422
+  assert get_data['detail'] == 'Unprocessable Entity'
+
+
+# --------------------------------------------------------------------------------
+# Tests for Sorting
+# --------------------------------------------------------------------------------
+
+@pytest.mark.parametrize(
+  'sort, field, descending',
+  [
+    ('name', 'name', False),
+    ('-name', 'name', True),
+    ('location', 'location', False),
+    ('-id', 'id', True)
+  ]
+)
+def test_devices_with_sort(base_url, session, devices, sort, field, descending):
+
+  # Get sorted devices
+  url = base_url.concat('/devices')
+  get_response = session.get(url, params={'sort': sort})
+  get_data = get_response.json()
+
+  # Verify the created devices appear in sorted order
+  assert get_response.status_code == 200
+  verify_included(get_data, devices)
+
+  created_ids = {d['id'] for d in devices}
+  actual_ids = [d['id'] for d in get_data if d['id'] in created_ids]
+  key = lambda d: d[field].casefold() if isinstance(d[field], str) else d[field]
+  expected = sorted(devices, key=key, reverse=descending)
+  assert actual_ids == [d['id'] for d in expected]
+
+
+def test_devices_with_sort_and_filter(base_url, session, devices):
+
+  # Get filtered and sorted devices
+  url = base_url.concat('/devices')
+  params = {'type': 'Light Switch', 'sort': 'name', 'fields': 'name,type'}
+  get_response = session.get(url, params=params)
+  get_data = get_response.json()
+
+  # Verify the filter still applies
+  assert get_response.status_code == 200
+  assert len(get_data) > 0
+  verify_value(get_data, 'type', 'Light Switch')
+  names = [d['name'].casefold() for d in get_data]
+  assert names == sorted(names)
+
+
+def test_devices_with_invalid_sort_error(base_url, session):
+
+  # Attempt to sort by owner
+  url = base_url.concat('/devices')
+  get_response = session.get(url, params={'sort': 'owner'})
+  get_data = get_response.json()
+
+  # Verify error
+  assert get_response.status_code == 422
+  assert get_data['detail'] == 'Unprocessable Entity'
+
+
+# --------------------------------------------------------------------------------
+# Tests for Concurrent Reads
+# --------------------------------------------------------------------------------
+
+def test_concurrent_identical_reads(base_url, session, devices):
+
+  # Get the same listing many times at once
+  url = base_url.concat('/devices')
+  params = {'type': 'Thermostat'}
+  with ThreadPoolExecutor(max_workers=8) as executor:
+    responses = list(executor.map(lambda _: session.get(url, params=params), range(16)))
+
+  # Verify every response is identical and correct
+  assert all(response.status_code == 200 for response in responses)
+  assert len({response.text for response in responses}) == 1
+  verify_included(responses[0].json(), [devices[0]])
+
+
+def test_concurrent_creates(base_url, session, device_creator, light_data):
+
+  # Create many devices at once
+  def create(n):
+    data = dict(light_data, name=f'Light {n}', serial_number=f'{light_data["serial_number"]}-{n}')
+    return device_creator.create(session, data)
+
+  with ThreadPoolExecutor(max_workers=8) as executor:
+    created = list(executor.map(create, range(16)))
+
+  # Verify each create got its own device and every device was saved
+  assert len({device['id'] for device in created}) == 16
+  get_response = session.get(base_url.concat('/devices'))
+  verify_included(get_response.json(), created)
+
+
+def test_read_after_write_is_not_stale(base_url, session, thermostat, thermostat_patch_data):
+
+  # Read, write, then read again
+  url = base_url.concat('/devices')
+  before = session.get(url).json()
+  device_url = base_url.concat(f'/devices/{thermostat["id"]}')
+  patch_response = session.patch(device_url, json=thermostat_patch_data)
+  after = session.get(url).json()
+
+  # Verify the second read sees the write
+  verify_included(before, [thermostat])
+  verify_included(after, [patch_response.json()])
+
+
+def test_filtered_read_after_delete_is_not_stale(base_url, session, devices, device_creator):
+
+  # Read a filtered listing twice so it is reused
+  url = base_url.concat('/devices')
+  params = {'location': 'Front Porch'}
+  session.get(url, params=params)
+  before = session.get(url, params=params).json()
+
+  # Delete the matching device
+  device_id_url = base_url.concat(f'/devices/{devices[1]["id"]}')
+  session.delete(device_id_url)
+  device_creator.remove(devices[1]['id'])
+  after = session.get(url, params=params).json()
+
+  # Verify the listing reflects the delete
+  verify_included(before, [devices[1]])
+  verify_excluded(after, [devices[1]['id']])
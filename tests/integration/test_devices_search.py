@@ -0,0 +1,101 @@
+"""
+This module contains integration tests for the '/devices/search' resource.
+Search matches whole words or word prefixes in device names and locations.
+Other tests might create devices too, so assertions check only covered devices.
+"""
+
+# --------------------------------------------------------------------------------
+# Imports
+# --------------------------------------------------------------------------------
+
+from testlib.devices import verify_included, verify_excluded
+
+
+# --------------------------------------------------------------------------------
+# Search Tests
+# --------------------------------------------------------------------------------
+
+def test_search_by_word(base_url, session, devices):
+
+  # Search
+  url = base_url.concat('/devices/search')
+  get_response = session.get(url, params={'q': 'kitchen'})
+  get_data = get_response.json()
+
+  # Verify only the fridge matched from the created devices
+  assert get_response.status_code == 200
+  assert isinstance(get_data, list)
+  verify_included(get_data, [devices[2]])
+  verify_excluded(get_data, [devices[0]['id'], devices[1]['id']])
+
+
+def test_search_by_prefix(base_url, session, devices):
+
+  # Search
+  url = base_url.concat('/devices/search')
+  get_response = session.get(url, params={'q': 'porch lig'})
+  get_data = get_response.json()
+
+  # Verify only the light matched from the created devices
+  assert get_response.status_code == 200
+  verify_included(get_data, [devices[1]])
+  verify_excluded(get_data, [devices[0]['id'], devices[2]['id']])
+
+
+def test_search_ranks_name_above_location(base_url, session, fridge, device_creator):
+
+  # Create a device with the search word in its name
+  speaker_data = {
+    'name': 'Kitchen Speaker',
+    'location': 'Den',
+    'type': 'Speaker',
+    'model': 'SoundBox 2',
+    'serial_number': 'SB2-31415'
+  }
+  speaker = device_creator.create(session, speaker_data)
+
+  # Search
+  url = base_url.concat('/devices/search')
+  get_response = session.get(url, params={'q': 'kitchen'})
+  get_data = get_response.json()
+
+  # Verify the name match comes before the location match
+  assert get_response.status_code == 200
+  ids = [device['id'] for device in get_data]
+  assert ids.index(speaker['id']) < ids.index(fridge['id'])
+
+
+def test_search_with_no_matches(base_url, session, devices):
+
+  # Search
+  url = base_url.concat('/devices/search')
+  get_response = session.get(url, params={'q': 'nonexistentword'})
+  get_data = get_response.json()
+
+  # Verify empty response
+  assert get_response.status_code == 200
+  assert get_data == []
+
+
+def test_search_excludes_other_users_devices(base_url, alt_session, devices):
+
+  # Search as another user
+  url = base_url.concat('/devices/search')
+  get_response = alt_session.get(url, params={'q': 'kitchen'})
+  get_data = get_response.json()
+
+  # Verify the user's devices are NOT in the alt_user's results
+  assert get_response.status_code == 200
+  verify_excluded(get_data, [device['id'] for device in devices])
+
+
+def test_search_without_query_error(base_url, session):
+
+  # Attempt search
+  url = base_url.concat('/devices/search')
+  get_response = session.get(url)
+  get_data = get_response.json()
+
+  # Verify error
+  assert get_response.status_code == 422
+  assert get_data['detail'] == 'Unprocessable Entity'
@@ -0,0 +1,204 @@
+"""
+This module contains integration tests for device serial numbers.
+Serial numbers are unique across all devices,
+and the '/devices/by-serial' resource looks devices up by them.
+The test registry is seeded with two devices of different users that share
+the serial number 'LEGACY-DUP-1', like registries saved before serials were unique.
+"""
+
+# --------------------------------------------------------------------------------
+# Imports
+# --------------------------------------------------------------------------------
+
+import pytest
+
+
+# --------------------------------------------------------------------------------
+# Fixtures
+# --------------------------------------------------------------------------------
+
+REPEATED_SERIAL = 'LEGACY-DUP-1'
+
+
+@pytest.fixture
+def repeated_serial_devices(base_url, session, alt_session):
+
+  # Sharded and converted test registries do not have the seed devices
+  url = base_url.concat('/devices')
+  params = {'serial_number': REPEATED_SERIAL}
+  devices = [s.get(url, params=params).json() for s in (session, alt_session)]
+  if not all(devices):
+    pytest.skip('The test registry has no devices with a repeated serial number')
+
+  return [found[0] for found in devices]
+
+
+# --------------------------------------------------------------------------------
+# Lookup Tests
+# --------------------------------------------------------------------------------
+
+def test_get_device_by_serial(base_url, session, thermostat):
+
+  # Get
+  url = base_url.concat(f'/devices/by-serial/{thermostat["serial_number"]}')
+  get_response = session.get(url)
+
+  # Verify get
+  assert get_response.status_code == 200
+  assert get_response.json() == thermostat
+
+
+def test_get_device_by_unknown_serial(base_url, session):
+
+  # Get
+  url = base_url.concat('/devices/by-serial/NO-SUCH-SERIAL')
+  get_response = session.get(url)
+
+  # Verify error
+  assert get_response.status_code == 404
+  assert get_response.json()['detail'] == 'Not Found'
+
+
+def test_get_other_users_device_by_serial(base_url, alt_session, thermostat):
+
+  # Get
+  url = base_url.concat(f'/devices/by-serial/{thermostat["serial_number"]}')
+  get_response = alt_session.get(url)
+
+  # Verify error
+  assert get_response.status_code == 403
+  assert get_response.json()['detail'] == 'Forbidden'
+
+
+def test_get_device_by_serial_after_put(base_url, session, thermostat, light_data):
+
+  # Put
+  old_serial = thermostat['serial_number']
+  device_url = base_url.concat(f'/devices/{thermostat["id"]}')
+  put_response = session.put(device_url, json=light_data)
+  assert put_response.status_code == 200
+
+  # Verify the new serial number finds the device
+  new_url = base_url.concat(f'/devices/by-serial/{light_data["serial_number"]}')
+  new_response = session.get(new_url)
+  assert new_response.status_code == 200
+  assert new_response.json()['id'] == thermostat['id']
+
+  # Verify the old serial number is free
+  old_url = base_url.concat(f'/devices/by-serial/{old_serial}')
+  old_response = session.get(old_url)
+  assert old_response.status_code == 404
+
+
+# --------------------------------------------------------------------------------
+# Uniqueness Tests
+# --------------------------------------------------------------------------------
+
+def test_create_device_with_duplicate_serial(base_url, session, alt_session, thermostat, light_data):
+
+  # Attempt create, even by another user
+  light_data['serial_number'] = thermostat['serial_number']
+  url = base_url.concat('/devices')
+  post_response = alt_session.post(url, json=light_data)
+
+  # Verify error
+  assert post_response.status_code == 409
+  assert post_response.json()['detail'] == 'Conflict'
+
+
+def test_put_device_with_duplicate_serial(base_url, session, thermostat, light):
+
+  # Attempt put
+  put_data = {key: light[key] for key in ('name', 'location', 'type', 'model', 'serial_number')}
+  device_url = base_url.concat(f'/devices/{thermostat["id"]}')
+  put_response = session.put(device_url, json=put_data)
+
+  # Verify error
+  assert put_response.status_code == 409
+  assert put_response.json()['detail'] == 'Conflict'
+
+  # Verify the device did not change
+  get_response = session.get(device_url)
+  assert get_response.json() == thermostat
+
+
+def test_put_device_keeping_its_serial(base_url, session, thermostat, thermostat_patch_data):
+
+  # Put
+  put_data = {key: thermostat[key] for key in ('type', 'model', 'serial_number')}
+  put_data.update(thermostat_patch_data)
+  device_url = base_url.concat(f'/devices/{thermostat["id"]}')
+  put_response = session.put(device_url, json=put_data)
+
+  # Verify put
+  assert put_response.status_code == 200
+  assert put_response.json()['serial_number'] == thermostat['serial_number']
+
+
+def test_serial_is_free_after_delete(base_url, session, device_creator, thermostat, thermostat_data):
+
+  # Delete
+  device_url = base_url.concat(f'/devices/{thermostat["id"]}')
+  delete_response = session.delete(device_url)
+  assert delete_response.status_code == 200
+  device_creator.remove(thermostat['id'])
+
+  # Verify the serial number can be reused
+  new_data = {key: thermostat_data[key] for key in ('name', 'location', 'type', 'model', 'serial_number')}
+  new_device = device_creator.create(session, new_data)
+  assert new_device['serial_number'] == thermostat['serial_number']
+
+
+# --------------------------------------------------------------------------------
+# Repeated Serial Tests
+# --------------------------------------------------------------------------------
+
+def test_devices_with_repeated_serial(base_url, session, alt_session, user, alt_user, repeated_serial_devices):
+
+  # Get each user's devices with the serial number
+  url = base_url.concat('/devices')
+  params = {'serial_number': REPEATED_SERIAL}
+
+  # Verify each user gets only their own device
+  for s, u in ((session, user), (alt_session, alt_user)):
+    get_data = s.get(url, params=params).json()
+    assert len(get_data) == 1
+    assert get_data[0]['owner'] == u.username
+    assert get_data[0]['serial_number'] == REPEATED_SERIAL
+
+
+def test_get_device_by_repeated_serial(base_url, session, alt_session, repeated_serial_devices):
+
+  # Get
+  url = base_url.concat(f'/devices/by-serial/{REPEATED_SERIAL}')
+
+  # Verify each user gets their own device
+  for s, device in zip((session, alt_session), repeated_serial_devices):
+    get_response = s.get(url)
+    assert get_response.status_code == 200
+    assert get_response.json() == device
+
+
+def test_create_device_with_repeated_serial(base_url, session, light_data, repeated_serial_devices):
+
+  # Attempt create
+  light_data['serial_number'] = REPEATED_SERIAL
+  url = base_url.concat('/devices')
+  post_response = session.post(url, json=light_data)
+
+  # Verify error
+  assert post_response.status_code == 409
+  assert post_response.json()['detail'] == 'Conflict'
+
+
+def test_put_device_keeping_repeated_serial(base_url, alt_session, repeated_serial_devices):
+
+  # Put the device unchanged
+  device = repeated_serial_devices[1]
+  put_data = {key: device[key] for key in ('name', 'location', 'type', 'model', 'serial_number')}
+  device_url = base_url.concat(f'/devices/{device["id"]}')
+  put_response = alt_session.put(device_url, json=put_data)
+
+  # Verify put
+  assert put_response.status_code == 200
+  assert put_response.json() == device
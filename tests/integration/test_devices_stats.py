@@ -0,0 +1,89 @@
+"""
+This module contains integration tests for the '/devices/stats' resource.
+Stats count the user's devices grouped by type, location, and model.
+Other tests might create devices too, so assertions compare counts before and after.
+"""
+
+# --------------------------------------------------------------------------------
+# Imports
+# --------------------------------------------------------------------------------
+
+import requests
+
+
+# --------------------------------------------------------------------------------
+# Helper Functions
+# --------------------------------------------------------------------------------
+
+def get_stats(base_url, session):
+  url = base_url.concat('/devices/stats')
+  response = session.get(url)
+  assert response.status_code == 200
+  return response.json()
+
+
+# --------------------------------------------------------------------------------
+# Stats Tests
+# --------------------------------------------------------------------------------
+
+def test_stats_count_created_device(base_url, session, device_creator, fridge_data):
+
+  # Create a device between two stats calls
+  before = get_stats(base_url, session)
+  device_creator.create(session, fridge_data)
+  after = get_stats(base_url, session)
+
+  # Verify each group grew by one
+  assert after['total'] == before['total'] + 1
+  assert after['type'].get('Refrigerator', 0) == before['type'].get('Refrigerator', 0) + 1
+  assert after['location'].get('Kitchen', 0) == before['location'].get('Kitchen', 0) + 1
+  assert after['model'].get('El Gee Mondo21', 0) == before['model'].get('El Gee Mondo21', 0) + 1
+
+
+def test_stats_follow_updates_and_deletes(
+  base_url, session, thermostat, thermostat_patch_data, device_creator):
+
+  # Move the thermostat to a new location
+  before = get_stats(base_url, session)
+  device_url = base_url.concat(f'/devices/{thermostat["id"]}')
+  patch_response = session.patch(device_url, json=thermostat_patch_data)
+  assert patch_response.status_code == 200
+  moved = get_stats(base_url, session)
+
+  # Verify the location counts moved with it
+  new_location = thermostat_patch_data['location']
+  assert moved['total'] == before['total']
+  assert moved['location'].get(new_location, 0) == before['location'].get(new_location, 0) + 1
+  assert moved['location'].get('Living Room', 0) == before['location'].get('Living Room', 0) - 1
+
+  # Delete the thermostat
+  delete_response = session.delete(device_url)
+  assert delete_response.status_code == 200
+  device_creator.remove(thermostat['id'])
+  deleted = get_stats(base_url, session)
+
+  # Verify the counts dropped
+  assert deleted['total'] == before['total'] - 1
+  assert deleted['type'].get('Thermostat', 0) == before['type'].get('Thermostat', 0) - 1
+
+
+def test_stats_are_per_user(base_url, session, alt_session, device_creator, light_data):
+
+  # Create a device for one user
+  before = get_stats(base_url, alt_session)
+  device_creator.create(session, light_data)
+  after = get_stats(base_url, alt_session)
+
+  # Verify the other user's counts did not change
+  assert after == before
+
+
+def test_stats_without_auth_error(base_url):
+
+  # Attempt to get stats without auth
+  url = base_url.concat('/devices/stats')
+  response = requests.get(url)
+
+  # Verify error
+  assert response.status_code == 401
+  assert response.json()['detail'] == 'Unauthorized'
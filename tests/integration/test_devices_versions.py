@@ -0,0 +1,143 @@
+"""
+This module contains integration tests for device versions.
+Each device's version is returned in the ETag header.
+Updates and deletes with an If-Match header succeed only for the current version.
+"""
+
+# --------------------------------------------------------------------------------
+# Imports
+# --------------------------------------------------------------------------------
+
+from concurrent.futures import ThreadPoolExecutor
+
+
+# --------------------------------------------------------------------------------
+# Helper Functions
+# --------------------------------------------------------------------------------
+
+def get_etag(base_url, session, device_id):
+  device_url = base_url.concat(f'/devices/{device_id}')
+  get_response = session.get(device_url)
+  assert get_response.status_code == 200
+  return get_response.headers['ETag']
+
+
+# --------------------------------------------------------------------------------
+# ETag Tests
+# --------------------------------------------------------------------------------
+
+def test_new_device_has_etag(base_url, session, thermostat):
+
+  # Verify the ETag and that the body has no version
+  device_url = base_url.concat(f'/devices/{thermostat["id"]}')
+  get_response = session.get(device_url)
+  assert get_response.status_code == 200
+  assert get_response.headers['ETag'] == '"1"'
+  assert get_response.json() == thermostat
+
+
+def test_update_changes_etag(base_url, session, thermostat, thermostat_patch_data):
+
+  # Patch
+  old_etag = get_etag(base_url, session, thermostat['id'])
+  device_url = base_url.concat(f'/devices/{thermostat["id"]}')
+  patch_response = session.patch(device_url, json=thermostat_patch_data)
+
+  # Verify the new ETag
+  assert patch_response.status_code == 200
+  assert 'version' not in patch_response.json()
+  new_etag = patch_response.headers['ETag']
+  assert new_etag != old_etag
+  assert get_etag(base_url, session, thermostat['id']) == new_etag
+
+
+# --------------------------------------------------------------------------------
+# If-Match Tests
+# --------------------------------------------------------------------------------
+
+def test_patch_with_current_etag(base_url, session, thermostat, thermostat_patch_data):
+
+  # Patch
+  etag = get_etag(base_url, session, thermostat['id'])
+  device_url = base_url.concat(f'/devices/{thermostat["id"]}')
+  patch_response = session.patch(device_url, json=thermostat_patch_data, headers={'If-Match': etag})
+
+  # Verify patch
+  assert patch_response.status_code == 200
+  assert patch_response.json()['name'] == thermostat_patch_data['name']
+
+
+def test_patch_with_stale_etag(base_url, session, thermostat, thermostat_patch_data):
+
+  # Patch twice with the same ETag
+  etag = get_etag(base_url, session, thermostat['id'])
+  device_url = base_url.concat(f'/devices/{thermostat["id"]}')
+  first_response = session.patch(device_url, json={'name': 'First'}, headers={'If-Match': etag})
+  second_response = session.patch(device_url, json=thermostat_patch_data, headers={'If-Match': etag})
+
+  # Verify only the first patch applied
+  assert first_response.status_code == 200
+  assert second_response.status_code == 412
+  assert second_response.json()['detail'] == 'Precondition Failed'
+  assert session.get(device_url).json()['name'] == 'First'
+
+
+def test_put_with_stale_etag(base_url, session, thermostat, light_data):
+
+  # Put
+  device_url = base_url.concat(f'/devices/{thermostat["id"]}')
+  put_response = session.put(device_url, json=light_data, headers={'If-Match': '"999"'})
+
+  # Verify the device did not change
+  assert put_response.status_code == 412
+  assert session.get(device_url).json() == thermostat
+
+
+def test_put_with_any_etag(base_url, session, thermostat, light_data):
+
+  # Put
+  device_url = base_url.concat(f'/devices/{thermostat["id"]}')
+  put_response = session.put(device_url, json=light_data, headers={'If-Match': '*'})
+
+  # Verify put
+  assert put_response.status_code == 200
+  assert put_response.json()['name'] == light_data['name']
+
+
+def test_delete_with_stale_etag(base_url, session, thermostat):
+
+  # Delete
+  device_url = base_url.concat(f'/devices/{thermostat["id"]}')
+  delete_response = session.delete(device_url, headers={'If-Match': '"0"'})
+
+  # Verify the device still exists
+  assert delete_response.status_code == 412
+  assert session.get(device_url).status_code == 200
+
+
+def test_delete_with_current_etag(base_url, session, device_creator, thermostat):
+
+  # Delete
+  etag = get_etag(base_url, session, thermostat['id'])
+  device_url = base_url.concat(f'/devices/{thermostat["id"]}')
+  delete_response = session.delete(device_url, headers={'If-Match': etag})
+
+  # Verify delete
+  assert delete_response.status_code == 200
+  assert session.get(device_url).status_code == 404
+  device_creator.remove(thermostat['id'])
+
+
+def test_concurrent_patches_with_same_etag(base_url, session, thermostat):
+
+  # Patch concurrently with the same ETag
+  etag = get_etag(base_url, session, thermostat['id'])
+  device_url = base_url.concat(f'/devices/{thermostat["id"]}')
+  patch = lambda n: session.patch(device_url, json={'name': f'Name {n}'}, headers={'If-Match': etag})
+
+  with ThreadPoolExecutor(max_workers=8) as executor:
+    responses = list(executor.map(patch, range(8)))
+
+  # Verify exactly one patch won
+  codes = sorted(response.status_code for response in responses)
+  assert codes == [200] + [412] * 7
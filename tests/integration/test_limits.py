@@ -0,0 +1,128 @@
+"""
+This module contains integration tests for rate limiting and admission control.
+Each user has read and write budgets, and too many concurrent requests are shed.
+Every test starts with full budgets, since the suite resets them before each test.
+"""
+
+# --------------------------------------------------------------------------------
+# Imports
+# --------------------------------------------------------------------------------
+
+import requests
+import threading
+
+from collections import Counter
+
+
+# --------------------------------------------------------------------------------
+# Helpers
+# --------------------------------------------------------------------------------
+
+MAX_ATTEMPTS = 5000
+
+
+def get_counters(base_url):
+  response = requests.get(base_url.concat('/status/limits'))
+  assert response.status_code == 200
+  return response.json()
+
+
+def spend_budget(send):
+  # Sends requests until one is throttled, which a full budget delays by its burst size
+  for _ in range(MAX_ATTEMPTS):
+    response = send()
+    if response.status_code == 429:
+      return response
+  raise AssertionError('No request was throttled')
+
+
+# --------------------------------------------------------------------------------
+# Rate Limit Tests
+# --------------------------------------------------------------------------------
+
+def test_spent_write_budget(base_url, alt_session):
+
+  # Delete a missing device until the write budget is spent
+  before = get_counters(base_url)
+  url = base_url.concat('/devices/0')
+  response = spend_budget(lambda: alt_session.delete(url))
+
+  # Verify error
+  assert response.json()['detail'] == 'Too Many Requests'
+  assert int(response.headers['retry-after']) >= 1
+
+  # Verify the counters
+  after = get_counters(base_url)
+  assert after['throttled_writes'] > before['throttled_writes']
+
+
+def test_spent_read_budget(base_url, alt_session):
+
+  # Get a missing device until the read budget is spent
+  before = get_counters(base_url)
+  url = base_url.concat('/devices/0')
+  response = spend_budget(lambda: alt_session.get(url))
+
+  # Verify error
+  assert response.json()['detail'] == 'Too Many Requests'
+  assert int(response.headers['retry-after']) >= 1
+
+  # Verify the counters
+  after = get_counters(base_url)
+  assert after['throttled_reads'] > before['throttled_reads']
+
+
+def test_budgets_are_per_user(base_url, session, alt_session):
+
+  # Spend one user's write budget
+  url = base_url.concat('/devices/0')
+  spend_budget(lambda: alt_session.delete(url))
+
+  # Verify the other user is not throttled
+  assert session.delete(url).status_code == 404
+
+
+def test_reset_limits_as_non_admin(base_url, alt_session):
+
+  # Reset
+  url = base_url.concat('/admin/limits')
+  response = alt_session.delete(url)
+
+  # Verify error
+  assert response.status_code == 403
+
+
+# --------------------------------------------------------------------------------
+# Admission Control Tests
+# --------------------------------------------------------------------------------
+
+def test_concurrent_requests_are_shed(base_url, user):
+
+  # Open many connections, then send a listing on all of them at once
+  count = 200
+  barrier = threading.Barrier(count)
+  responses = []
+
+  def get_devices():
+    session = requests.Session()
+    session.auth = (user.username, user.password)
+    session.get(base_url.concat('/status'))
+    barrier.wait()
+    responses.append(session.get(base_url.concat('/devices')))
+
+  before = get_counters(base_url)
+  threads = [threading.Thread(target=get_devices) for _ in range(count)]
+  for thread in threads:
+    thread.start()
+  for thread in threads:
+    thread.join()
+
+  # Verify some were shed with 503
+  shed = [response for response in responses if response.status_code == 503]
+  assert len(shed) > 0
+  assert all(int(response.headers['retry-after']) >= 1 for response in shed)
+  assert all(response.status_code in (200, 503) for response in responses)
+
+  # Verify the counters
+  after = get_counters(base_url)
+  assert after['shed'] > before['shed']
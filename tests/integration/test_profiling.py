@@ -0,0 +1,141 @@
+"""
+This module contains integration tests for on-demand request profiling.
+Admins may send the 'X-Profile' header to profile a request.
+Profiled responses name their saved profile in the 'X-Profile-Id' header.
+Saved profiles count toward the server's limits, so tests delete the ones they cause.
+"""
+
+# --------------------------------------------------------------------------------
+# Imports
+# --------------------------------------------------------------------------------
+
+import glob
+import os
+import pytest
+import requests
+
+
+# --------------------------------------------------------------------------------
+# Helpers
+# --------------------------------------------------------------------------------
+
+# More profiles than the server's limits allow
+MAX_PROFILES = 1000
+
+
+def delete_profiles(directory, responses):
+
+  # The server shares the test's working directory when it runs locally
+  for response in responses:
+    profile_id = response.headers.get('x-profile-id')
+    if profile_id:
+      for path in glob.glob(os.path.join(directory, f'*-{profile_id}.*')):
+        os.remove(path)
+
+
+# --------------------------------------------------------------------------------
+# Fixtures
+# --------------------------------------------------------------------------------
+
+@pytest.fixture
+def profiled(test_inputs):
+  responses = []
+  yield responses
+  delete_profiles(test_inputs['profile_directory'], responses)
+
+
+# --------------------------------------------------------------------------------
+# Tests
+# --------------------------------------------------------------------------------
+
+def test_profile_request_as_admin(base_url, session, thermostat, profiled):
+
+  # Get with the profile header
+  url = base_url.concat(f'/devices/{thermostat["id"]}')
+  response = session.get(url, headers={'X-Profile': '1'})
+  profiled.append(response)
+
+  # Verify the response is unchanged and names its profile
+  assert response.status_code == 200
+  assert response.json() == thermostat
+  assert len(response.headers['x-profile-id']) > 0
+
+
+def test_profile_ids_are_unique(base_url, session, profiled):
+
+  # Get twice with the profile header
+  url = base_url.concat('/devices')
+  first_response = session.get(url, headers={'X-Profile': '1'})
+  second_response = session.get(url, headers={'X-Profile': '1'})
+  profiled.extend([first_response, second_response])
+
+  # Verify each request has its own profile
+  assert first_response.headers['x-profile-id'] != second_response.headers['x-profile-id']
+
+
+def test_profile_request_with_error(base_url, session, profiled):
+
+  # Get a missing device with the profile header
+  url = base_url.concat('/devices/99999999')
+  response = session.get(url, headers={'X-Profile': '1'})
+  profiled.append(response)
+
+  # Verify the error is unchanged and names its profile
+  assert response.status_code == 404
+  assert response.json()['detail'] == 'Not Found'
+  assert len(response.headers['x-profile-id']) > 0
+
+
+def test_deleted_profiles_free_room(base_url, session, test_inputs, profiled):
+
+  # Profile requests until the server's limits are reached
+  url = base_url.concat('/devices/0')
+  for _ in range(MAX_PROFILES):
+    response = session.get(url, headers={'X-Profile': '1'})
+    if 'x-profile-id' not in response.headers:
+      break
+    profiled.append(response)
+  else:
+    raise AssertionError('The profile limits were never reached')
+
+  # Delete the profiles and profile again
+  delete_profiles(test_inputs['profile_directory'], profiled)
+  response = session.get(url, headers={'X-Profile': '1'})
+  profiled.append(response)
+
+  # Verify the profile is saved
+  assert response.status_code == 404
+  assert len(response.headers['x-profile-id']) > 0
+
+
+def test_profile_header_ignored_for_non_admin(base_url, alt_session):
+
+  # Get with the profile header
+  url = base_url.concat('/devices')
+  response = alt_session.get(url, headers={'X-Profile': '1'})
+
+  # Verify the request is not profiled
+  assert response.status_code == 200
+  assert 'x-profile-id' not in response.headers
+
+
+def test_profile_header_ignored_without_credentials(base_url):
+
+  # Get with the profile header
+  url = base_url.concat('/devices')
+  response = requests.get(url, headers={'X-Profile': '1'})
+
+  # Verify the request is rejected as usual
+  assert response.status_code == 401
+  assert 'x-profile-id' not in response.headers
+
+
+def test_request_without_profile_header(base_url, session):
+
+  # Get
+  url = base_url.concat('/devices')
+  response = session.get(url)
+
+  # Verify the request is not profiled
+  assert response.status_code == 200
+  assert 'x-profile-id' not in response.headers
@@ -76,3 +76,100 @@ def test_status_invalid_method(base_url, method):
   assert response.status_code == 405
   assert data['detail'] == 'Method Not Allowed'
 
+
+
+# --------------------------------------------------------------------------------
+# Tests for Rate Limiting Counters
+# --------------------------------------------------------------------------------
+
+def test_status_limits_get(base_url):
+  url = base_url.concat('/status/limits')
+  response = requests.get(url)
+  data = response.json()
+
+  assert response.status_code == 200
+  for counter in ['in_flight', 'throttled_reads', 'throttled_writes', 'shed']:
+    assert data[counter] >= 0
+
+
+# --------------------------------------------------------------------------------
+# Tests for Detailed Health
+# --------------------------------------------------------------------------------
+
+def test_status_detail_get(base_url):
+  url = base_url.concat('/status/detail')
+  response = requests.get(url)
+  data = response.json()
+
+  assert response.status_code == 200
+  assert data['online'] == True
+  assert data['healthy'] == True
+  assert data['reasons'] == []
+  assert data['loop']['lag_ms'] >= 0
+  assert data['threadpool']['total_threads'] > 0
+  assert data['registry']['probe_ms'] >= 0
+  assert data['registry']['devices'] >= 0
+  assert data['requests']['p99_ms'] >= data['requests']['p50_ms']
+
+
+def test_status_detail_index_sizes(base_url):
+  url = base_url.concat('/status/detail')
+  response = requests.get(url)
+  data = response.json()
+
+  assert set(data['registry']['indexes']) >= {'changes', 'search', 'serials', 'sort', 'stats'}
+  assert data['registry']['indexes']['serials'] == data['registry']['devices']
+
+
+def test_status_detail_is_sampled(base_url):
+
+  # Get twice in quick succession
+  url = base_url.concat('/status/detail')
+  first_data = requests.get(url).json()
+  second_data = requests.get(url).json()
+
+  # Verify both come from the same background sample
+  assert first_data['registry']['sampled_at'] == second_data['registry']['sampled_at']
+
+
+# --------------------------------------------------------------------------------
+# Tests for Executor Statistics
+# --------------------------------------------------------------------------------
+
+def test_status_executors_get(base_url):
+  url = base_url.concat('/status/executors')
+  response = requests.get(url)
+  data = response.json()
+
+  assert response.status_code == 200
+  assert {executor['name'] for executor in data} == {'listings', 'reports', 'exports'}
+  for executor in data:
+    assert executor['threads'] > 0
+    assert executor['queued'] <= executor['max_queue']
+
+
+def test_status_executors_count_reports(base_url, session, thermostat):
+
+  # Get a report between two executor readings
+  url = base_url.concat('/status/executors')
+  before = {executor['name']: executor for executor in requests.get(url).json()}
+  report_response = session.get(base_url.concat(f'/devices/{thermostat["id"]}/report'))
+  after = {executor['name']: executor for executor in requests.get(url).json()}
+
+  # Verify the report ran in the reports executor
+  assert report_response.status_code == 200
+  assert after['reports']['completed'] == before['reports']['completed'] + 1
+  assert after['reports']['queue_p99_ms'] >= 0
+
+
+def test_status_executors_count_exports(base_url, session):
+
+  # Download a backup between two executor readings
+  url = base_url.concat('/status/executors')
+  before = {executor['name']: executor for executor in requests.get(url).json()}
+  backup_response = session.get(base_url.concat('/admin/backup'))
+  after = {executor['name']: executor for executor in requests.get(url).json()}
+
+  # Verify the backup ran in the exports executor
+  assert backup_response.status_code == 200
+  assert after['exports']['completed'] == before['exports']['completed'] + 1
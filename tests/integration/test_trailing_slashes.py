@@ -0,0 +1,68 @@
+"""
+This module contains integration tests for paths with trailing slashes.
+A path with a trailing slash is the same resource as the path without it.
+"""
+
+# --------------------------------------------------------------------------------
+# Imports
+# --------------------------------------------------------------------------------
+
+import pytest
+import requests
+
+
+# --------------------------------------------------------------------------------
+# Tests
+# --------------------------------------------------------------------------------
+
+@pytest.mark.parametrize('path', ['/status/', '/status//', '/status/limits/'])
+def test_status_with_trailing_slash(base_url, path):
+
+  # Get
+  url = base_url.concat(path)
+  response = requests.get(url, allow_redirects=False)
+
+  # Verify response without a redirect
+  assert response.status_code == 200
+
+
+def test_device_with_trailing_slash(base_url, session, thermostat):
+
+  # Get the device and its report
+  device_response = session.get(base_url.concat(f'/devices/{thermostat["id"]}/'), allow_redirects=False)
+  report_response = session.get(base_url.concat(f'/devices/{thermostat["id"]}/report/'), allow_redirects=False)
+
+  # Verify responses
+  assert device_response.status_code == 200
+  assert device_response.json() == thermostat
+  assert report_response.status_code == 200
+
+
+def test_create_device_with_trailing_slash(session, device_creator, thermostat_data):
+
+  # Post to '/devices/', as the device creator does, failing on any redirect
+  session.max_redirects = 0
+  device = device_creator.create(session, thermostat_data)
+
+  # Verify response
+  assert device['serial_number'] == thermostat_data['serial_number']
+
+
+def test_unknown_path_with_trailing_slash(base_url, session):
+
+  # Get
+  url = base_url.concat('/no-such-path/')
+  response = session.get(url, allow_redirects=False)
+
+  # Verify error
+  assert response.status_code == 404
+
+
+def test_unsupported_method_with_trailing_slash(base_url, session):
+
+  # Delete
+  url = base_url.concat('/status/')
+  response = session.delete(url, allow_redirects=False)
+
+  # Verify error
+  assert response.status_code == 405
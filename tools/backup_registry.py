@@ -0,0 +1,94 @@
+"""
+This module downloads, verifies, and restores registry backups.
+Backups come from the running app's '/admin/backup' endpoint, which needs an admin user.
+Every command checks the backup's files against the SHA-256 checksums in its manifest.
+Run it from the project root:
+`python -m tools.backup_registry download backup.tar.gz --user pythonista --password 'I<3testing'`,
+`python -m tools.backup_registry verify backup.tar.gz`, or
+`python -m tools.backup_registry restore backup.tar.gz .` while the app is stopped.
+"""
+
+# --------------------------------------------------------------------------------
+# Imports
+# --------------------------------------------------------------------------------
+
+import argparse
+import os
+import requests
+import sys
+
+from app.backups import CHUNK_SIZE, restore_backup, verify_backup
+
+
+# --------------------------------------------------------------------------------
+# Commands
+# --------------------------------------------------------------------------------
+
+def download(url: str, target: str, user: str, password: str):
+  # Write a temporary file first so a failed download never leaves a partial target
+  temp_path = target + '.tmp'
+  with requests.get(f'{url.rstrip("/")}/admin/backup', auth=(user, password), stream=True) as response:
+    response.raise_for_status()
+    with open(temp_path, 'wb') as backup:
+      for chunk in response.iter_content(CHUNK_SIZE):
+        backup.write(chunk)
+
+  try:
+    manifest = verify(temp_path)
+  except ValueError:
+    os.remove(temp_path)
+    raise
+
+  os.replace(temp_path, target)
+  return manifest
+
+
+def verify(source: str):
+  with open(source, 'rb') as backup:
+    return verify_backup(backup)
+
+
+def restore(source: str, directory: str):
+  with open(source, 'rb') as backup:
+    return restore_backup(backup, directory)
+
+
+# --------------------------------------------------------------------------------
+# Main
+# --------------------------------------------------------------------------------
+
+def main():
+  parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+  commands = parser.add_subparsers(dest='command', required=True)
+
+  download_parser = commands.add_parser('download', help='download a backup from the running app')
+  download_parser.add_argument('target', help='the backup file to write')
+  download_parser.add_argument('--url', default='http://127.0.0.1:8000', help="the app's base URL")
+  download_parser.add_argument('--user', required=True, help='an admin username')
+  download_parser.add_argument('--password', required=True, help="the admin's password")
+
+  verify_parser = commands.add_parser('verify', help="check a backup against its manifest")
+  verify_parser.add_argument('source', help='the backup file to read')
+
+  restore_parser = commands.add_parser('restore', help='write the registry files from a backup')
+  restore_parser.add_argument('source', help='the backup file to read')
+  restore_parser.add_argument('directory', help='the directory for the registry files')
+
+  args = parser.parse_args()
+
+  try:
+    if args.command == 'download':
+      manifest = download(args.url, args.target, args.user, args.password)
+    elif args.command == 'verify':
+      manifest = verify(args.source)
+    else:
+      manifest = restore(args.source, args.directory)
+  except (ValueError, requests.RequestException) as error:
+    sys.exit(str(error))
+
+  for entry in manifest['files']:
+    print(f'{entry["name"]} ({entry["size"]} B, sha256 {entry["sha256"]})')
+
+
+if __name__ == '__main__':
+  main()
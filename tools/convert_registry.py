@@ -0,0 +1,59 @@
+"""
+This module converts a registry file from one storage format to another.
+The input format is detected from the file's contents.
+The output format comes from `--format`, or else from the output file's extension.
+Run it from the project root:
+`python -m tools.convert_registry registry-dev.json registry-dev.msgpack.zst`.
+"""
+
+# --------------------------------------------------------------------------------
+# Imports
+# --------------------------------------------------------------------------------
+
+import argparse
+import os
+
+from app.storage import decode, detect_format, encode, format_from_path, parse_format
+
+
+# --------------------------------------------------------------------------------
+# Conversion
+# --------------------------------------------------------------------------------
+
+def convert(source: str, target: str, format_name: str | None = None):
+  format_name = format_name or format_from_path(target)
+  parse_format(format_name)
+
+  with open(source, 'rb') as registry:
+    raw = registry.read()
+  source_format = detect_format(raw)
+  data = decode(raw, source_format)
+
+  # Write a temporary file first so a failed conversion never leaves a partial target
+  temp_path = target + '.tmp'
+  with open(temp_path, 'wb') as registry:
+    registry.write(encode(data, format_name))
+  os.replace(temp_path, target)
+
+  return source_format, format_name
+
+
+# --------------------------------------------------------------------------------
+# Main
+# --------------------------------------------------------------------------------
+
+def main():
+  parser = argparse.ArgumentParser(description=__doc__)
+  parser.add_argument('source', help='the registry file to read')
+  parser.add_argument('target', help='the registry file to write')
+  parser.add_argument('--format', dest='format_name', help="the output format, like 'msgpack.zst'")
+  args = parser.parse_args()
+
+  source_format, target_format = convert(args.source, args.target, args.format_name)
+  source_size = os.path.getsize(args.source)
+  target_size = os.path.getsize(args.target)
+  print(f'{args.source} ({source_format}, {source_size} B) -> {args.target} ({target_format}, {target_size} B)')
+
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,37 @@
+"""
+This module writes the app's OpenAPI schema to a file at build time,
+for publishing the API or generating clients without running the app.
+It is the same schema that the app serves at '/openapi.json'.
+Run it from the project root: `python -m tools.export_openapi openapi.json`.
+"""
+
+# --------------------------------------------------------------------------------
+# Imports
+# --------------------------------------------------------------------------------
+
+import argparse
+import os
+
+from app.main import render_openapi
+
+
+# --------------------------------------------------------------------------------
+# Main
+# --------------------------------------------------------------------------------
+
+def main():
+  parser = argparse.ArgumentParser(description=__doc__)
+  parser.add_argument('target', help='the schema file to write')
+  args = parser.parse_args()
+
+  # Write a temporary file first so a failed export never leaves a partial target
+  temp_path = args.target + '.tmp'
+  with open(temp_path, 'wb') as schema:
+    schema.write(render_openapi())
+  os.replace(temp_path, args.target)
+
+  print(f'{args.target} ({os.path.getsize(args.target)} B)')
+
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,105 @@
+"""
+This module splits a registry into shard files, or changes its number of shards.
+Devices move to the shard for their owner.
+Device IDs encode their shard, so devices that move to a different shard get new IDs.
+Run it from the project root while the app is stopped, then set `shards` in `config.json`:
+`python -m tools.shard_registry registry-dev.json 1 4`.
+"""
+
+# --------------------------------------------------------------------------------
+# Imports
+# --------------------------------------------------------------------------------
+
+import argparse
+import os
+
+from app.shards import first_id, shard_of_id, shard_of_owner, shard_paths
+from app.storage import decode, encode, format_from_path
+
+
+# --------------------------------------------------------------------------------
+# Resharding
+# --------------------------------------------------------------------------------
+
+def read_documents(paths: list[str]):
+  documents = dict()
+
+  for path in paths:
+    if not os.path.exists(path):
+      continue
+    with open(path, 'rb') as registry:
+      raw = registry.read()
+    if raw:
+      for doc_id, document in decode(raw).get('_default', dict()).items():
+        documents[int(doc_id)] = dict(document)
+
+  return documents
+
+
+def reshard(path: str, source_count: int, target_count: int, format_name: str | None = None):
+  """
+  Rewrites the registry at `path` from `source_count` shards to `target_count` shards.
+  Returns a dict of old IDs to new IDs for the devices whose IDs changed.
+  """
+
+  documents = read_documents(shard_paths(path, source_count))
+  shards = [dict() for _ in range(target_count)]
+
+  # Devices whose IDs already point to their new shard keep them
+  moved = []
+  for doc_id, document in sorted(documents.items()):
+    shard = shard_of_owner(document['owner'], target_count)
+    if shard_of_id(doc_id, target_count) == shard:
+      shards[shard][doc_id] = document
+    else:
+      moved.append((doc_id, shard, document))
+
+  # Other devices get the next free IDs in their new shards
+  next_ids = [
+    max(first_id(shard, target_count), max(shards[shard], default=0) + target_count)
+    for shard in range(target_count)
+  ]
+  renumbered = dict()
+  for doc_id, shard, document in moved:
+    renumbered[doc_id] = next_ids[shard]
+    shards[shard][next_ids[shard]] = document
+    next_ids[shard] += target_count
+
+  # Write temporary files first so a failure never leaves a partial set of shards
+  targets = shard_paths(path, target_count)
+  for target, shard in zip(targets, shards):
+    data = {'_default': {str(doc_id): document for doc_id, document in sorted(shard.items())}}
+    with open(target + '.tmp', 'wb') as registry:
+      registry.write(encode(data, format_name or format_from_path(target)))
+  for target in targets:
+    os.replace(target + '.tmp', target)
+
+  return renumbered
+
+
+# --------------------------------------------------------------------------------
+# Main
+# --------------------------------------------------------------------------------
+
+def main():
+  parser = argparse.ArgumentParser(description=__doc__)
+  parser.add_argument('path', help="the registry path from 'config.json'")
+  parser.add_argument('source_count', type=int, help='the current number of shards')
+  parser.add_argument('target_count', type=int, help='the new number of shards')
+  parser.add_argument('--format', dest='format_name', help="the output format, like 'msgpack.zst'")
+  args = parser.parse_args()
+
+  renumbered = reshard(args.path, args.source_count, args.target_count, args.format_name)
+  for target in shard_paths(args.path, args.target_count):
+    print(f'{target} ({os.path.getsize(target)} B)')
+  for old_id, new_id in renumbered.items():
+    print(f'Device {old_id} is now device {new_id}')
+
+  # Old shard files are left in place in case they are needed for recovery
+  leftovers = set(shard_paths(args.path, args.source_count)) - set(shard_paths(args.path, args.target_count))
+  for leftover in sorted(path for path in leftovers if os.path.exists(path)):
+    print(f'{leftover} is no longer used and may be deleted')
+
+
+if __name__ == '__main__':
+  main()